@@ -0,0 +1,71 @@
+import argparse
+import sys
+
+import pandas as pd
+
+from config.settings import ANALYTICS_DIR, ANALYTICS_INTERVAL_MINUTES, ANALYTICS_PARTITIONS
+from database.analytics import (
+    AnalyticsScheduler, AnalyticsSnapshot, crew_run_durations, llm_route_summary, load_snapshot,
+    phase_throughput, read_snapshot_state, test_pass_rates
+)
+from database.db_manager import DatabaseManager
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Write and report on columnar analytics snapshots")
+    parser.add_argument("--db-path", help="SQLite database path or database URL (default: DATABASE_URL)")
+    parser.add_argument("--output-dir", default=ANALYTICS_DIR, help="Directory the snapshot is written to")
+    parser.add_argument("--partitions", type=int, default=ANALYTICS_PARTITIONS,
+                        help="Partitions the project datasets are split into")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser("refresh", help="Bring the snapshot up to date")
+    refresh_parser.add_argument("--full", action="store_true", help="Rewrite the whole snapshot")
+
+    schedule_parser = subparsers.add_parser("schedule", help="Refresh the snapshot at a regular interval")
+    schedule_parser.add_argument("--every", type=float, default=ANALYTICS_INTERVAL_MINUTES,
+                                 help="Minutes between refreshes")
+
+    subparsers.add_parser("report", help="Print portfolio metrics computed from the snapshot")
+
+    return parser.parse_args()
+
+def print_report(output_dir):
+    """Print the portfolio metrics of a snapshot"""
+    state = read_snapshot_state(output_dir)
+    if state is None:
+        print(f"No analytics snapshot in {output_dir}; run 'python analytics_snapshot.py refresh' first.")
+        return 1
+    frames = load_snapshot(output_dir)
+    print(f"Snapshot of {state['url']} taken {state['refreshed_at']}")
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.2f}'.format):
+        print("\nPhase throughput")
+        print(phase_throughput(frames['phases'], frames['tasks']).to_string(index=False))
+        print("\nCrew run durations (seconds)")
+        print(crew_run_durations(frames['crew_runs']).to_string(index=False))
+        print("\nLowest test pass rates")
+        print(test_pass_rates(frames['test_cases'], frames['projects']).head(10).to_string(index=False))
+        print("\nLLM routes")
+        print(llm_route_summary(frames['llm_calls']).to_string(index=False))
+    return 0
+
+def main():
+    args = parse_args()
+    if args.command == "report":
+        return print_report(args.output_dir)
+
+    snapshot = AnalyticsSnapshot(DatabaseManager(args.db_path), args.output_dir, args.partitions)
+    if args.command == "refresh":
+        scheduler = AnalyticsScheduler(snapshot)
+        return 0 if scheduler.run_once(full=args.full) else 1
+
+    scheduler = AnalyticsScheduler(snapshot, args.every * 60)
+    print(f"Refreshing the analytics snapshot in {args.output_dir} every {args.every:g} minutes. Press Ctrl+C to stop.")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel
+
+# Add the project root to the path so we can import our modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.settings import API_HOST, API_PORT, API_CREW_WORKERS, APP_NAME, APP_VERSION, DEFAULT_PHASES
+from crews.crew_jobs import CrewJobRunner, CREW_TYPES
+from crews.circuit_breaker import breaker_states
+from database.async_db_manager import AsyncDatabaseManager
+from models.project_models import json_default
+from utils.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from utils.tracing import span
+
+db = AsyncDatabaseManager()
+crew_jobs = CrewJobRunner(max_workers=API_CREW_WORKERS)
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    crew_jobs.shutdown()
+    db.close()
+
+app = FastAPI(title=f"{APP_NAME} API", version=APP_VERSION, lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    started = time.perf_counter()
+    with span(f"http {request.method} {request.url.path}", root=True) as request_span:
+        response = await call_next(request)
+        request_span.set_attribute("http.status_code", response.status_code)
+    # Label by route template (e.g. /projects/{project_id}) to keep the number of series bounded
+    route = request.scope.get('route')
+    HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route else "unmatched", str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    return response
+
+# Request bodies
+class ProjectCreate(BaseModel):
+    name: str
+    description: str = ""
+    create_default_phases: bool = True
+
+class ProjectUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+
+class PhaseCreate(BaseModel):
+    name: str
+    description: str = ""
+
+class PhaseUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+class TaskCreate(BaseModel):
+    name: str
+    description: str = ""
+    assigned_to: Optional[str] = None
+    due_date: Optional[str] = None
+
+class TaskUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    assigned_to: Optional[str] = None
+    due_date: Optional[str] = None
+
+class DocumentCreate(BaseModel):
+    name: str
+    content: str
+    doc_type: str = "Other"
+
+class TestCaseCreate(BaseModel):
+    name: str
+    description: str = ""
+    expected_result: str
+
+class TestCaseUpdate(BaseModel):
+    actual_result: Optional[str] = None
+    status: Optional[str] = None
+
+# Helpers
+def json_response(request, data, status_code=200):
+    """
+    Serialize data to JSON with an ETag
+
+    GET requests whose If-None-Match header matches the ETag get an empty
+    304 response instead of the body.
+    """
+    body = json.dumps(data, default=json_default, separators=(',', ':')).encode('utf-8')
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+    if request.method == "GET" and status_code == 200:
+        if_none_match = request.headers.get('if-none-match', '')
+        if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+def page(items, limit, offset, total=None):
+    """Wrap a list of items with pagination details"""
+    result = {'items': items, 'limit': limit, 'offset': offset}
+    if total is not None:
+        result['total'] = total
+    return result
+
+async def require(coro, what):
+    """Await a lookup and fail with 404 if it found nothing"""
+    item = await coro
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"{what} not found")
+    return item
+
+# Projects
+@app.get("/projects")
+async def list_projects(request: Request, limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0),
+                        status: Optional[str] = None):
+    projects = await db.get_projects_page(limit, offset, status)
+    total = await db.count_projects(status)
+    return json_response(request, page(projects, limit, offset, total))
+
+@app.post("/projects")
+async def create_project(request: Request, body: ProjectCreate):
+    project_id = await db.create_project(body.name, body.description)
+    if body.create_default_phases:
+        for phase, phase_description in DEFAULT_PHASES:
+            await db.create_phase(project_id, phase, phase_description)
+    return json_response(request, await db.get_project(project_id), status_code=201)
+
+@app.get("/projects/{project_id}")
+async def get_project(request: Request, project_id: int):
+    return json_response(request, await require(db.get_project(project_id), "Project"))
+
+@app.patch("/projects/{project_id}")
+async def update_project(request: Request, project_id: int, body: ProjectUpdate):
+    await require(db.get_project(project_id), "Project")
+    await db.update_project(project_id, **body.model_dump(exclude_none=True))
+    return json_response(request, await db.get_project(project_id))
+
+# Phases and tasks
+@app.get("/projects/{project_id}/phases")
+async def list_phases(request: Request, project_id: int):
+    await require(db.get_project(project_id), "Project")
+    return json_response(request, await db.get_phases(project_id))
+
+@app.post("/projects/{project_id}/phases")
+async def create_phase(request: Request, project_id: int, body: PhaseCreate):
+    await require(db.get_project(project_id), "Project")
+    phase_id = await db.create_phase(project_id, body.name, body.description)
+    return json_response(request, await db.get_phase(phase_id), status_code=201)
+
+@app.patch("/phases/{phase_id}")
+async def update_phase(request: Request, phase_id: int, body: PhaseUpdate):
+    await require(db.get_phase(phase_id), "Phase")
+    await db.update_phase(phase_id, **body.model_dump(exclude_none=True))
+    return json_response(request, await db.get_phase(phase_id))
+
+@app.get("/phases/{phase_id}/tasks")
+async def list_tasks(request: Request, phase_id: int):
+    await require(db.get_phase(phase_id), "Phase")
+    return json_response(request, await db.get_tasks(phase_id))
+
+@app.post("/phases/{phase_id}/tasks")
+async def create_task(request: Request, phase_id: int, body: TaskCreate):
+    await require(db.get_phase(phase_id), "Phase")
+    task_id = await db.create_task(phase_id, body.name, body.description, body.assigned_to, body.due_date)
+    return json_response(request, await db.get_task(task_id), status_code=201)
+
+@app.patch("/tasks/{task_id}")
+async def update_task(request: Request, task_id: int, body: TaskUpdate):
+    await require(db.get_task(task_id), "Task")
+    await db.update_task(task_id, **body.model_dump(exclude_none=True))
+    return json_response(request, await db.get_task(task_id))
+
+@app.get("/tasks/overdue")
+async def list_overdue_tasks(request: Request, project_id: Optional[int] = None,
+                             limit: int = Query(100, ge=1, le=1000)):
+    return json_response(request, await db.get_overdue_tasks(project_id=project_id, limit=limit))
+
+@app.get("/tasks/due")
+async def list_tasks_due(request: Request, start: Optional[date] = None, end: Optional[date] = None,
+                         project_id: Optional[int] = None, limit: int = Query(100, ge=1, le=1000)):
+    start = start or date.today()
+    end = end or start + timedelta(days=6 - start.weekday())
+    return json_response(request, await db.get_tasks_due_between(start, end, project_id, limit))
+
+@app.get("/phases/active")
+async def list_active_phases(request: Request, start: Optional[date] = None, end: Optional[date] = None,
+                             project_id: Optional[int] = None):
+    start = start or date.today()
+    return json_response(request, await db.get_phases_active_between(start, end or start, project_id))
+
+@app.get("/flags")
+async def list_flags(request: Request, project_id: Optional[int] = None, limit: int = Query(20, ge=1, le=500)):
+    return json_response(request, {
+        'counts': await db.get_flag_counts(),
+        'overdue_tasks': await db.get_flagged_overdue_tasks(limit, project_id),
+        'stalled_phases': await db.get_flagged_stalled_phases(limit, project_id)
+    })
+
+# Documents
+@app.get("/projects/{project_id}/documents")
+async def list_documents(request: Request, project_id: int, with_content: bool = False):
+    await require(db.get_project(project_id), "Project")
+    documents = await db.get_documents(project_id)
+    if not with_content:
+        documents = [{key: value for key, value in doc.items() if key != 'content'} for doc in documents]
+    return json_response(request, documents)
+
+@app.post("/projects/{project_id}/documents")
+async def create_document(request: Request, project_id: int, body: DocumentCreate):
+    await require(db.get_project(project_id), "Project")
+    document_id = await db.save_document(project_id, body.name, body.content, body.doc_type)
+    return json_response(request, await db.get_document(document_id), status_code=201)
+
+@app.get("/documents/{document_id}")
+async def get_document(request: Request, document_id: int):
+    return json_response(request, await require(db.get_document(document_id), "Document"))
+
+@app.get("/documents/{document_id}/revisions")
+async def list_document_revisions(request: Request, document_id: int):
+    await require(db.get_document(document_id), "Document")
+    return json_response(request, await db.get_document_revisions(document_id))
+
+@app.get("/documents/{document_id}/revisions/{revision}")
+async def get_document_revision(request: Request, document_id: int, revision: int):
+    content = await require(db.get_document_revision(document_id, revision), "Revision")
+    return json_response(request, {'document_id': document_id, 'revision': revision, 'content': content})
+
+@app.get("/documents/{document_id}/diff")
+async def diff_document(request: Request, document_id: int, from_revision: int = Query(..., alias="from"),
+                        to_revision: int = Query(..., alias="to")):
+    diff = await require(db.diff_document_revisions(document_id, from_revision, to_revision), "Revision")
+    return json_response(request, {'document_id': document_id, 'from': from_revision, 'to': to_revision, 'diff': diff})
+
+@app.get("/documents/{document_id}/compare")
+async def compare_document(request: Request, document_id: int, from_revision: int = Query(..., alias="from"),
+                           to_revision: int = Query(..., alias="to")):
+    comparison = await require(db.compare_document_revisions(document_id, from_revision, to_revision), "Revision")
+    return json_response(request, {'document_id': document_id, 'from': from_revision, 'to': to_revision, **comparison})
+
+# Test cases
+@app.get("/projects/{project_id}/test-cases")
+async def list_test_cases(request: Request, project_id: int):
+    await require(db.get_project(project_id), "Project")
+    return json_response(request, await db.get_test_cases(project_id))
+
+@app.post("/projects/{project_id}/test-cases")
+async def create_test_case(request: Request, project_id: int, body: TestCaseCreate):
+    await require(db.get_project(project_id), "Project")
+    test_id = await db.create_test_case(project_id, body.name, body.description, body.expected_result)
+    return json_response(request, await db.get_test_case(test_id), status_code=201)
+
+@app.patch("/test-cases/{test_id}")
+async def update_test_case(request: Request, test_id: int, body: TestCaseUpdate):
+    await require(db.get_test_case(test_id), "Test case")
+    await db.update_test_case(test_id, **body.model_dump(exclude_none=True))
+    return json_response(request, await db.get_test_case(test_id))
+
+# Search
+@app.get("/search")
+async def search(request: Request, q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=200),
+                 offset: int = Query(0, ge=0)):
+    projects = await db.search_projects(q, limit, offset)
+    documents = await db.search_documents(q, limit, offset)
+    return json_response(request, {
+        'query': q,
+        'projects': page(projects, limit, offset),
+        'documents': page(documents, limit, offset)
+    })
+
+# Change feed
+@app.get("/changes")
+async def list_changes(request: Request, since: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=10000),
+                       table: Optional[List[str]] = Query(None)):
+    return json_response(request, await db.changes_since(since, limit, table))
+
+# Crew jobs
+@app.post("/projects/{project_id}/crews/{crew_type}")
+async def submit_crew_job(request: Request, project_id: int, crew_type: str):
+    if crew_type not in CREW_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown crew type: {crew_type}")
+    await require(db.get_project(project_id), "Project")
+    return json_response(request, crew_jobs.submit(crew_type, project_id), status_code=202)
+
+@app.get("/jobs")
+async def list_crew_jobs(request: Request, project_id: Optional[int] = None):
+    return json_response(request, crew_jobs.list(project_id))
+
+@app.get("/jobs/{job_id}")
+async def get_crew_job(request: Request, job_id: str):
+    job = crew_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return json_response(request, job)
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/llm/breakers")
+async def list_llm_breakers(request: Request):
+    return json_response(request, breaker_states())
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
@@ -0,0 +1,31 @@
+"""
+Data loaders of the Streamlit pages
+
+Kept free of Streamlit so the benchmark suite can time exactly the queries
+the pages run.
+"""
+
+def load_dashboard(db, attention_limit=5):
+    """
+    Read what the live Dashboard shows
+
+    Args:
+        db (DatabaseManager): Database to read
+        attention_limit (int): Number of overdue tasks and stalled phases listed
+
+    Returns:
+        dict: projects, flag_counts, overdue_tasks and stalled_phases
+    """
+    return {
+        'projects': db.get_projects(),
+        'flag_counts': db.get_flag_counts(),
+        'overdue_tasks': db.get_flagged_overdue_tasks(attention_limit),
+        'stalled_phases': db.get_flagged_stalled_phases(attention_limit),
+    }
+
+def load_project_phases(db, project_id):
+    """Get the phases of a project and their tasks keyed by phase ID"""
+    tasks_by_phase = {}
+    for task in db.iter_project_tasks(project_id):
+        tasks_by_phase.setdefault(task['phase_id'], []).append(task)
+    return db.get_phases(project_id), tasks_by_phase
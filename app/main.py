@@ -8,10 +8,52 @@ import os
 # Add the project root to the path so we can import our modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from database.db_manager import DatabaseManager
+from app.components.page_data import load_dashboard
+from config.settings import ANALYTICS_DIR, DEFAULT_PHASES, FLAG_SWEEP_INTERVAL_MINUTES
+from database.analytics import (
+    crew_run_durations, llm_route_summary, load_snapshot, phase_throughput, read_snapshot_state, test_pass_rates
+)
+from database.flags import FlagScheduler, OVERDUE_TASK, STALLED_PHASE
+from utils.helpers import format_date, format_dates
+from utils.metrics import page_run
 
 # Initialize the database manager
 db = DatabaseManager()
 
+# Count this run of the page and time it
+page_metrics = page_run("main")
+
+@st.cache_data(show_spinner=False)
+def load_portfolio_metrics(output_dir, refreshed_at):
+    """Compute the portfolio metrics of the analytics snapshot taken at refreshed_at"""
+    frames = load_snapshot(output_dir)
+    tasks, tests, runs = frames['tasks'], frames['test_cases'], frames['crew_runs']
+    tests_run = tests['status'].isin(['Passed', 'Failed']).sum()
+    runs_finished = runs['status'].isin(['Completed', 'Failed']).sum()
+    return {
+        'projects': len(frames['projects']),
+        'task_completion': (tasks['status'] == 'Completed').mean() if len(tasks) else None,
+        'test_pass_rate': (tests['status'] == 'Passed').sum() / tests_run if tests_run else None,
+        'crew_runs': len(runs),
+        'crew_success_rate': (runs['status'] == 'Completed').sum() / runs_finished if runs_finished else None,
+        'phases': phase_throughput(frames['phases'], tasks),
+        'crews': crew_run_durations(runs),
+        'tests': test_pass_rates(tests, frames['projects']),
+        'routes': llm_route_summary(frames['llm_calls']),
+    }
+
+@st.cache_resource
+def start_flag_scheduler():
+    """Sweep the overdue and stalled flags in the background, once per server process"""
+    return FlagScheduler(db, FLAG_SWEEP_INTERVAL_MINUTES * 60).start()
+
+if FLAG_SWEEP_INTERVAL_MINUTES > 0:
+    start_flag_scheduler()
+
+def format_rate(rate):
+    """Format a 0-1 rate as a percentage, or a dash if there is nothing to rate"""
+    return "-" if rate is None else f"{rate * 100:.1f}%"
+
 # Page configuration
 st.set_page_config(
     page_title="AI-Powered Business/Systems Analyst",
@@ -77,12 +119,16 @@ with st.sidebar:
         ["Dashboard", "Projects", "Create Project", "AI Crews", "Documentation"]
     )
 
+    # Live reads the database; Analytics reads the latest analytics snapshot
+    dashboard_mode = st.radio("Dashboard Mode", ["Live", "Analytics"]) if page == "Dashboard" else None
+
 # Main content
-if page == "Dashboard":
+if page == "Dashboard" and dashboard_mode == "Live":
     st.markdown("<h1 class='main-header'>SDLC Dashboard</h1>", unsafe_allow_html=True)
     
-    # Get all projects
-    projects = db.get_projects()
+    # Get all projects and the items needing attention
+    dashboard = load_dashboard(db)
+    projects = dashboard['projects']
     
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -124,20 +170,69 @@ if page == "Dashboard":
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Overdue tasks and stalled phases, as flagged by the last sweep
+    st.markdown("<h2 class='sub-header'>Needs Attention</h2>", unsafe_allow_html=True)
+    flag_counts = dashboard['flag_counts']
+    
+    col1, col2 = st.columns(2)
+    for col, kind, label in ((col1, OVERDUE_TASK, "Overdue Tasks"), (col2, STALLED_PHASE, "Stalled Phases")):
+        with col:
+            st.markdown("""
+            <div class='metric-card'>
+                <div class='metric-value'>{}</div>
+                <div class='metric-label'>{}</div>
+            </div>
+            """.format(flag_counts[kind]['flagged'], label), unsafe_allow_html=True)
+    
+    swept_at = flag_counts[OVERDUE_TASK]['swept_at']
+    st.caption(f"Last checked {swept_at} UTC" if swept_at else "Not checked yet; run 'python flag_sweeps.py sweep'.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        overdue_tasks = dashboard['overdue_tasks']
+        if overdue_tasks:
+            df_overdue = pd.DataFrame(overdue_tasks)
+            df_overdue['due_date'] = format_dates(df_overdue['due_date'], '%Y-%m-%d').values
+            st.dataframe(
+                df_overdue[['project_name', 'phase_name', 'name', 'due_date']],
+                column_config={
+                    "project_name": "Project",
+                    "phase_name": "Phase",
+                    "name": "Task",
+                    "due_date": "Due"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+    with col2:
+        stalled_phases = dashboard['stalled_phases']
+        if stalled_phases:
+            df_stalled = pd.DataFrame(stalled_phases)
+            df_stalled['stalled_since'] = format_dates(df_stalled['stalled_since'], '%Y-%m-%d').values
+            st.dataframe(
+                df_stalled[['project_name', 'name', 'stalled_since']],
+                column_config={
+                    "project_name": "Project",
+                    "name": "Phase",
+                    "stalled_since": "In Progress Since"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+    
     # Recent projects
     st.markdown("<h2 class='sub-header'>Recent Projects</h2>", unsafe_allow_html=True)
     
     if projects:
         # Convert to DataFrame for easier display
-        df_projects = pd.DataFrame(projects)
+        df_projects = pd.DataFrame(projects).head(5)
         
         # Format dates
-        df_projects['created_at'] = pd.to_datetime(df_projects['created_at'])
-        df_projects['created_at'] = df_projects['created_at'].dt.strftime('%Y-%m-%d')
+        df_projects['created_at'] = format_dates(df_projects['created_at'], '%Y-%m-%d').values
         
         # Display recent projects
         st.dataframe(
-            df_projects[['id', 'name', 'status', 'created_at']].head(5),
+            df_projects[['id', 'name', 'status', 'created_at']],
             column_config={
                 "id": "ID",
                 "name": "Project Name",
@@ -184,6 +279,126 @@ if page == "Dashboard":
         
         st.plotly_chart(fig, use_container_width=True)
 
+elif page == "Dashboard":
+    st.markdown("<h1 class='main-header'>Portfolio Analytics</h1>", unsafe_allow_html=True)
+    
+    state = read_snapshot_state(ANALYTICS_DIR)
+    if state is None:
+        st.info("No analytics snapshot yet. Run `python analytics_snapshot.py refresh` to write one.")
+    else:
+        st.caption(f"Snapshot taken {state['refreshed_at']}. "
+                   "Refresh it with `python analytics_snapshot.py refresh` or keep it fresh with `schedule`.")
+        metrics = load_portfolio_metrics(ANALYTICS_DIR, state['refreshed_at'])
+        
+        # Key metrics
+        cards = [
+            (metrics['projects'], "Projects"),
+            (format_rate(metrics['task_completion']), "Tasks Completed"),
+            (format_rate(metrics['test_pass_rate']), "Test Pass Rate"),
+            (format_rate(metrics['crew_success_rate']), f"Crew Run Success ({metrics['crew_runs']} runs)"),
+        ]
+        for column, (value, label) in zip(st.columns(4), cards):
+            with column:
+                st.markdown("""
+                <div class='metric-card'>
+                    <div class='metric-value'>{}</div>
+                    <div class='metric-label'>{}</div>
+                </div>
+                """.format(value, label), unsafe_allow_html=True)
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        # Throughput per phase
+        st.markdown("<h2 class='sub-header'>Phase Throughput</h2>", unsafe_allow_html=True)
+        phases = metrics['phases']
+        if len(phases):
+            chart_df = phases.melt(
+                id_vars='phase', value_vars=['completion_rate', 'task_completion_rate'],
+                var_name='Measure', value_name='Rate'
+            )
+            chart_df['Measure'] = chart_df['Measure'].map({
+                'completion_rate': 'Phases completed', 'task_completion_rate': 'Tasks completed'
+            })
+            fig = px.bar(chart_df, x='phase', y='Rate', color='Measure', barmode='group',
+                         labels={'phase': 'Phase'})
+            fig.update_layout(yaxis_tickformat='.0%', margin=dict(t=0, b=0, l=0, r=0))
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(
+                phases.rename(columns={
+                    'phase': 'Phase',
+                    'phases': 'Phases',
+                    'phases_completed': 'Completed',
+                    'completion_rate': 'Completion Rate',
+                    'median_days': 'Median Days',
+                    'tasks': 'Tasks',
+                    'tasks_completed': 'Tasks Completed',
+                    'task_completion_rate': 'Task Completion Rate'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("No phases in the snapshot.")
+        
+        # Crew run durations
+        st.markdown("<h2 class='sub-header'>Crew Runs</h2>", unsafe_allow_html=True)
+        if len(metrics['crews']):
+            st.dataframe(
+                metrics['crews'].rename(columns={
+                    'crew_type': 'Crew',
+                    'runs': 'Runs',
+                    'completed': 'Completed',
+                    'failed': 'Failed',
+                    'success_rate': 'Success Rate',
+                    'avg_attempts': 'Avg Attempts',
+                    'mean_duration': 'Mean Duration (s)',
+                    'median_duration': 'Median Duration (s)',
+                    'p95_duration': 'P95 Duration (s)'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("No batch crew runs in the snapshot.")
+        
+        # Test pass rates
+        st.markdown("<h2 class='sub-header'>Lowest Test Pass Rates</h2>", unsafe_allow_html=True)
+        tests = metrics['tests'].dropna(subset=['pass_rate'])
+        if len(tests):
+            st.dataframe(
+                tests.head(20).rename(columns={
+                    'project_id': 'ID',
+                    'project': 'Project',
+                    'tests': 'Tests',
+                    'run': 'Run',
+                    'passed': 'Passed',
+                    'failed': 'Failed',
+                    'pass_rate': 'Pass Rate'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("No test results in the snapshot.")
+        
+        # LLM routes
+        st.markdown("<h2 class='sub-header'>LLM Routes</h2>", unsafe_allow_html=True)
+        if len(metrics['routes']):
+            st.dataframe(
+                metrics['routes'].rename(columns={
+                    'route': 'Task',
+                    'model': 'Model',
+                    'attempts': 'Attempts',
+                    'avg_latency_ms': 'Avg Latency (ms)',
+                    'p95_latency_ms': 'P95 Latency (ms)',
+                    'pass_rate': 'Pass Rate'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("No LLM calls in the snapshot.")
+
 elif page == "Projects":
     st.markdown("<h1 class='main-header'>Projects</h1>", unsafe_allow_html=True)
     
@@ -212,7 +427,7 @@ elif page == "Projects":
                     <h3>{project['name']}</h3>
                     <p>{project['description']}</p>
                     <p><strong>Status:</strong> <span class='status-{project['status'].lower().replace(' ', '-')}'>{project['status']}</span></p>
-                    <p><strong>Created:</strong> {project['created_at']}</p>
+                    <p><strong>Created:</strong> {format_date(project['created_at'])}</p>
                 </div>""", unsafe_allow_html=True)
             
             with col2:
@@ -245,15 +460,7 @@ elif page == "Create Project":
         # Default SDLC phases
         st.markdown("<h3>Default SDLC Phases</h3>", unsafe_allow_html=True)
         st.markdown("The following phases will be created automatically:")
-        phases = [
-            "Requirements Analysis",
-            "System Design",
-            "Implementation",
-            "Testing",
-            "Deployment",
-            "Maintenance"
-        ]
-        for phase in phases:
+        for phase, _ in DEFAULT_PHASES:
             st.markdown(f"- {phase}")
         
         submitted = st.form_submit_button("Create Project")
@@ -266,17 +473,8 @@ elif page == "Create Project":
                 project_id = db.create_project(project_name, project_description)
                 
                 # Create default phases
-                phase_descriptions = {
-                    "Requirements Analysis": "Gather and document project requirements",
-                    "System Design": "Design the system architecture and components",
-                    "Implementation": "Develop the system according to design specifications",
-                    "Testing": "Test the system to ensure it meets requirements",
-                    "Deployment": "Deploy the system to production",
-                    "Maintenance": "Maintain and update the system as needed"
-                }
-                
-                for phase in phases:
-                    db.create_phase(project_id, phase, phase_descriptions[phase])
+                for phase, phase_description in DEFAULT_PHASES:
+                    db.create_phase(project_id, phase, phase_description)
                 
                 st.success(f"Project '{project_name}' created successfully!")
                 st.markdown("""<a href="#" onclick='window.location.href="?page=Projects"'>View All Projects</a>""", unsafe_allow_html=True)
@@ -331,6 +529,30 @@ elif page == "AI Crews":
         with col2:
             st.button("Run Crew", key=f"run_{crew['name']}")
 
+    # Display model routing statistics
+    st.markdown("<h2 class='sub-header'>Model Routing</h2>", unsafe_allow_html=True)
+
+    route_stats = db.get_llm_route_stats()
+    if route_stats:
+        stats_df = pd.DataFrame(route_stats)
+        stats_df['pass_rate'] = (stats_df['pass_rate'] * 100).round(1)
+        st.dataframe(
+            stats_df.rename(columns={
+                'route': 'Task',
+                'tier': 'Tier',
+                'model': 'Model',
+                'attempts': 'Attempts',
+                'avg_latency_ms': 'Avg Latency (ms)',
+                'max_latency_ms': 'Max Latency (ms)',
+                'pass_rate': 'Pass Rate (%)',
+                'avg_output_chars': 'Avg Output Length'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("No crew tasks have run yet.")
+
 elif page == "Documentation":
     st.markdown("<h1 class='main-header'>Documentation</h1>", unsafe_allow_html=True)
     
@@ -369,6 +591,8 @@ elif page == "Documentation":
     </div>
     """, unsafe_allow_html=True)
 
+page_metrics.end()
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -1,20 +1,33 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
 import sys
 import os
-from markdownify import markdownify
+import io
+import html
 
 # Add the project root to the path so we can import our modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from database.db_manager import DatabaseManager
+from app.components.page_data import load_project_phases
 from crews.crew_manager import CrewManager
+from utils.document_converter import convert_html_file_to_markdown, preconvert_project_documents
+from utils.document_render import render_document, render_page
+from utils.helpers import format_date, format_dates
+from utils.project_export import bundle_file_name, write_project_bundle
+from utils.metrics import page_run
+from utils.tracing import span
+from config.settings import PAGE_CACHE_TTL
 
 # Initialize the database and crew managers
 db = DatabaseManager()
 crew_manager = CrewManager()
 
+# Count this run of the page and time it
+page_metrics = page_run("project_details")
+
 # Page configuration
 st.set_page_config(
     page_title="Project Details - AI-Powered Business/Systems Analyst",
@@ -78,6 +91,19 @@ st.markdown("""
     .pill-not-run { background-color: #E3F2FD; color: #1565C0; }
     .pill-passed { background-color: #E8F5E9; color: #2E7D32; }
     .pill-failed { background-color: #FFEBEE; color: #C62828; }
+    .diff-table {
+        width: 100%;
+        border-collapse: collapse;
+        table-layout: fixed;
+        font-family: monospace;
+        font-size: 0.8rem;
+        margin-bottom: 1rem;
+    }
+    .diff-table td { padding: 0 0.4rem; vertical-align: top; white-space: pre-wrap; word-break: break-word; }
+    .diff-table td.diff-number { width: 3.5rem; color: #9E9E9E; text-align: right; }
+    .diff-delete .diff-old, .diff-replace .diff-old { background-color: #FFEBEE; }
+    .diff-insert .diff-new, .diff-replace .diff-new { background-color: #E8F5E9; }
+    .diff-skip td { background-color: #F5F5F5; color: #757575; text-align: center; }
 </style>
 """, unsafe_allow_html=True)
 
@@ -104,9 +130,13 @@ if not project_id:
     st.error("No project selected. Please go back to the Projects page and select a project.")
     st.stop()
 
+# Trace the page render; each section below gets a child span
+page_span = span("page.project_details", root=True, project_id=project_id)
+
 # Get project details
 project = db.get_project(project_id)
 if not project:
+    page_span.end()
     st.error("Project not found. Please go back to the Projects page and select a valid project.")
     st.stop()
 
@@ -116,16 +146,16 @@ st.markdown(f"<h1 class='main-header'>{project['name']}</h1>", unsafe_allow_html
 # Project overview
 col1, col2 = st.columns([3, 1])
 
-with col1:
+with col1, span("page.project_details.overview"):
     st.markdown("<h2 class='sub-header'>Project Overview</h2>", unsafe_allow_html=True)
     st.markdown(f"""<div class='card'>
         <p><strong>Description:</strong> {project['description']}</p>
         <p><strong>Status:</strong> <span class='status-{project['status'].lower().replace(' ', '-')}'>{project['status']}</span></p>
-        <p><strong>Created:</strong> {project['created_at']}</p>
-        <p><strong>Last Updated:</strong> {project['updated_at']}</p>
+        <p><strong>Created:</strong> {format_date(project['created_at'])}</p>
+        <p><strong>Last Updated:</strong> {format_date(project['updated_at'])}</p>
     </div>""", unsafe_allow_html=True)
 
-with col2:
+with col2, span("page.project_details.actions"):
     st.markdown("<h2 class='sub-header'>Actions</h2>", unsafe_allow_html=True)
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     
@@ -142,21 +172,111 @@ with col2:
         st.success("Status updated!")
         st.rerun()
     
+    # Export all project data as a zip bundle, built in memory for this session only
+    if st.button("Export Project"):
+        try:
+            bundle = io.BytesIO()
+            write_project_bundle(db, project_id, bundle)
+            st.session_state[f'export_bundle_{project_id}'] = bundle.getvalue()
+        except Exception as e:
+            st.error(f"Error exporting project: {str(e)}")
+    
+    export_bundle = st.session_state.get(f'export_bundle_{project_id}')
+    if export_bundle:
+        st.download_button(
+            label="Download Export",
+            data=export_bundle,
+            file_name=bundle_file_name(project),
+            mime="application/zip"
+        )
+    
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Tabs for different sections
-tabs = st.tabs(["Phases & Tasks", "Documents", "Test Cases", "AI Crews"])
+# Section data is cached per project and data version. Writes made on this
+# page bump the version of the sections they change, so a section rerun only
+# reloads its own data; changes made by other processes bump it through the
+# change feed.
+@st.cache_resource
+def section_versions():
+    """Get the data version of each (project, section), shared by all sessions"""
+    return {}
 
-# Phases & Tasks tab
-with tabs[0]:
-    st.markdown("<h2 class='sub-header'>Project Phases</h2>", unsafe_allow_html=True)
-    
-    # Get phases for this project
-    phases = db.get_phases(project_id)
-    
-    if not phases:
-        st.info("No phases found for this project.")
-    else:
+# Section whose data changes to each table invalidate
+SECTION_TABLES = {'phases': 'phases', 'tasks': 'phases', 'documents': 'documents', 'test_cases': 'test_cases'}
+
+@st.cache_resource
+def change_cursor():
+    """Get the position in the change feed section_versions is up to date with"""
+    return {'seq': db.latest_change_seq()}
+
+def sync_section_versions():
+    """Bump the version of every section whose data changed since the last check"""
+    cursor = change_cursor()
+    versions = section_versions()
+    while True:
+        feed = db.changes_since(cursor['seq'], 1000, list(SECTION_TABLES))
+        if feed['reset']:
+            for key in versions:
+                versions[key] += 1
+        for change in feed['changes']:
+            key = (change['project_id'], SECTION_TABLES[change['table_name']])
+            versions[key] = versions.get(key, 0) + 1
+        cursor['seq'] = feed['last_seq']
+        if len(feed['changes']) < 1000:
+            break
+
+def section_version(section):
+    """Get the data version of a section of this project"""
+    sync_section_versions()
+    return section_versions().get((project_id, section), 0)
+
+def invalidate_sections(*sections):
+    """Reload the data of the given sections of this project on their next run"""
+    versions = section_versions()
+    for section in sections:
+        versions[(project_id, section)] = versions.get((project_id, section), 0) + 1
+
+def rerun_section():
+    """Rerun the current fragment, or the whole page when this is a full run"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+@st.cache_data(ttl=PAGE_CACHE_TTL, show_spinner=False)
+def load_phases(project_id, version):
+    """Get the phases of a project and their tasks keyed by phase ID"""
+    return load_project_phases(db, project_id)
+
+@st.cache_data(ttl=PAGE_CACHE_TTL, show_spinner=False)
+def load_documents(project_id, version):
+    """Get the documents of a project"""
+    return db.get_documents(project_id)
+
+@st.cache_data(ttl=PAGE_CACHE_TTL, show_spinner=False)
+def load_documents_markdown(project_id, version):
+    """Get the documents of a project converted to Markdown, keyed by document ID"""
+    return preconvert_project_documents(db, project_id, load_documents(project_id, version))
+
+@st.cache_data(ttl=PAGE_CACHE_TTL, show_spinner=False)
+def load_test_cases(project_id, version):
+    """Get the test cases of a project"""
+    return db.get_test_cases(project_id)
+
+# Each tab is a fragment: using its widgets reruns only that fragment
+@st.fragment
+def phases_fragment():
+    """Render the Phases & Tasks tab"""
+    with span("page.project_details.phases_tab", project_id=project_id):
+        st.markdown("<h2 class='sub-header'>Project Phases</h2>", unsafe_allow_html=True)
+        
+        # Get phases and their tasks for this project
+        phases, tasks_by_phase = load_phases(project_id, section_version('phases'))
+        
+        if not phases:
+            st.info("No phases found for this project.")
+            return
+        
         # Calculate phase completion percentage
         phase_statuses = [p['status'] for p in phases]
         completed_phases = sum(1 for s in phase_statuses if s == 'Completed')
@@ -178,8 +298,7 @@ with tabs[0]:
                 col1, col2 = st.columns([3, 1])
                 
                 with col1:
-                    # Get tasks for this phase
-                    tasks = db.get_tasks(phase['id'])
+                    tasks = tasks_by_phase.get(phase['id'], [])
                     
                     if tasks:
                         st.markdown("<strong>Tasks:</strong>", unsafe_allow_html=True)
@@ -189,7 +308,7 @@ with tabs[0]:
                                 <p>{task['description']}</p>
                                 <p><span class='status-pill pill-{task['status'].lower().replace(' ', '-')}'>{task['status']}</span>
                                 {f"<span style='margin-left: 10px;'><strong>Assigned to:</strong> {task['assigned_to']}</span>" if task['assigned_to'] else ""}
-                                {f"<span style='margin-left: 10px;'><strong>Due:</strong> {task['due_date']}</span>" if task['due_date'] else ""}</p>
+                                {f"<span style='margin-left: 10px;'><strong>Due:</strong> {format_date(task['due_date'])}</span>" if task['due_date'] else ""}</p>
                             </div>""", unsafe_allow_html=True)
                     else:
                         st.info("No tasks found for this phase.")
@@ -207,7 +326,8 @@ with tabs[0]:
                     if st.button("Update", key=f"update_phase_{phase['id']}"):
                         db.update_phase(phase['id'], status=new_phase_status)
                         st.success("Phase status updated!")
-                        st.rerun()
+                        invalidate_sections('phases')
+                        rerun_section()
                     
                     # Add task button
                     if st.button("Add Task", key=f"add_task_{phase['id']}"):
@@ -243,232 +363,389 @@ with tabs[0]:
                                 
                                 st.success(f"Task '{task_name}' added successfully!")
                                 st.session_state['adding_task'] = False
-                                st.rerun()
+                                invalidate_sections('phases')
+                                rerun_section()
 
-# Documents tab
-with tabs[1]:
-    st.markdown("<h2 class='sub-header'>Project Documents</h2>", unsafe_allow_html=True)
+def jump_to_section(doc_id, sections):
+    """Show the page of the section picked in a document's table of contents"""
+    st.session_state[f"doc_page_{doc_id}"] = sections[st.session_state[f"toc_{doc_id}"]]['page']
+
+def show_document_page(doc):
+    """Render one page of a document with a table of contents"""
+    rendered = render_document(doc['content'], doc.get('content_hash'))
+    sections, pages = rendered['sections'], rendered['sources']
+    page_key = f"doc_page_{doc['id']}"
     
-    # Add download button for architecture document
-    col1, col2 = st.columns([3, 1])
-    with col2:
-        if st.button("Download Architecture Document"):
-            try:
-                # Import the document converter utility
-                from utils.document_converter import convert_html_file_to_markdown
-                
-                # Path to the architecture document
-                arch_doc_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                                           "Output", "Property Management System", "architecture_document.html")
-                
-                if os.path.exists(arch_doc_path):
-                    # Convert HTML to Markdown
+    # A new revision may have fewer pages than the one shown before
+    if st.session_state.get(page_key, 1) > len(pages):
+        st.session_state[page_key] = 1
+    
+    if len(sections) > 1:
+        st.selectbox(
+            "Contents",
+            range(len(sections)),
+            format_func=lambda i: f"{'  ' * (sections[i]['level'] - 1)}{sections[i]['title']} (page {sections[i]['page']})",
+            key=f"toc_{doc['id']}",
+            on_change=jump_to_section,
+            args=(doc['id'], sections)
+        )
+    
+    page = 1
+    if len(pages) > 1:
+        page = st.number_input("Page", min_value=1, max_value=len(pages), step=1, key=page_key)
+        st.caption(f"Page {page} of {len(pages)}")
+    
+    st.html(f"<div class='card'>{render_page(rendered, page)}</div>")
+
+# Maximum rows of a side-by-side comparison shown at once
+DIFF_MAX_ROWS = 2000
+
+def diff_table_html(rows):
+    """Build the HTML table of side-by-side diff rows"""
+    cells = []
+    for tag, old_number, old_line, new_number, new_line in rows:
+        if tag == 'skip':
+            cells.append(f"<tr class='diff-skip'><td colspan='4'>{old_line} unchanged lines</td></tr>")
+            continue
+        cells.append(
+            f"<tr class='diff-{tag}'>"
+            f"<td class='diff-number'>{old_number or ''}</td><td class='diff-old'>{html.escape(old_line or '')}</td>"
+            f"<td class='diff-number'>{new_number or ''}</td><td class='diff-new'>{html.escape(new_line or '')}</td>"
+            f"</tr>"
+        )
+    return f"<table class='diff-table'>{''.join(cells)}</table>"
+
+def show_document_comparison(comparison, old_label, new_label):
+    """Render a section by section comparison of two revisions side by side"""
+    if not comparison['added'] and not comparison['removed']:
+        st.info("No differences between the selected revisions.")
+        return
+    
+    changed = [section for section in comparison['sections'] if section['status'] != 'unchanged']
+    st.caption(
+        f"{old_label} → {new_label}: {len(changed)} of {len(comparison['sections'])} sections differ, "
+        f"{comparison['added']} lines added, {comparison['removed']} removed"
+    )
+    
+    rows_left = DIFF_MAX_ROWS
+    for section in changed:
+        if rows_left <= 0:
+            st.caption("More changes are not shown; use the unified view to see the full diff.")
+            break
+        st.markdown(
+            f"**{html.escape(section['title'])}** ({section['status']}, "
+            f"+{section['added']} / -{section['removed']})"
+        )
+        st.markdown(diff_table_html(section['rows'][:rows_left]), unsafe_allow_html=True)
+        rows_left -= len(section['rows'])
+
+@st.fragment
+def documents_fragment():
+    """Render the Documents tab"""
+    with span("page.project_details.documents_tab", project_id=project_id):
+        st.markdown("<h2 class='sub-header'>Project Documents</h2>", unsafe_allow_html=True)
+        
+        # Add download button for architecture document
+        col1, col2 = st.columns([3, 1])
+        with col2:
+            # Path to the architecture document
+            arch_doc_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
+                                       "Output", "Property Management System", "architecture_document.html")
+            
+            if os.path.exists(arch_doc_path):
+                try:
+                    # Conversion is cached by file modification time and size
                     md_content = convert_html_file_to_markdown(arch_doc_path)
                     
-                    # Create a download button with the converted content
                     st.download_button(
-                        label="Download MD",
+                        label="Download Architecture Document",
                         data=md_content,
                         file_name="architecture_document.md",
                         mime="text/markdown"
                     )
-                else:
-                    st.error("Architecture document not found.")
+                except Exception as e:
+                    st.error(f"Error converting to Markdown: {str(e)}")
+            else:
+                st.button("Download Architecture Document", disabled=True, help="Architecture document not found.")
+        
+        # Get documents for this project
+        version = section_version('documents')
+        documents = load_documents(project_id, version)
+        
+        if not documents:
+            st.info("No documents found for this project.")
+        else:
+            # Convert all documents in one pass; unchanged documents come from the cache
+            try:
+                markdown_by_id = load_documents_markdown(project_id, version)
             except Exception as e:
+                markdown_by_id = {}
                 st.error(f"Error converting to Markdown: {str(e)}")
-    
-    # Get documents for this project
-    documents = db.get_documents(project_id)
-    
-    if not documents:
-        st.info("No documents found for this project.")
-    else:
-        for doc in documents:
-            with st.expander(f"{doc['name']} ({doc['doc_type']})", expanded=False):
-                col1, col2 = st.columns([5, 1])
-                with col1:
-                    st.markdown(f"""<div class='card'>
-                        <p><strong>Type:</strong> {doc['doc_type']}</p>
-                        <p><strong>Created:</strong> {doc['created_at']}</p>
-                        <p><strong>Updated:</strong> {doc['updated_at']}</p>
-                        <hr>
-                        <p>{doc['content']}</p>
-                    </div>""", unsafe_allow_html=True)
-                with col2:
-                    if st.button("Download MD", key=f"download_md_{doc['id']}"):
-                        try:
-                            # Import the markdown conversion library
-                            from markdownify import markdownify
-                            # Convert HTML to Markdown
-                            md_content = markdownify(doc['content'])
-                            # Create a download button with the converted content
+            
+            for doc in documents:
+                revision = doc.get('revision') or 1
+                with st.expander(f"{doc['name']} ({doc['doc_type']}) - Revision {revision}", expanded=False):
+                    col1, col2 = st.columns([5, 1])
+                    with col1:
+                        st.markdown(f"""<div class='card'>
+                            <p><strong>Type:</strong> {doc['doc_type']}</p>
+                            <p><strong>Revision:</strong> {revision}</p>
+                            <p><strong>Created:</strong> {format_date(doc['created_at'])}</p>
+                            <p><strong>Updated:</strong> {format_date(doc['updated_at'])}</p>
+                        </div>""", unsafe_allow_html=True)
+                        
+                        # The body is only sent to the browser when asked for, one page at a time
+                        if st.toggle("Show Content", key=f"show_content_{doc['id']}"):
+                            show_document_page(doc)
+                        
+                        # Revision history is only loaded when asked for
+                        if revision > 1 and st.checkbox("Show Revision History", key=f"history_{doc['id']}"):
+                            revisions = db.get_document_revisions(doc['id'])
+                            df_revisions = pd.DataFrame(revisions)
+                            df_revisions['created_at'] = format_dates(df_revisions['created_at'], '%B %d, %Y %H:%M').values
+                            st.dataframe(
+                                df_revisions,
+                                column_config={
+                                    "revision": "Revision",
+                                    "size": "Size (chars)",
+                                    "created_at": "Saved"
+                                },
+                                hide_index=True,
+                                use_container_width=True
+                            )
+                            
+                            revision_numbers = [r['revision'] for r in revisions]
+                            diff_col1, diff_col2 = st.columns(2)
+                            with diff_col1:
+                                from_revision = st.selectbox(
+                                    "Compare Revision",
+                                    revision_numbers,
+                                    index=1,
+                                    key=f"diff_from_{doc['id']}"
+                                )
+                            with diff_col2:
+                                to_revision = st.selectbox(
+                                    "With Revision",
+                                    revision_numbers,
+                                    index=0,
+                                    key=f"diff_to_{doc['id']}"
+                                )
+                            
+                            diff_view = st.radio(
+                                "View",
+                                ["Side by side", "Unified"],
+                                horizontal=True,
+                                key=f"diff_view_{doc['id']}"
+                            )
+                            if diff_view == "Side by side":
+                                comparison = db.compare_document_revisions(doc['id'], from_revision, to_revision)
+                                show_document_comparison(
+                                    comparison, f"Revision {from_revision}", f"Revision {to_revision}"
+                                )
+                            else:
+                                diff = db.diff_document_revisions(doc['id'], from_revision, to_revision)
+                                if diff:
+                                    st.code(diff, language="diff")
+                                else:
+                                    st.info("No differences between the selected revisions.")
+                    with col2:
+                        if doc['id'] in markdown_by_id:
                             st.download_button(
-                                label="Download",
-                                data=md_content,
+                                label="Download MD",
+                                data=markdown_by_id[doc['id']],
                                 file_name=f"{doc['name'].replace(' ', '_')}.md",
                                 mime="text/markdown",
                                 key=f"download_button_{doc['id']}"
                             )
-                        except Exception as e:
-                            st.error(f"Error converting to Markdown: {str(e)}")
-    
-    # Add document form
-    with st.expander("Add New Document", expanded=False):
-        with st.form(key="document_form"):
-            doc_name = st.text_input("Document Name")
-            doc_type = st.selectbox(
-                "Document Type",
-                ["Requirements", "Design", "Implementation", "Testing", "User Manual", "Other"]
-            )
-            doc_content = st.text_area("Document Content", height=300)
-            
-            submit_doc = st.form_submit_button("Add Document")
-            
-            if submit_doc:
-                if not doc_name or not doc_content:
-                    st.error("Document name and content are required!")
-                else:
-                    # Create document
-                    db.create_document(
-                        project_id,
-                        doc_name,
-                        doc_content,
-                        doc_type
-                    )
-                    
-                    st.success(f"Document '{doc_name}' added successfully!")
-                    st.rerun()
-
-# Test Cases tab
-with tabs[2]:
-    st.markdown("<h2 class='sub-header'>Test Cases</h2>", unsafe_allow_html=True)
-    
-    # Get test cases for this project
-    test_cases = db.get_test_cases(project_id)
-    
-    if not test_cases:
-        st.info("No test cases found for this project.")
-    else:
-        for test in test_cases:
-            with st.expander(f"{test['name']} - {test['status']}", expanded=False):
-                st.markdown(f"""<div class='card'>
-                    <p><strong>Description:</strong> {test['description']}</p>
-                    <p><strong>Expected Result:</strong> {test['expected_result']}</p>
-                    <p><strong>Status:</strong> <span class='status-pill pill-{test['status'].lower().replace(' ', '-')}'>{test['status']}</span></p>
-                    {f"<p><strong>Actual Result:</strong> {test['actual_result']}</p>" if test['actual_result'] else ""}
-                </div>""", unsafe_allow_html=True)
+        
+        # Add document form
+        with st.expander("Add New Document", expanded=False):
+            with st.form(key="document_form"):
+                doc_name = st.text_input("Document Name")
+                doc_type = st.selectbox(
+                    "Document Type",
+                    ["Requirements", "Design", "Implementation", "Testing", "User Manual", "Other"]
+                )
+                doc_content = st.text_area("Document Content", height=300)
                 
-                # Update test case status
-                col1, col2 = st.columns([3, 1])
+                submit_doc = st.form_submit_button("Add Document")
                 
-                with col2:
-                    status_options = ["Not Run", "Passed", "Failed"]
-                    new_test_status = st.selectbox(
-                        "Update Status",
-                        status_options,
-                        index=status_options.index(test['status']) if test['status'] in status_options else 0,
-                        key=f"test_{test['id']}"
-                    )
+                if submit_doc:
+                    if not doc_name or not doc_content:
+                        st.error("Document name and content are required!")
+                    else:
+                        # Saving an existing document adds a revision instead of a copy
+                        document_id = db.save_document(
+                            project_id,
+                            doc_name,
+                            doc_content,
+                            doc_type
+                        )
+                        
+                        revision = db.get_document(document_id)['revision']
+                        if revision > 1:
+                            st.success(f"Document '{doc_name}' saved as revision {revision}!")
+                        else:
+                            st.success(f"Document '{doc_name}' added successfully!")
+                        invalidate_sections('documents')
+                        rerun_section()
+
+@st.fragment
+def test_cases_fragment():
+    """Render the Test Cases tab"""
+    with span("page.project_details.test_cases_tab", project_id=project_id):
+        st.markdown("<h2 class='sub-header'>Test Cases</h2>", unsafe_allow_html=True)
+        
+        # Get test cases for this project
+        test_cases = load_test_cases(project_id, section_version('test_cases'))
+        
+        if not test_cases:
+            st.info("No test cases found for this project.")
+        else:
+            for test in test_cases:
+                with st.expander(f"{test['name']} - {test['status']}", expanded=False):
+                    st.markdown(f"""<div class='card'>
+                        <p><strong>Description:</strong> {test['description']}</p>
+                        <p><strong>Expected Result:</strong> {test['expected_result']}</p>
+                        <p><strong>Status:</strong> <span class='status-pill pill-{test['status'].lower().replace(' ', '-')}'>{test['status']}</span></p>
+                        {f"<p><strong>Actual Result:</strong> {test['actual_result']}</p>" if test['actual_result'] else ""}
+                    </div>""", unsafe_allow_html=True)
                     
-                    actual_result = st.text_area(
-                        "Actual Result",
-                        value=test['actual_result'] if test['actual_result'] else "",
-                        key=f"result_{test['id']}"
-                    )
+                    # Update test case status
+                    col1, col2 = st.columns([3, 1])
                     
-                    if st.button("Update", key=f"update_test_{test['id']}"):
-                        db.update_test_case(
-                            test['id'],
-                            actual_result=actual_result if actual_result else None,
-                            status=new_test_status
+                    with col2:
+                        status_options = ["Not Run", "Passed", "Failed"]
+                        new_test_status = st.selectbox(
+                            "Update Status",
+                            status_options,
+                            index=status_options.index(test['status']) if test['status'] in status_options else 0,
+                            key=f"test_{test['id']}"
                         )
-                        st.success("Test case updated!")
-                        st.rerun()
-    
-    # Add test case form
-    with st.expander("Add New Test Case", expanded=False):
-        with st.form(key="test_case_form"):
-            test_name = st.text_input("Test Case Name")
-            test_description = st.text_area("Test Case Description")
-            test_expected = st.text_area("Expected Result")
-            
-            submit_test = st.form_submit_button("Add Test Case")
-            
-            if submit_test:
-                if not test_name or not test_expected:
-                    st.error("Test case name and expected result are required!")
-                else:
-                    # Create test case
-                    db.create_test_case(
-                        project_id,
-                        test_name,
-                        test_description,
-                        test_expected
-                    )
-                    
-                    st.success(f"Test case '{test_name}' added successfully!")
-                    st.rerun()
+                        
+                        actual_result = st.text_area(
+                            "Actual Result",
+                            value=test['actual_result'] if test['actual_result'] else "",
+                            key=f"result_{test['id']}"
+                        )
+                        
+                        if st.button("Update", key=f"update_test_{test['id']}"):
+                            db.update_test_case(
+                                test['id'],
+                                actual_result=actual_result if actual_result else None,
+                                status=new_test_status
+                            )
+                            st.success("Test case updated!")
+                            invalidate_sections('test_cases')
+                            rerun_section()
+        
+        # Add test case form
+        with st.expander("Add New Test Case", expanded=False):
+            with st.form(key="test_case_form"):
+                test_name = st.text_input("Test Case Name")
+                test_description = st.text_area("Test Case Description")
+                test_expected = st.text_area("Expected Result")
+                
+                submit_test = st.form_submit_button("Add Test Case")
+                
+                if submit_test:
+                    if not test_name or not test_expected:
+                        st.error("Test case name and expected result are required!")
+                    else:
+                        # Create test case
+                        db.create_test_case(
+                            project_id,
+                            test_name,
+                            test_description,
+                            test_expected
+                        )
+                        
+                        st.success(f"Test case '{test_name}' added successfully!")
+                        invalidate_sections('test_cases')
+                        rerun_section()
 
-# AI Crews tab
-with tabs[3]:
-    st.markdown("<h2 class='sub-header'>AI Crews</h2>", unsafe_allow_html=True)
-    
-    st.markdown("""
-    <div class='card'>
-        <p>Run AI Crews to automate different phases of the SDLC for this project.</p>
-        <p>Each crew consists of specialized AI agents that work together to complete tasks.</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Display available crews
-    crews = [
-        {
-            "id": "requirements",
-            "name": "Requirements Analysis Crew",
-            "description": "Analyzes business needs and creates detailed requirements documents",
-            "phase": "Requirements Analysis"
-        },
-        {
-            "id": "design",
-            "name": "System Design Crew",
-            "description": "Designs system architecture and components based on requirements",
-            "phase": "System Design"
-        },
-        {
-            "id": "testing",
-            "name": "Testing Crew",
-            "description": "Creates and executes test cases based on requirements",
-            "phase": "Testing"
-        }
-    ]
-    
-    for crew in crews:
-        st.markdown(f"""
+@st.fragment
+def crews_fragment():
+    """Render the AI Crews tab"""
+    with span("page.project_details.crews_tab", project_id=project_id):
+        st.markdown("<h2 class='sub-header'>AI Crews</h2>", unsafe_allow_html=True)
+        
+        st.markdown("""
         <div class='card'>
-            <h3>{crew['name']}</h3>
-            <p>{crew['description']}</p>
-            <p><strong>Associated Phase:</strong> {crew['phase']}</p>
+            <p>Run AI Crews to automate different phases of the SDLC for this project.</p>
+            <p>Each crew consists of specialized AI agents that work together to complete tasks.</p>
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button(f"Run {crew['name']}", key=f"run_{crew['id']}"):
-            with st.spinner(f"Running {crew['name']}... This may take several minutes."):
-                try:
-                    # Call the crew manager to run the crew
-                    result = crew_manager.run_crew(crew['id'], project_id)
-                    
-                    # Show success message
-                    st.success(f"{crew['name']} completed successfully!")
-                    st.markdown("### Result:")
-                    st.markdown(result.raw if hasattr(result, 'raw') else str(result))
-                    
-                    # Refresh the page to show the new document
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error running crew: {str(e)}")
-    
-    # Note: The crew execution is now handled directly by the crew_manager.run_crew() method
-    # which creates the document and updates the phase status automatically
+        # Display available crews
+        crews = [
+            {
+                "id": "requirements",
+                "name": "Requirements Analysis Crew",
+                "description": "Analyzes business needs and creates detailed requirements documents",
+                "phase": "Requirements Analysis"
+            },
+            {
+                "id": "design",
+                "name": "System Design Crew",
+                "description": "Designs system architecture and components based on requirements",
+                "phase": "System Design"
+            },
+            {
+                "id": "testing",
+                "name": "Testing Crew",
+                "description": "Creates and executes test cases based on requirements",
+                "phase": "Testing"
+            }
+        ]
+        
+        for crew in crews:
+            st.markdown(f"""
+            <div class='card'>
+                <h3>{crew['name']}</h3>
+                <p>{crew['description']}</p>
+                <p><strong>Associated Phase:</strong> {crew['phase']}</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if st.button(f"Run {crew['name']}", key=f"run_{crew['id']}"):
+                with st.spinner(f"Running {crew['name']}... This may take several minutes."):
+                    try:
+                        # Call the crew manager to run the crew
+                        result = crew_manager.run_crew(crew['id'], project_id)
+                        
+                        # Show success message
+                        st.success(f"{crew['name']} completed successfully!")
+                        st.markdown("### Result:")
+                        st.markdown(result.raw if hasattr(result, 'raw') else str(result))
+                        
+                        # A crew saves a document and updates its phase, so
+                        # refresh the whole page
+                        invalidate_sections('phases', 'documents', 'test_cases')
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error running crew: {str(e)}")
+        
+        # Note: The crew execution is now handled directly by the crew_manager.run_crew() method
+        # which creates the document and updates the phase status automatically
+
+# Tabs for different sections
+tabs = st.tabs(["Phases & Tasks", "Documents", "Test Cases", "AI Crews"])
+
+with tabs[0]:
+    phases_fragment()
+
+with tabs[1]:
+    documents_fragment()
+
+with tabs[2]:
+    test_cases_fragment()
+
+with tabs[3]:
+    crews_fragment()
+
+page_span.end()
+page_metrics.end()
 
 # Footer
 st.markdown("---")
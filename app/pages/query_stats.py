@@ -0,0 +1,119 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config.settings import QUERY_STATS_ENABLED, QUERY_SLOW_MS
+from database.db_manager import DatabaseManager
+
+# Initialize the database manager
+db = DatabaseManager()
+
+# Page configuration
+st.set_page_config(
+    page_title="Query Statistics - AI-Powered Business/Systems Analyst",
+    page_icon="🤖",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #1E88E5;
+        margin-bottom: 1rem;
+    }
+    .sub-header {
+        font-size: 1.5rem;
+        font-weight: 600;
+        color: #424242;
+        margin-bottom: 1rem;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+def full_scans(plan):
+    """Get the steps of a query plan that scan a whole table without an index"""
+    return [step.strip() for step in (plan or "").splitlines()
+            if step.strip().startswith("SCAN") and "INDEX" not in step]
+
+# Sidebar
+with st.sidebar:
+    st.image("https://img.icons8.com/color/96/000000/artificial-intelligence.png", width=80)
+    st.markdown("<h1 style='font-size: 1.5rem;'>AI-Powered SDLC</h1>", unsafe_allow_html=True)
+    st.markdown("---")
+
+    # Navigation
+    if st.button("Back to Projects"):
+        st.switch_page("main.py")
+
+    if st.button("Reset Statistics"):
+        db.reset_query_stats()
+        st.success("Query statistics reset.")
+
+st.markdown("<h1 class='main-header'>Query Statistics</h1>", unsafe_allow_html=True)
+
+if not QUERY_STATS_ENABLED:
+    st.info("Query statistics are disabled. Set QUERY_STATS_ENABLED=true to record them.")
+
+stats = db.get_query_stats()
+slow_queries = db.get_slow_queries()
+
+# Summary
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Statements", len(stats))
+col2.metric("Executions", sum(item['calls'] for item in stats))
+col3.metric("Total Time (s)", f"{sum(item['total_ms'] for item in stats) / 1000:.2f}")
+col4.metric(f"Slow Queries (≥ {QUERY_SLOW_MS:.0f} ms)", len(slow_queries))
+
+# Per-statement statistics
+st.markdown("<h2 class='sub-header'>Statements by Total Time</h2>", unsafe_allow_html=True)
+
+if stats:
+    stats_df = pd.DataFrame(stats)
+    stats_df['share'] = (stats_df['total_ms'] / stats_df['total_ms'].sum() * 100).round(1)
+    for column in ['total_ms', 'avg_ms', 'max_ms', 'avg_rows']:
+        stats_df[column] = stats_df[column].round(2)
+    st.dataframe(
+        stats_df[['statement', 'calls', 'total_ms', 'share', 'avg_ms', 'max_ms', 'avg_rows', 'last_caller']].rename(columns={
+            'statement': 'Statement',
+            'calls': 'Calls',
+            'total_ms': 'Total (ms)',
+            'share': 'Share (%)',
+            'avg_ms': 'Avg (ms)',
+            'max_ms': 'Max (ms)',
+            'avg_rows': 'Avg Rows',
+            'last_caller': 'Last Caller'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+else:
+    st.info("No statements recorded yet.")
+
+# Slow query log
+st.markdown("<h2 class='sub-header'>Slow Queries</h2>", unsafe_allow_html=True)
+
+if slow_queries:
+    for query in slow_queries:
+        scans = full_scans(query['plan'])
+        label = f"{query['duration_ms']:.1f} ms - {query['statement'][:100]}"
+        if scans:
+            label = "⚠️ " + label
+        with st.expander(label, expanded=False):
+            st.markdown(f"**When:** {query['created_at']} | **Rows:** {query['rows']} | **Caller:** `{query['caller']}`")
+            st.code(query['statement'], language="sql")
+            if query['params']:
+                st.markdown(f"**Parameters:** `{query['params']}`")
+            if query['plan']:
+                st.markdown("**Query plan:**")
+                st.code(query['plan'], language=None)
+            if scans:
+                st.warning("Full table scan without an index: " + "; ".join(scans))
+else:
+    st.info("No slow queries recorded.")
@@ -0,0 +1,168 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from datetime import datetime
+import sys
+import os
+
+# Add the project root to the path so we can import our modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from config.settings import TRACING_ENABLED, TRACE_FILE
+from utils.tracing import load_traces, flame_rows
+
+# Page configuration
+st.set_page_config(
+    page_title="Traces - AI-Powered Business/Systems Analyst",
+    page_icon="🤖",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #1E88E5;
+        margin-bottom: 1rem;
+    }
+    .sub-header {
+        font-size: 1.5rem;
+        font-weight: 600;
+        color: #424242;
+        margin-bottom: 1rem;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# Colors of the span layers in the flame graph
+LAYER_COLORS = {
+    'page': '#1E88E5',
+    'http': '#1E88E5',
+    'db': '#43A047',
+    'convert': '#8E24AA',
+    'crew': '#FFA000',
+    'crewai': '#FB8C00',
+    'task': '#F4511E',
+    'llm': '#E53935',
+}
+
+def span_layer(name):
+    """Get the layer of a span from its name, e.g. "db" for "db.get_project" """
+    return name.split(' ')[0].split('.')[0]
+
+# Sidebar
+with st.sidebar:
+    st.image("https://img.icons8.com/color/96/000000/artificial-intelligence.png", width=80)
+    st.markdown("<h1 style='font-size: 1.5rem;'>AI-Powered SDLC</h1>", unsafe_allow_html=True)
+    st.markdown("---")
+
+    # Navigation
+    if st.button("Back to Projects"):
+        st.switch_page("main.py")
+
+    trace_limit = st.number_input("Traces to load", min_value=10, max_value=5000, value=200, step=50)
+    min_duration = st.number_input("Minimum duration (ms)", min_value=0, value=0, step=100)
+
+st.markdown("<h1 class='main-header'>Traces</h1>", unsafe_allow_html=True)
+
+if not TRACING_ENABLED:
+    st.info("Tracing is disabled. Set TRACING_ENABLED=true to record new traces.")
+
+traces = [trace for trace in load_traces(limit=int(trace_limit)) if trace['duration_ms'] >= min_duration]
+if not traces:
+    st.info(f"No traces found in {TRACE_FILE}.")
+    st.stop()
+
+# Recent traces
+st.markdown("<h2 class='sub-header'>Recent Traces</h2>", unsafe_allow_html=True)
+
+traces_df = pd.DataFrame([{
+    'Started': datetime.fromtimestamp(trace['start_ns'] / 1e9).strftime('%Y-%m-%d %H:%M:%S'),
+    'Trace': trace['name'],
+    'Duration (ms)': round(trace['duration_ms'], 1),
+    'Spans': len(trace['spans']),
+    'Errors': sum(1 for item in trace['spans'] if item['error']),
+    'ID': trace['trace_id']
+} for trace in traces])
+st.dataframe(traces_df, use_container_width=True, hide_index=True)
+
+slowest_first = st.checkbox("Sort by duration", value=True)
+choices = sorted(traces, key=lambda trace: trace['duration_ms'], reverse=True) if slowest_first else traces
+selected = st.selectbox(
+    "Select a trace",
+    choices,
+    format_func=lambda trace: f"{trace['name']} - {trace['duration_ms']:.1f} ms "
+                              f"({datetime.fromtimestamp(trace['start_ns'] / 1e9).strftime('%H:%M:%S')})"
+)
+
+rows = flame_rows(selected['spans'])
+
+# Flame graph: one bar per span, placed at its start offset, children below their parent
+st.markdown("<h2 class='sub-header'>Flame View</h2>", unsafe_allow_html=True)
+
+fig = go.Figure()
+for layer in dict.fromkeys(span_layer(row['name']) for row in rows):
+    layer_rows = [row for row in rows if span_layer(row['name']) == layer]
+    fig.add_trace(go.Bar(
+        name=layer,
+        orientation='h',
+        base=[row['offset_ms'] for row in layer_rows],
+        x=[max(row['duration_ms'], 0.01) for row in layer_rows],
+        y=[row['depth'] for row in layer_rows],
+        text=[row['name'] for row in layer_rows],
+        textposition='inside',
+        insidetextanchor='start',
+        marker_color=LAYER_COLORS.get(layer, '#9E9E9E'),
+        marker_line_color=['#B71C1C' if row['error'] else 'white' for row in layer_rows],
+        marker_line_width=1,
+        customdata=[[row['duration_ms'], row['self_ms'], row['error'] or ""] for row in layer_rows],
+        hovertemplate="%{text}<br>start %{base:.1f} ms<br>duration %{customdata[0]:.1f} ms"
+                      "<br>self %{customdata[1]:.1f} ms<br>%{customdata[2]}<extra></extra>"
+    ))
+
+max_depth = max(row['depth'] for row in rows)
+fig.update_layout(
+    barmode='overlay',
+    bargap=0.05,
+    height=max(250, 40 * (max_depth + 1) + 100),
+    xaxis_title="Time since start (ms)",
+    yaxis=dict(autorange='reversed', showticklabels=False, title=None),
+    margin=dict(l=10, r=10, t=30, b=40),
+    legend_title_text="Layer"
+)
+st.plotly_chart(fig, use_container_width=True)
+
+# Where the time went
+col1, col2 = st.columns(2)
+
+with col1:
+    st.markdown("<h2 class='sub-header'>Time by Layer</h2>", unsafe_allow_html=True)
+    layer_df = pd.DataFrame([{'Layer': span_layer(row['name']), 'Self Time (ms)': row['self_ms']} for row in rows])
+    layer_df = layer_df.groupby('Layer', as_index=False).sum().sort_values('Self Time (ms)', ascending=False)
+    layer_df['Self Time (ms)'] = layer_df['Self Time (ms)'].round(1)
+    st.dataframe(layer_df, use_container_width=True, hide_index=True)
+
+with col2:
+    st.markdown("<h2 class='sub-header'>Slowest Spans</h2>", unsafe_allow_html=True)
+    spans_df = pd.DataFrame([{
+        'Span': row['name'],
+        'Calls': 1,
+        'Total (ms)': row['duration_ms'],
+        'Self (ms)': row['self_ms']
+    } for row in rows])
+    spans_df = spans_df.groupby('Span', as_index=False).sum().sort_values('Self (ms)', ascending=False)
+    spans_df[['Total (ms)', 'Self (ms)']] = spans_df[['Total (ms)', 'Self (ms)']].round(1)
+    st.dataframe(spans_df.head(20), use_container_width=True, hide_index=True)
+
+# Span details
+with st.expander("Span Details", expanded=False):
+    st.dataframe(pd.DataFrame([{
+        'Span': "  " * row['depth'] + row['name'],
+        'Start (ms)': round(row['offset_ms'], 1),
+        'Duration (ms)': round(row['duration_ms'], 1),
+        'Self (ms)': round(row['self_ms'], 1),
+        'Error': row['error'] or "",
+        'Attributes': ", ".join(f"{key}={value}" for key, value in row['attributes'].items())
+    } for row in rows]), use_container_width=True, hide_index=True)
@@ -0,0 +1,77 @@
+import argparse
+import sys
+from datetime import datetime
+
+from config.settings import BACKUP_DIR, BACKUP_INTERVAL_MINUTES, BACKUP_KEEP, DATABASE_URL
+from database.backends import get_backend
+from database.backup import BackupScheduler, create_snapshot, find_snapshot, list_snapshots, restore_snapshot
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Back up and restore the projects database")
+    parser.add_argument("--db-path", help="Path to the SQLite database (default: the DATABASE_URL database)")
+    parser.add_argument("--backup-dir", default=BACKUP_DIR, help="Directory the snapshots are kept in")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="Number of snapshots to keep (0 keeps all)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("backup", help="Take a snapshot now")
+    subparsers.add_parser("list", help="List the snapshots")
+
+    schedule_parser = subparsers.add_parser("schedule", help="Take a snapshot at a regular interval")
+    schedule_parser.add_argument("--every", type=float, default=BACKUP_INTERVAL_MINUTES, help="Minutes between snapshots")
+
+    restore_parser = subparsers.add_parser("restore", help="Restore the database from a snapshot")
+    restore_parser.add_argument("snapshot", nargs="?", help="Snapshot file to restore (defaults to the newest)")
+    restore_parser.add_argument("--at", help="Restore the newest snapshot taken at or before this time, "
+                                             "e.g. '2025-01-31 18:00'")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.db_path is None:
+        backend = get_backend(DATABASE_URL)
+        if backend.name != 'sqlite':
+            print(f"Error: only SQLite databases can be backed up; use the tools of your {backend.name} server")
+            return 1
+        args.db_path = backend.path
+
+    if args.command == "backup":
+        result = create_snapshot(args.db_path, args.backup_dir, args.keep)
+        print(f"Backup {result['path']} written ({result['size'] / 1024:,.0f} KiB in {result['duration']:.1f}s).")
+        return 0
+
+    if args.command == "list":
+        snapshots = list_snapshots(args.db_path, args.backup_dir)
+        if not snapshots:
+            print(f"No snapshots in {args.backup_dir}.")
+        for snapshot in snapshots:
+            print(f"{snapshot['taken_at']:%Y-%m-%d %H:%M:%S}  {snapshot['size'] / 1024:>10,.0f} KiB  {snapshot['path']}")
+        return 0
+
+    if args.command == "schedule":
+        scheduler = BackupScheduler(args.db_path, args.backup_dir, args.every * 60, args.keep)
+        print(f"Taking a snapshot of {args.db_path} every {args.every:g} minutes. Press Ctrl+C to stop.")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    snapshot_path = args.snapshot
+    if snapshot_path is None:
+        at = datetime.fromisoformat(args.at) if args.at else None
+        snapshot = find_snapshot(args.db_path, args.backup_dir, at)
+        if snapshot is None:
+            print("No matching snapshot found.")
+            return 1
+        snapshot_path = snapshot['path']
+
+    previous = restore_snapshot(snapshot_path, args.db_path, args.backup_dir)
+    print(f"Restored {args.db_path} from {snapshot_path}.")
+    if previous:
+        print(f"The previous content was saved as {previous}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
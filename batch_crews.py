@@ -0,0 +1,71 @@
+import argparse
+import sys
+from datetime import datetime
+
+from config.settings import BATCH_CREW_WORKERS, LLM_RATE_LIMIT_RPM
+from crews.batch_runner import BatchCrewRunner
+from crews.crew_jobs import CREW_TYPES
+from database.db_manager import DatabaseManager
+from utils.metrics import start_metrics_server
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run AI crews for many projects in parallel")
+    parser.add_argument("project_ids", nargs="*", type=int, help="IDs of the projects to run crews for")
+    parser.add_argument("--all", action="store_true", help="Run crews for all projects")
+    parser.add_argument("--status", help="Run crews for all projects with this status")
+    parser.add_argument("--crews", nargs="+", choices=CREW_TYPES, default=["requirements"],
+                        help="Crew types to run; they run in SDLC order for each project")
+    parser.add_argument("--batch-id", help="Name of the batch (defaults to a timestamp)")
+    parser.add_argument("--resume", metavar="BATCH_ID",
+                        help="Rerun the failed, skipped and unfinished runs of an earlier batch")
+    parser.add_argument("--list", action="store_true", help="List earlier batches and exit")
+    parser.add_argument("--workers", type=int, default=BATCH_CREW_WORKERS, help="Number of worker processes")
+    parser.add_argument("--rate-limit", type=int, default=LLM_RATE_LIMIT_RPM,
+                        help="LLM requests per minute shared by all workers (0 for no limit)")
+    parser.add_argument("--attempts", type=int, default=2, help="Attempts per run before it counts as failed")
+    parser.add_argument("--db-path", help="SQLite database path or database URL (default: DATABASE_URL)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    db = DatabaseManager(args.db_path)
+
+    if args.list:
+        for batch in db.get_crew_batches():
+            print(f"{batch['batch_id']}: {batch['completed']}/{batch['runs']} completed, {batch['failed']} failed "
+                  f"(started {batch['created_at']}, last update {batch['updated_at']})")
+        return 0
+
+    # Expose queue depth and run durations while the batch runs
+    start_metrics_server()
+    runner = BatchCrewRunner(args.db_path, workers=args.workers, rate_limit_rpm=args.rate_limit,
+                             max_attempts=args.attempts)
+
+    if args.resume:
+        if not db.get_crew_batch_runs(args.resume):
+            print(f"Batch {args.resume} not found.")
+            return 1
+        counts = runner.run(args.resume)
+        return 1 if counts['Failed'] else 0
+
+    if args.all or args.status:
+        projects = list(db.iter_projects(args.status))
+    else:
+        projects = [p for p in (db.get_project(project_id) for project_id in args.project_ids) if p]
+        missing = set(args.project_ids) - {p['id'] for p in projects}
+        for project_id in sorted(missing):
+            print(f"Warning: project {project_id} not found, skipping.")
+
+    if not projects:
+        print("No projects to run crews for.")
+        return 1
+
+    batch_id = args.batch_id or datetime.now().strftime('batch-%Y%m%d-%H%M%S')
+    counts = runner.run(batch_id, [p['id'] for p in projects], args.crews)
+    if counts['Failed']:
+        print(f"Retry the failed runs with: python batch_crews.py --resume {batch_id}")
+    return 1 if counts['Failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+# Add the project root to the path so we can import our modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from database.db_manager import DatabaseManager
+from app.components.page_data import load_dashboard, load_project_phases
+from benchmarks.synthetic_data import SyntheticDataConfig, populate_database
+from utils.document_converter import preconvert_project_documents
+from utils.helpers import format_dates
+
+RESULTS_FORMAT_VERSION = 1
+
+def load_project_snapshot(db, project_id):
+    """Load everything the Project Details page reads for a project"""
+    project = db.get_project(project_id)
+    phases, tasks_by_phase = load_project_phases(db, project_id)
+    documents = db.get_documents(project_id)
+    markdown = preconvert_project_documents(db, project_id, documents)
+    test_cases = db.get_test_cases(project_id)
+    return project, phases, tasks_by_phase, documents, markdown, test_cases
+
+def load_dashboard_page(db):
+    """Load what the live Dashboard page shows and format its tables as the page does"""
+    dashboard = load_dashboard(db)
+    if dashboard['projects']:
+        df_projects = pd.DataFrame(dashboard['projects']).head(5)
+        df_projects['created_at'] = format_dates(df_projects['created_at'], '%Y-%m-%d').values
+    if dashboard['overdue_tasks']:
+        df_overdue = pd.DataFrame(dashboard['overdue_tasks'])
+        df_overdue['due_date'] = format_dates(df_overdue['due_date'], '%Y-%m-%d').values
+    if dashboard['stalled_phases']:
+        df_stalled = pd.DataFrame(dashboard['stalled_phases'])
+        df_stalled['stalled_since'] = format_dates(df_stalled['stalled_since'], '%Y-%m-%d').values
+    status_counts = {}
+    for p in dashboard['projects']:
+        status_counts[p['status']] = status_counts.get(p['status'], 0) + 1
+    return status_counts
+
+class BenchmarkContext:
+    """Random inputs shared by the benchmarks of one database"""
+
+    def __init__(self, db, seed):
+        self.db = db
+        self.seed = seed
+        self.rng = random.Random(seed)
+        conn = db._get_connection()
+        try:
+            self.project_ids = [row[0] for row in conn.execute("SELECT id FROM projects").fetchall()]
+            self.phase_ids = [row[0] for row in conn.execute("SELECT id FROM phases").fetchall()]
+            self.task_ids = [row[0] for row in conn.execute("SELECT id FROM tasks").fetchall()]
+            self.test_ids = [row[0] for row in conn.execute("SELECT id FROM test_cases").fetchall()]
+            self.document_ids = [row[0] for row in conn.execute("SELECT id FROM documents").fetchall()]
+        finally:
+            conn.close()
+
+    def reseed(self, name):
+        """Restart the random inputs, so a benchmark gets the same inputs whichever others run"""
+        self.rng.seed(f"{self.seed}-{name}")
+
+    def project_id(self):
+        return self.rng.choice(self.project_ids)
+
+    def phase_id(self):
+        return self.rng.choice(self.phase_ids)
+
+    def task_id(self):
+        return self.rng.choice(self.task_ids)
+
+    def test_id(self):
+        return self.rng.choice(self.test_ids)
+
+    def document_id(self):
+        return self.rng.choice(self.document_ids)
+
+class _NullWriter:
+    """Text file object that discards everything written to it"""
+
+    def write(self, text):
+        return len(text)
+
+# Benchmarks as (name, default number of runs, function taking the context)
+BENCHMARKS = [
+    ("get_projects", 5, lambda ctx: ctx.db.get_projects()),
+    ("get_project", 200, lambda ctx: ctx.db.get_project(ctx.project_id())),
+    ("get_phases", 200, lambda ctx: ctx.db.get_phases(ctx.project_id())),
+    ("get_tasks", 200, lambda ctx: ctx.db.get_tasks(ctx.phase_id())),
+    ("get_documents", 200, lambda ctx: ctx.db.get_documents(ctx.project_id())),
+    ("get_document", 200, lambda ctx: ctx.db.get_document(ctx.document_id())),
+    ("get_latest_document", 200, lambda ctx: ctx.db.get_latest_document(ctx.project_id(), "Requirements")),
+    ("get_test_cases", 200, lambda ctx: ctx.db.get_test_cases(ctx.project_id())),
+    ("create_project", 100, lambda ctx: ctx.db.create_project("Benchmark Project", "Created by the benchmark suite")),
+    ("update_project", 100, lambda ctx: ctx.db.update_project(ctx.project_id(), status="In Progress")),
+    ("create_phase", 100, lambda ctx: ctx.db.create_phase(ctx.project_id(), "Benchmark Phase", "")),
+    ("update_phase", 100, lambda ctx: ctx.db.update_phase(ctx.phase_id(), status="Completed")),
+    ("create_task", 100, lambda ctx: ctx.db.create_task(ctx.phase_id(), "Benchmark Task", "")),
+    ("update_task", 100, lambda ctx: ctx.db.update_task(ctx.task_id(), status="Completed")),
+    ("create_test_case", 100, lambda ctx: ctx.db.create_test_case(ctx.project_id(), "Benchmark Test", "", "Passes")),
+    ("update_test_case", 100, lambda ctx: ctx.db.update_test_case(ctx.test_id(), status="Passed")),
+    ("create_document", 50, lambda ctx: ctx.db.create_document(ctx.project_id(), "Benchmark Document", "# Benchmark\n", "Other")),
+    ("save_document", 50, lambda ctx: ctx.db.save_document(
+        ctx.project_id(), "Requirements Document", f"# Requirements\n\nRevision {ctx.rng.random()}\n", "Requirements")),
+    ("get_document_revisions", 100, lambda ctx: ctx.db.get_document_revisions(ctx.document_id())),
+    ("export_jsonl_100_projects", 5, lambda ctx: ctx.db.export_jsonl(
+        _NullWriter(), ctx.rng.sample(ctx.project_ids, min(100, len(ctx.project_ids))))),
+    ("project_snapshot_page", 50, lambda ctx: load_project_snapshot(ctx.db, ctx.project_id())),
+    ("dashboard_page", 5, lambda ctx: load_dashboard_page(ctx.db)),
+]
+
+# Benchmarks that change the database; the working copy is restored from the
+# generated database after each of them, so every benchmark sees the same data
+WRITING_BENCHMARKS = {
+    "create_project", "update_project", "create_phase", "update_phase", "create_task", "update_task",
+    "create_test_case", "update_test_case", "create_document", "save_document",
+    # Stores external IDs for rows that have none
+    "export_jsonl_100_projects",
+}
+
+def time_benchmark(function, ctx, runs):
+    """Time a benchmark and summarize the durations in milliseconds"""
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function(ctx)
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    return {
+        'runs': runs,
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'median_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+        'min_ms': round(durations[0], 3),
+        'max_ms': round(durations[-1], 3)
+    }
+
+def prepare_database(size, args):
+    """
+    Create (or reuse) a database filled with synthetic data of the given size
+
+    The generated database is never benchmarked itself; see restore_working_copy.
+
+    Returns:
+        tuple: (path of the database, seconds spent generating it or None if reused)
+    """
+    db_path = os.path.join(args.data_dir, f"bench-{size}-{args.seed}.db")
+    if os.path.exists(db_path) and not args.regenerate:
+        # Bring the schema of an older database up to date
+        DatabaseManager(db_path)
+        return db_path, None
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    db = DatabaseManager(db_path)
+    config = SyntheticDataConfig(
+        projects=size,
+        seed=args.seed,
+        doc_length_median=args.doc_length_median,
+        doc_length_sigma=args.doc_length_sigma
+    )
+    started = time.perf_counter()
+    populate_database(db, config)
+    return db_path, round(time.perf_counter() - started, 3)
+
+def restore_working_copy(source_path, working_path):
+    """
+    Overwrite the database the benchmarks run on with the generated one
+
+    Uses the SQLite online backup API, so connections the benchmarks keep
+    open (such as the write queue's) see the restored data.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(working_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def compare_results(results, baseline_path):
+    """Print how the results compare to an earlier results file"""
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    previous = {(r['size'], r['benchmark']): r for r in baseline['results']}
+
+    print(f"\n{'size':>8}  {'benchmark':<28} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for result in results:
+        before = previous.get((result['size'], result['benchmark']))
+        if not before:
+            continue
+        change = (result['median_ms'] / before['median_ms'] - 1) * 100 if before['median_ms'] else 0
+        print(f"{result['size']:>8}  {result['benchmark']:<28} {before['median_ms']:>10.3f} "
+              f"{result['median_ms']:>10.3f} {change:>+7.1f}%")
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseManager and page loads on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Numbers of projects to test with")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for data generation and inputs")
+    parser.add_argument("--runs", type=float, default=1.0, help="Multiplier for the number of runs per benchmark")
+    parser.add_argument("--only", nargs="*", help="Names of the benchmarks to run")
+    parser.add_argument("--doc-length-median", type=int, default=3000, help="Median document length in characters")
+    parser.add_argument("--doc-length-sigma", type=float, default=1.0, help="Spread of the log-normal document length")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "sdlc-benchmarks"),
+                        help="Directory for the generated databases, reused across runs (benchmarks run on a copy)")
+    parser.add_argument("--regenerate", action="store_true", help="Regenerate the databases even if they exist")
+    parser.add_argument("--output", default="bench_results.json", help="File to write the JSON results to")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = []
+    setup = {}
+
+    for size in args.sizes:
+        print(f"Preparing database with {size} projects...")
+        db_path, generate_seconds = prepare_database(size, args)
+        setup[str(size)] = {'db_path': db_path, 'generate_seconds': generate_seconds}
+        working_path = os.path.join(args.data_dir, f"bench-{size}-{args.seed}-working.db")
+        restore_working_copy(db_path, working_path)
+        db = DatabaseManager(working_path)
+        ctx = BenchmarkContext(db, args.seed)
+        changed = False
+
+        for name, runs, function in BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+            if changed:
+                restore_working_copy(db_path, working_path)
+            changed = name in WRITING_BENCHMARKS
+            ctx.reseed(name)
+            runs = max(1, int(runs * args.runs))
+            result = {'size': size, 'benchmark': name}
+            result.update(time_benchmark(function, ctx, runs))
+            results.append(result)
+            print(f"{size:>8}  {name:<28} median {result['median_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms")
+
+    output = {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform()
+        },
+        'config': {
+            'seed': args.seed,
+            'sizes': args.sizes,
+            'doc_length_median': args.doc_length_median,
+            'doc_length_sigma': args.doc_length_sigma
+        },
+        'setup': setup,
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(output, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+
+if __name__ == "__main__":
+    main()
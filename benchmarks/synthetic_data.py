@@ -0,0 +1,139 @@
+import random
+from datetime import datetime, timedelta
+
+PHASE_NAMES = [
+    "Requirements Analysis",
+    "System Design",
+    "Implementation",
+    "Testing",
+    "Deployment",
+    "Maintenance"
+]
+
+DOC_TYPES = ["Requirements", "Design", "Testing", "Implementation", "User Manual"]
+
+WORDS = (
+    "system user account order payment report dashboard service data access role "
+    "request response validate create update delete notify schedule inventory customer "
+    "product delivery secure audit performance latency availability integration api "
+    "module component interface workflow approval review release deploy monitor"
+).split()
+
+class SyntheticDataConfig:
+    """Sizes and distributions of generated data"""
+
+    def __init__(self, projects=1000, seed=42, phases_per_project=6, tasks_per_phase=(0, 8),
+                 documents_per_project=(0, 3), test_cases_per_project=(0, 20),
+                 doc_length_median=3000, doc_length_sigma=1.0, doc_length_max=200_000):
+        self.projects = projects
+        self.seed = seed
+        self.phases_per_project = phases_per_project
+        self.tasks_per_phase = tasks_per_phase
+        self.documents_per_project = documents_per_project
+        self.test_cases_per_project = test_cases_per_project
+        # Document lengths follow a log-normal distribution, like LLM outputs
+        self.doc_length_median = doc_length_median
+        self.doc_length_sigma = doc_length_sigma
+        self.doc_length_max = doc_length_max
+
+def _sentence(rng, words=12):
+    """Generate a random sentence"""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def _document_content(rng, length):
+    """Generate a Markdown document of roughly the given length"""
+    parts = []
+    size = 0
+    section = 1
+    while size < length:
+        heading = f"## {section}. {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}\n\n"
+        paragraph = " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(2, 6))) + "\n\n"
+        parts.append(heading)
+        parts.append(paragraph)
+        size += len(heading) + len(paragraph)
+        section += 1
+    return "".join(parts)[:length]
+
+def _timestamp(base, rng, max_days):
+    """Get a random timestamp string within max_days after base"""
+    return (base + timedelta(seconds=rng.randint(0, max_days * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+def generate_projects(config):
+    """
+    Generate project records in the DatabaseManager.import_records format
+
+    The same config (including seed) always produces the same data.
+
+    Args:
+        config (SyntheticDataConfig): Sizes and distributions to generate
+
+    Yields:
+        dict: One project with nested phases, tasks, documents and test cases
+    """
+    rng = random.Random(config.seed)
+    start = datetime(2023, 1, 1)
+    statuses = ["Not Started", "In Progress", "Completed", "Delayed"]
+    status_weights = [3, 4, 2, 1]
+
+    for index in range(config.projects):
+        created_at = _timestamp(start, rng, 720)
+        project = {
+            'external_id': f"synthetic-{config.seed}-{index}",
+            'name': f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()} Platform {index}",
+            'description': _sentence(rng, 25),
+            'status': rng.choices(statuses, status_weights)[0],
+            'created_at': created_at,
+            'updated_at': created_at,
+            'phases': [],
+            'documents': [],
+            'test_cases': []
+        }
+
+        for phase_name in PHASE_NAMES[:config.phases_per_project]:
+            phase_start = datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S')
+            project['phases'].append({
+                'name': phase_name,
+                'description': _sentence(rng),
+                'status': rng.choices(statuses, status_weights)[0],
+                'start_date': _timestamp(phase_start, rng, 60),
+                'tasks': [
+                    {
+                        'name': f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}",
+                        'description': _sentence(rng),
+                        'status': rng.choices(statuses, status_weights)[0],
+                        'assigned_to': rng.choice([None, "Alice", "Bob", "Carol", "Dan"]),
+                        'due_date': _timestamp(phase_start, rng, 120)[:10]
+                    }
+                    for _ in range(rng.randint(*config.tasks_per_phase))
+                ]
+            })
+
+        for doc_index in range(rng.randint(*config.documents_per_project)):
+            doc_type = DOC_TYPES[doc_index % len(DOC_TYPES)]
+            length = int(min(config.doc_length_max, rng.lognormvariate(0, config.doc_length_sigma) * config.doc_length_median))
+            project['documents'].append({
+                'name': f"{doc_type} Document",
+                'doc_type': doc_type,
+                'content': _document_content(rng, max(1, length)),
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+
+        for _ in range(rng.randint(*config.test_cases_per_project)):
+            project['test_cases'].append({
+                'name': f"Verify {rng.choice(WORDS)} {rng.choice(WORDS)}",
+                'description': _sentence(rng),
+                'expected_result': _sentence(rng, 8),
+                'status': rng.choices(["Not Run", "Passed", "Failed"], [3, 5, 1])[0]
+            })
+
+        yield project
+
+def populate_database(db, config, chunk_size=1000, progress=None):
+    """
+    Fill a database with synthetic projects
+
+    Returns:
+        int: Number of generated projects
+    """
+    return db.import_records(generate_projects(config), chunk_size=chunk_size, progress=progress)
@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+import time
+
+from config.settings import CHANGES_RETENTION_DAYS
+from database.db_manager import DatabaseManager
+
+# Changes read per poll
+BATCH_SIZE = 1000
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Read and compact the database change feed")
+    parser.add_argument("--db-path", help="SQLite database path or database URL (default: DATABASE_URL)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tail_parser = subparsers.add_parser("tail", help="Print changes as JSON lines")
+    tail_parser.add_argument("--since", type=int, help="Print changes after this sequence number "
+                                                       "(default: only changes made from now on)")
+    tail_parser.add_argument("--table", action="append", help="Only print changes to this table (repeatable)")
+    tail_parser.add_argument("--follow", action="store_true", help="Keep printing new changes")
+    tail_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls with --follow")
+
+    compact_parser = subparsers.add_parser("compact", help="Remove superseded and old changes")
+    compact_parser.add_argument("--retention-days", type=float, default=CHANGES_RETENTION_DAYS,
+                                help="Days changes are kept")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    db = DatabaseManager(args.db_path)
+
+    if args.command == "compact":
+        result = db.compact_changes(args.retention_days)
+        print(f"Removed {result['collapsed']} superseded and {result['trimmed']} old changes.")
+        return 0
+
+    seq = db.latest_change_seq() if args.since is None else args.since
+    try:
+        while True:
+            feed = db.changes_since(seq, BATCH_SIZE, args.table)
+            if feed['reset']:
+                print(f"Changes after {seq} were compacted away; continuing from {feed['last_seq']}.", file=sys.stderr)
+            for change in feed['changes']:
+                print(json.dumps(change), flush=True)
+            seq = feed['last_seq']
+            if len(feed['changes']) < BATCH_SIZE:
+                if not args.follow:
+                    return 0
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
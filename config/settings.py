@@ -1,4 +1,5 @@
 import os
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -21,9 +22,145 @@ DEBUG = os.getenv('DEBUG', 'False').lower() in ('true', '1', 't')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 DEFAULT_AI_MODEL = os.getenv('DEFAULT_AI_MODEL', 'gpt-4')
 
-# Database settings
+# LLM model tiers. The standard tier is GEMINI_MODEL; the small and large
+# tiers fall back to it when not configured.
+LLM_API_KEY = os.getenv('GEMINI_API_KEY', '')
+LLM_MODEL_TIERS = {
+    'small': os.getenv('GEMINI_MODEL_SMALL') or os.getenv('GEMINI_MODEL'),
+    'standard': os.getenv('GEMINI_MODEL'),
+    'large': os.getenv('GEMINI_MODEL_LARGE') or os.getenv('GEMINI_MODEL'),
+}
+LLM_TIER_ORDER = ['small', 'standard', 'large']
+
+# Model tier per route. A route is a task name or an agent role; routes not
+# listed use the standard tier. Override with a JSON object in LLM_ROUTES.
+LLM_ROUTES = {
+    'gather_requirements': 'standard',
+    'validate_requirements': 'small',
+    'document_requirements': 'standard',
+    'design_architecture': 'large',
+    'design_database': 'standard',
+    'design_ui': 'standard',
+    'create_test_plan': 'standard',
+    'design_test_cases': 'standard',
+    'execute_tests': 'small',
+}
+LLM_ROUTES.update(json.loads(os.getenv('LLM_ROUTES', '{}')))
+
+# Task outputs shorter than this fail validation and are retried on the
+# next larger model tier
+LLM_MIN_OUTPUT_CHARS = int(os.getenv('LLM_MIN_OUTPUT_CHARS', '200'))
+
+# Seconds before a single LLM request times out
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '120'))
+
+# After this many consecutive failed calls a model's circuit breaker opens
+# and calls fail immediately; a probe call is let through after the reset time
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+
+# Routes whose LLM calls get a hedged duplicate request when they run longer
+# than this percentile of the model's recent latencies (comma separated)
+LLM_HEDGE_ROUTES = [route.strip() for route in os.getenv('LLM_HEDGE_ROUTES', '').split(',') if route.strip()]
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+
+# Seconds a crew run's lease stays valid without being renewed. Identical
+# crew requests made while the lease is held wait for that run's result.
+CREW_LEASE_TTL = int(os.getenv('CREW_LEASE_TTL', '120'))
+# Hours finished or expired crew leases are kept before they are deleted
+CREW_LEASE_RETENTION_HOURS = float(os.getenv('CREW_LEASE_RETENTION_HOURS', '24'))
+
+# LLM requests per minute allowed for the whole account (0 for no limit).
+# Batch crew runs split it evenly between their worker processes.
+LLM_RATE_LIMIT_RPM = int(os.getenv('LLM_RATE_LIMIT_RPM', '0'))
+
+# Worker processes used by batch crew runs
+BATCH_CREW_WORKERS = int(os.getenv('BATCH_CREW_WORKERS', '4'))
+
+# Database settings. DATABASE_URL is a sqlite:/// URL (the default) or a
+# postgresql:// URL; PostgreSQL connections come from a pool of
+# DATABASE_POOL_SIZE per process, waited for up to DATABASE_POOL_TIMEOUT seconds.
 DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{DATABASE_PATH}')
+DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '10'))
+DATABASE_POOL_TIMEOUT = float(os.getenv('DATABASE_POOL_TIMEOUT', '30'))
+
+# Write queue. High-frequency writes (LLM route metrics, lease heartbeats,
+# batch progress) go through one writer thread per process, which commits
+# everything queued within WRITE_QUEUE_WINDOW_MS in one transaction of at most
+# WRITE_QUEUE_MAX_BATCH writes. With WRITE_QUEUE_MAX_PENDING writes waiting,
+# writers block for up to WRITE_QUEUE_PUT_TIMEOUT seconds before failing.
+WRITE_QUEUE_WINDOW_MS = float(os.getenv('WRITE_QUEUE_WINDOW_MS', '5'))
+WRITE_QUEUE_MAX_BATCH = int(os.getenv('WRITE_QUEUE_MAX_BATCH', '500'))
+WRITE_QUEUE_MAX_PENDING = int(os.getenv('WRITE_QUEUE_MAX_PENDING', '10000'))
+WRITE_QUEUE_PUT_TIMEOUT = float(os.getenv('WRITE_QUEUE_PUT_TIMEOUT', '5'))
+
+# Days changes are kept in the change feed by compaction (changes_feed.py compact)
+CHANGES_RETENTION_DAYS = float(os.getenv('CHANGES_RETENTION_DAYS', '7'))
+
+# Database backups: compressed snapshots are written to BACKUP_DIR every
+# BACKUP_INTERVAL_MINUTES by backup_db.py, keeping the newest BACKUP_KEEP
+BACKUP_DIR = os.getenv('BACKUP_DIR', os.path.join(DATA_DIR, 'backups'))
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '24'))
+BACKUP_INTERVAL_MINUTES = float(os.getenv('BACKUP_INTERVAL_MINUTES', '60'))
+
+# Analytics snapshots: analytics_snapshot.py writes projects, phases, tasks,
+# test cases and run metrics to Parquet files in ANALYTICS_DIR, split into
+# ANALYTICS_PARTITIONS partitions by project, every ANALYTICS_INTERVAL_MINUTES
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR', os.path.join(DATA_DIR, 'analytics'))
+ANALYTICS_PARTITIONS = int(os.getenv('ANALYTICS_PARTITIONS', '16'))
+ANALYTICS_INTERVAL_MINUTES = float(os.getenv('ANALYTICS_INTERVAL_MINUTES', '15'))
+
+# Flag sweeps: unfinished tasks past their due date are flagged overdue and
+# phases In Progress for STALLED_PHASE_DAYS without a status change are flagged
+# stalled. The Streamlit app sweeps every FLAG_SWEEP_INTERVAL_MINUTES (0 turns it off).
+STALLED_PHASE_DAYS = float(os.getenv('STALLED_PHASE_DAYS', '14'))
+FLAG_SWEEP_INTERVAL_MINUTES = float(os.getenv('FLAG_SWEEP_INTERVAL_MINUTES', '5'))
 
 # Streamlit settings
 STREAMLIT_PORT = int(os.getenv('STREAMLIT_PORT', '8501'))
-STREAMLIT_HOST = os.getenv('STREAMLIT_HOST', 'localhost')
\ No newline at end of file
+STREAMLIT_HOST = os.getenv('STREAMLIT_HOST', 'localhost')
+
+# Seconds the Project Details page caches the data of its sections. Sections
+# reload as soon as the change feed shows their data changed, here or in
+# another process; the TTL only bounds how long unused data stays cached.
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', '30'))
+
+# Maximum characters of a document shown per page in the Documents tab
+DOCUMENT_PAGE_CHARS = int(os.getenv('DOCUMENT_PAGE_CHARS', '20000'))
+
+# API server settings
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', '8000'))
+API_CREW_WORKERS = int(os.getenv('API_CREW_WORKERS', '2'))
+
+# Query statistics. When enabled, every statement run by DatabaseManager is
+# timed and aggregated in the query_stats table; statements slower than
+# QUERY_SLOW_MS are logged with their query plan in slow_queries.
+QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', 'False').lower() in ('true', '1', 't')
+QUERY_SLOW_MS = float(os.getenv('QUERY_SLOW_MS', '100'))
+QUERY_STATS_FLUSH_SECONDS = float(os.getenv('QUERY_STATS_FLUSH_SECONDS', '10'))
+
+# Prometheus metrics. Streamlit and batch processes serve them on
+# METRICS_ADDR:METRICS_PORT; the API server serves them at /metrics. The
+# exporter has no authentication, so it listens on localhost unless
+# METRICS_ADDR says otherwise (e.g. 0.0.0.0 for a scraper on another host).
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+METRICS_ADDR = os.getenv('METRICS_ADDR', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+
+# Tracing settings. Traces are appended to TRACE_FILE as OTLP/JSON lines,
+# which is moved to TRACE_FILE.1 once it grows past TRACE_FILE_MAX_BYTES.
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'False').lower() in ('true', '1', 't')
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(DATA_DIR, 'traces.jsonl'))
+TRACE_FILE_MAX_BYTES = int(os.getenv('TRACE_FILE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Phases created for every new project
+DEFAULT_PHASES = [
+    ("Requirements Analysis", "Gather and document project requirements"),
+    ("System Design", "Design the system architecture and components"),
+    ("Implementation", "Develop the system according to design specifications"),
+    ("Testing", "Test the system to ensure it meets requirements"),
+    ("Deployment", "Deploy the system to production"),
+    ("Maintenance", "Maintain and update the system as needed")
+]
@@ -1,13 +1,7 @@
-from crewai import Agent, LLM
-import os
+from crewai import Agent
 from langchain.tools import BaseTool
 from typing import List, Optional
-llm_model = os.getenv("GEMINI_MODEL")
-llm_api_key = os.getenv("GEMINI_API_KEY")
-llm = LLM(
-    model=llm_model,
-    api_key=llm_api_key
-)
+from crews.llm_router import get_router
 
 class SDLCAgents:
     """Factory class for creating SDLC agents"""
@@ -21,7 +15,7 @@ class SDLCAgents:
             backstory="You are an experienced business analyst with expertise in gathering and analyzing business requirements. "
                      "You excel at interviewing stakeholders, identifying pain points, and documenting clear requirements.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("gather_requirements"),
             verbose=True
         )
     
@@ -34,7 +28,7 @@ class SDLCAgents:
             backstory=f"You have deep knowledge of the {domain} domain with years of experience. "
                      f"You understand the specific challenges, regulations, and best practices in {domain}.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("validate_requirements"),
             verbose=True
         )
     
@@ -47,7 +41,7 @@ class SDLCAgents:
             backstory="You specialize in documenting requirements in a clear, structured format that can be easily understood by all stakeholders. "
                      "You know how to organize information logically and write unambiguous specifications.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("document_requirements"),
             verbose=True
         )
     
@@ -60,7 +54,7 @@ class SDLCAgents:
             backstory="You are a skilled system architect with experience in designing complex systems. "
                      "You understand various architectural patterns and can select the most appropriate one for a given problem.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("design_architecture"),
             verbose=True
         )
     
@@ -73,7 +67,7 @@ class SDLCAgents:
             backstory="You specialize in database design and optimization. "
                      "You understand relational database principles, normalization, and can create efficient schemas.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("design_database"),
             verbose=True
         )
     
@@ -86,7 +80,7 @@ class SDLCAgents:
             backstory="You are an experienced UI/UX designer focused on creating engaging user experiences. "
                      "You understand design principles, accessibility, and how to create interfaces that users love.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("design_ui"),
             verbose=True
         )
     
@@ -99,7 +93,7 @@ class SDLCAgents:
             backstory="You are an experienced test manager with expertise in test planning and coordination. "
                      "You know how to create comprehensive test strategies and ensure thorough coverage.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("create_test_plan"),
             verbose=True
         )
     
@@ -112,7 +106,7 @@ class SDLCAgents:
             backstory="You specialize in creating test cases that thoroughly validate system functionality. "
                      "You know how to identify edge cases and ensure all requirements are testable.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("design_test_cases"),
             verbose=True
         )
     
@@ -125,7 +119,7 @@ class SDLCAgents:
             backstory="You are detail-oriented and skilled at executing test cases and identifying defects. "
                      "You have a keen eye for spotting inconsistencies and can provide clear bug reports.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("execute_tests"),
             verbose=True
         )
     
@@ -138,6 +132,6 @@ class SDLCAgents:
             backstory=f"You are an experienced {specialty} developer with a strong background in software engineering. "
                      f"You write clean, maintainable code and follow best practices.",
             tools=tools or [],
-            llm=llm,
+            llm=get_router().llm_for("implement"),
             verbose=True
         )
\ No newline at end of file
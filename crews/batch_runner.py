@@ -0,0 +1,280 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from config.settings import BATCH_CREW_WORKERS, CREW_LEASE_TTL, LLM_RATE_LIMIT_RPM
+from crews.crew_jobs import CREW_TYPES
+from crews.single_flight import CoalescedResult, run_with_lease
+from database.db_manager import DatabaseManager
+from utils.metrics import CREW_QUEUE_DEPTH, CREW_RUNS, CREW_RUN_SECONDS
+
+class CrewRunError(RuntimeError):
+    """Raised in the main process when a worker reports that its crew failed"""
+
+class MetricBuffer:
+    """Collects LLM route metrics in a worker so the parent process can write them"""
+
+    def __init__(self):
+        self.records = []
+
+    def record_llm_route_metric(self, *args):
+        self.records.append(args)
+
+# Crew manager and rate limit of this worker process
+_worker = None
+
+def _init_worker(db_url, max_rpm, work_dir):
+    """Set up a worker process"""
+    global _worker
+    from crews.crew_manager import CrewManager
+    crew_manager = CrewManager(db_path=db_url)
+    # Crews write their Output/ files relative to the working directory,
+    # so give each worker its own to keep parallel runs apart
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(tempfile.mkdtemp(prefix=f"worker-{os.getpid()}-", dir=work_dir))
+    _worker = (crew_manager, max_rpm)
+
+def _kickoff(crew_type, project_id):
+    """Run a crew in a worker process, returning its output instead of saving it"""
+    crew_manager, max_rpm = _worker
+    metrics = MetricBuffer()
+    crew_manager.metrics = metrics
+    started = time.time()
+    try:
+        result = crew_manager.kickoff_crew(crew_type, project_id, max_rpm)
+        return {'raw': result.raw, 'error': None, 'metrics': metrics.records, 'duration': time.time() - started}
+    except Exception as e:
+        traceback.print_exc()
+        return {'raw': None, 'error': f"{type(e).__name__}: {e}", 'metrics': metrics.records,
+                'duration': time.time() - started}
+
+def format_duration(seconds):
+    """Format seconds as e.g. 1h 02m 03s"""
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+class BatchCrewRunner:
+    """
+    Runs crews for many projects on a pool of worker processes
+
+    Workers only run the crews; their outputs come back to this process,
+    which is the only one writing to the database. Each run holds the same
+    crew lease as CrewManager.run_crew, so a batch run and an interactive
+    run of the same crew on the same inputs never both produce the
+    document: whichever starts second waits for the other's revision. The
+    crews of a project run in SDLC order (requirements, design, testing),
+    each one starting once the previous one is saved, while different
+    projects run in parallel. The progress of a batch is kept in the crew_batch_runs table,
+    so running the same batch again only redoes the runs that did not
+    complete.
+    """
+
+    def __init__(self, db_path=None, workers=BATCH_CREW_WORKERS, rate_limit_rpm=LLM_RATE_LIMIT_RPM,
+                 max_attempts=2, work_dir=None):
+        self.db = DatabaseManager(db_path)
+        # Absolute URL of the database, which worker processes open themselves
+        self.db_url = self.db.url
+        self.workers = max(1, workers)
+        self.rate_limit_rpm = rate_limit_rpm
+        self.max_attempts = max(1, max_attempts)
+        self.work_dir = os.path.abspath(work_dir or os.path.join("Output", "batch"))
+        self._crew_manager = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def worker_rpm(self):
+        """Get each worker's share of the LLM rate limit, or None if there is no limit"""
+        if not self.rate_limit_rpm:
+            return None
+        return max(1, self.rate_limit_rpm // self.workers)
+
+    def _get_crew_manager(self):
+        """Create the crew manager used for saving results on first use"""
+        with self._lock:
+            if self._crew_manager is None:
+                from crews.crew_manager import CrewManager
+                self._crew_manager = CrewManager(db_path=self.db_url)
+            return self._crew_manager
+
+    def _new_executor(self):
+        # Spawn rather than fork: this process already runs threads (the
+        # database write queue, lease heartbeats) that a forked child would
+        # inherit in whatever state they were in
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.db_url, self.worker_rpm(), self.work_dir),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _kickoff_in_worker(self, crew_type, project_id):
+        """Run a crew on the worker pool and wait for its outcome"""
+        with self._lock:
+            executor = self._executor
+        try:
+            future = executor.submit(_kickoff, crew_type, project_id)
+        except BrokenProcessPool:
+            # A worker died and took the pool with it; start a new one
+            with self._lock:
+                if self._executor is executor:
+                    executor.shutdown(wait=False)
+                    self._executor = self._new_executor()
+                executor = self._executor
+            future = executor.submit(_kickoff, crew_type, project_id)
+        return future.result()
+
+    def _run_item(self, run):
+        """
+        Run one crew of the batch under its crew lease and save the result
+
+        Returns:
+            dict: error, duration, document_id, revision and whether the
+            result came from an identical run started elsewhere
+        """
+        from crews.crew_manager import _lease_owner, _single_flight
+        # Marked running only now, not while it waited for a free thread
+        self.db.update_crew_batch_run(run['id'], 'Running', attempted=True)
+        crew_manager = self._get_crew_manager()
+        crew_type, project_id = run['crew_type'], run['project_id']
+        started = time.time()
+
+        def lead():
+            result = self._kickoff_in_worker(crew_type, project_id)
+            for record in result['metrics']:
+                self.db.record_llm_route_metric(*record)
+            if result['error'] is not None:
+                raise CrewRunError(result['error'])
+            document_id, revision = crew_manager.save_crew_result(crew_type, project_id, result['raw'])
+            outcome = {'error': None, 'duration': result['duration'], 'document_id': document_id,
+                       'revision': revision, 'coalesced': False}
+            return outcome, document_id, revision
+
+        try:
+            lease_key, fingerprint = crew_manager.crew_lease_key(crew_type, project_id)
+            result = _single_flight.do(lease_key, lambda: run_with_lease(
+                self.db, lease_key, project_id, crew_type, fingerprint, _lease_owner, CREW_LEASE_TTL, lead
+            ))
+        except CrewRunError as e:
+            return {'error': str(e), 'duration': time.time() - started}
+        except Exception as e:
+            traceback.print_exc()
+            return {'error': f"{type(e).__name__}: {e}", 'duration': time.time() - started}
+        if isinstance(result, CoalescedResult):
+            return {'error': None, 'duration': time.time() - started, 'document_id': result.document_id,
+                    'revision': result.revision, 'coalesced': True}
+        return result
+
+    def run(self, batch_id, project_ids=(), crew_types=CREW_TYPES, progress=print):
+        """
+        Run a batch, adding the given projects and crew types to it first
+
+        Runs that already completed in an earlier attempt of the batch are
+        skipped. Failed runs are retried up to max_attempts times; when a
+        run fails for good, the later crews of its project are skipped.
+
+        Returns:
+            dict: Number of runs per final status
+        """
+        crew_types = [crew_type for crew_type in CREW_TYPES if crew_type in crew_types]
+        if project_ids:
+            self.db.add_crew_batch_runs(batch_id, project_ids, crew_types)
+
+        # Remaining runs per project, in SDLC order
+        queues = {}
+        for run in self.db.get_crew_batch_runs(batch_id):
+            if run['status'] != 'Completed':
+                queues.setdefault(run['project_id'], []).append(run)
+        for runs in queues.values():
+            runs.sort(key=lambda run: CREW_TYPES.index(run['crew_type']))
+
+        total = sum(len(runs) for runs in queues.values())
+        counts = {'Completed': 0, 'Failed': 0, 'Skipped': 0}
+        if not total:
+            progress(f"Batch {batch_id} has nothing left to run.")
+            return counts
+
+        limit = f"{self.worker_rpm()} requests/min each" if self.rate_limit_rpm else "no rate limit"
+        progress(f"Batch {batch_id}: {total} crew runs for {len(queues)} projects on {self.workers} workers ({limit}).")
+
+        started = time.time()
+        attempts = {}
+        pending = {}
+        self._executor = self._new_executor()
+        # One thread per worker holds each run's lease and saves its result
+        runners = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-run")
+
+        def submit(run):
+            attempts[run['id']] = attempts.get(run['id'], 0) + 1
+            pending[runners.submit(self._run_item, run)] = run
+
+        try:
+            for runs in queues.values():
+                submit(runs[0])
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    run = pending.pop(future)
+                    outcome = future.result()
+                    CREW_RUN_SECONDS.labels(run['crew_type']).observe(outcome['duration'])
+
+                    label = f"project {run['project_id']} {run['crew_type']}"
+                    queue = queues[run['project_id']]
+                    if outcome['error'] is None:
+                        revision = outcome['revision']
+                        self.db.update_crew_batch_run(run['id'], 'Completed', outcome['document_id'], revision,
+                                                      outcome['duration'])
+                        counts['Completed'] += 1
+                        if outcome['coalesced']:
+                            CREW_RUNS.labels(run['crew_type'], 'coalesced').inc()
+                            status = f"reused an identical run's result (revision {revision})"
+                        else:
+                            CREW_RUNS.labels(run['crew_type'], 'completed').inc()
+                            status = f"completed in {format_duration(outcome['duration'])} (revision {revision})"
+                        queue.pop(0)
+                    elif attempts[run['id']] < self.max_attempts:
+                        self.db.update_crew_batch_run(run['id'], 'Pending', duration=outcome['duration'],
+                                                      error=outcome['error'])
+                        status = f"failed ({outcome['error']}), retrying"
+                    else:
+                        self.db.update_crew_batch_run(run['id'], 'Failed', duration=outcome['duration'],
+                                                      error=outcome['error'])
+                        counts['Failed'] += 1
+                        CREW_RUNS.labels(run['crew_type'], 'failed').inc()
+                        status = f"failed ({outcome['error']})"
+                        queue.pop(0)
+                        for skipped in queue:
+                            self.db.update_crew_batch_run(
+                                skipped['id'], 'Skipped', error=f"The {run['crew_type']} crew failed"
+                            )
+                            counts['Skipped'] += 1
+                        queue.clear()
+
+                    if queue:
+                        submit(queue[0])
+                    CREW_QUEUE_DEPTH.labels('batch').set(len(pending))
+
+                    finished = sum(counts.values())
+                    elapsed = time.time() - started
+                    throughput = finished / elapsed * 60 if elapsed else 0
+                    eta = format_duration(elapsed / finished * (total - finished)) if finished else "unknown"
+                    progress(f"[{finished}/{total}] {label} {status} | {throughput:.1f} runs/min | "
+                             f"elapsed {format_duration(elapsed)} | ETA {eta}")
+        finally:
+            runners.shutdown(wait=True, cancel_futures=True)
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+        progress(f"Batch {batch_id} finished in {format_duration(time.time() - started)}: "
+                 f"{counts['Completed']} completed, {counts['Failed']} failed, {counts['Skipped']} skipped.")
+        return counts
@@ -0,0 +1,119 @@
+"""
+Per-model circuit breakers and latency tracking for LLM calls
+
+Kept apart from crews.resilience, which imports crewai, so that callers
+such as the API server's health endpoints can read breaker states
+without loading crewai.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+from config.settings import LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS, LLM_HEDGE_MIN_SAMPLES
+from utils.metrics import LLM_CIRCUIT_OPEN
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a model whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Stops calling a model after repeated failures
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail immediately with CircuitOpenError. Once ``reset_timeout``
+    seconds have passed it lets a single probe call through (half-open);
+    the breaker closes again if the probe succeeds and reopens if it fails.
+    """
+
+    def __init__(self, name, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Check that a call may go ahead, raising CircuitOpenError otherwise"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+            if self.state == 'half-open' and not self._probing:
+                self._probing = True
+                print(f"Circuit for {self.name} is half-open, probing for recovery.")
+                return
+            retry_in = max(0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open, next probe in {retry_in:.0f}s)")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print(f"Circuit for {self.name} closed again.")
+                LLM_CIRCUIT_OPEN.labels(self.name).set(0)
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"Circuit for {self.name} opened after {self.failures} failures.")
+                    LLM_CIRCUIT_OPEN.labels(self.name).set(1)
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def snapshot(self):
+        """Get the breaker's state as a dict"""
+        with self._lock:
+            return {'name': self.name, 'state': self.state, 'failures': self.failures}
+
+class LatencyTracker:
+    """Keeps the latencies of recent successful calls to compute percentiles"""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent, min_samples=LLM_HEDGE_MIN_SAMPLES):
+        """Get a latency percentile in seconds, or None with too few samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, math.ceil(percent / 100 * len(samples)) - 1)
+        return samples[max(0, index)]
+
+_breakers = {}
+_latencies = {}
+_registry_lock = threading.Lock()
+
+def get_breaker(model):
+    """Get the circuit breaker shared by all LLMs of a model"""
+    with _registry_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model)
+            _latencies[model] = LatencyTracker()
+        return _breakers[model]
+
+def get_latency_tracker(model):
+    """Get the latency tracker shared by all LLMs of a model"""
+    get_breaker(model)
+    return _latencies[model]
+
+def breaker_states():
+    """Get the state of every circuit breaker in this process"""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
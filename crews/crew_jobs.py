@@ -0,0 +1,106 @@
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.metrics import CREW_QUEUE_DEPTH
+
+CREW_TYPES = ("requirements", "design", "testing")
+
+class CrewJobRunner:
+    """Runs crews in background threads and keeps track of their status"""
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._crew_manager = None
+
+    def _get_crew_manager(self):
+        """Create the crew manager on first use (importing crewai is slow)"""
+        with self._lock:
+            if self._crew_manager is None:
+                from crews.crew_manager import CrewManager
+                self._crew_manager = CrewManager()
+            return self._crew_manager
+
+    def submit(self, crew_type, project_id):
+        """
+        Queue a crew run for a project
+
+        Returns:
+            dict: The queued job
+        """
+        if crew_type not in CREW_TYPES:
+            raise ValueError(f"Unknown crew type: {crew_type}")
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'crew_type': crew_type,
+            'project_id': project_id,
+            'status': 'Queued',
+            'submitted_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': None,
+            'finished_at': None,
+            'document_id': None,
+            'error': None
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+        CREW_QUEUE_DEPTH.labels('jobs').inc()
+        self._executor.submit(self._run, job['id'])
+        return dict(job)
+
+    def _update(self, job_id, **changes):
+        """Update the fields of a job"""
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def _run(self, job_id):
+        """Run a queued job"""
+        job = self.get(job_id)
+        self._update(job_id, status='Running', started_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        try:
+            crew_manager = self._get_crew_manager()
+            crew_manager.run_crew(job['crew_type'], job['project_id'])
+            doc_type = {"requirements": "Requirements", "design": "Design", "testing": "Testing"}[job['crew_type']]
+            document = crew_manager.db.get_latest_document(job['project_id'], doc_type)
+            self._update(
+                job_id,
+                status='Completed',
+                document_id=document['id'] if document else None,
+                finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
+        except Exception as e:
+            traceback.print_exc()
+            self._update(
+                job_id,
+                status='Failed',
+                error=str(e),
+                finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
+        finally:
+            CREW_QUEUE_DEPTH.labels('jobs').dec()
+
+    def get(self, job_id):
+        """Get a job by ID"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self, project_id=None):
+        """Get all jobs, newest first, optionally only those of a project"""
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()
+                    if project_id is None or job['project_id'] == project_id]
+        return sorted(jobs, key=lambda job: job['submitted_at'], reverse=True)
+
+    def queue_depth(self):
+        """Count jobs that are queued or running"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] in ('Queued', 'Running'))
+
+    def shutdown(self):
+        """Stop accepting jobs and wait for running ones"""
+        self._executor.shutdown(wait=True)
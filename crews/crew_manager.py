@@ -1,22 +1,39 @@
-from crewai import Crew, Agent, Task, LLM
+from crewai import Crew, Agent, Task
 import os
 import sys
+import time
 
-llm_model = os.getenv("GEMINI_MODEL")
-llm_api_key = os.getenv("GEMINI_API_KEY")
-llm = LLM(
-    model=llm_model,
-    api_key=llm_api_key
-)
 # Add the project root to the path so we can import our modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from database.db_manager import DatabaseManager
+from config.settings import CREW_LEASE_TTL, LLM_RATE_LIMIT_RPM
+from crews.single_flight import CoalescedResult, SingleFlight, make_owner_id, run_with_lease
+from crews.llm_router import get_router
+from utils.text_delta import content_hash
+from utils.metrics import CREW_RUNS, CREW_RUN_SECONDS
+from utils.tracing import instrument_class, span
+
+# Documents each crew type reads as input
+CREW_INPUT_DOCUMENTS = {
+    "requirements": [],
+    "design": ["Requirements"],
+    "testing": ["Requirements", "Design"]
+}
+
+# Deduplicates identical crew runs within this process; the lease owner ID
+# identifies this process to other processes sharing the database
+_single_flight = SingleFlight()
+_lease_owner = make_owner_id()
 
 class CrewManager:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, router=None, db_path=None):
+        self.db = DatabaseManager(db_path)
+        self.router = router or get_router()
+        # Where LLM route metrics are recorded; batch workers replace this
+        # so that only the parent process writes to the database
+        self.metrics = self.db
     
-    def create_requirements_crew(self, project_id):
+    def create_requirements_crew(self, project_id, max_rpm=None):
         """Create a crew for requirements analysis"""
         # Get project details
         project = self.db.get_project(project_id)
@@ -26,7 +43,7 @@ class CrewManager:
             role="Business Analyst",
             goal="Understand business needs and translate them into system requirements",
            backstory="You are an experienced business analyst with expertise in gathering and analyzing business requirements.",
-           llm=llm,
+           llm=self.router.llm_for("gather_requirements"),
            verbose=True
         )
         
@@ -34,7 +51,7 @@ class CrewManager:
             role="Domain Expert",
             goal="Provide domain-specific knowledge and validate requirements",
             backstory="You have deep knowledge of the business domain and can provide insights into industry-specific requirements.",
-            llm=llm,
+            llm=self.router.llm_for("validate_requirements"),
             verbose=True
         )
         
@@ -42,16 +59,18 @@ class CrewManager:
             role="Requirements Documenter",
             goal="Create clear, comprehensive requirements documentation",
             backstory="You specialize in documenting requirements in a clear, structured format that can be easily understood by all stakeholders.",
-            llm=llm,
+            llm=self.router.llm_for("document_requirements"),
             verbose=True
         )
         
-        # Create tasks
+        # Create tasks, validating each output against the model router's rules
+        route_run = self.router.start_run(self.metrics)
         gather_requirements = Task(
             description=f"Gather requirements for project: {project['name']}\n\nProject Description: {project['description']}",
             agent=business_analyst,
             expected_output="A comprehensive list of functional and non-functional requirements",
-            output_file="Output/requirements.md"
+            output_file="Output/requirements.md",
+            guardrail=route_run.guardrail("gather_requirements", business_analyst)
         )
         
         validate_requirements = Task(
@@ -59,7 +78,8 @@ class CrewManager:
             agent=domain_expert,
             expected_output="Validated requirements with domain-specific insights",
             output_file="Output/validated_requirements.md",
-            context=[gather_requirements]
+            context=[gather_requirements],
+            guardrail=route_run.guardrail("validate_requirements", domain_expert)
         )
         
         document_requirements = Task(
@@ -67,26 +87,27 @@ class CrewManager:
             agent=requirements_documenter,
             expected_output="A structured requirements document with user stories, acceptance criteria, and prioritization",
             output_file="Output/requirements_document.md",
-            context=[validate_requirements]
+            context=[validate_requirements],
+            guardrail=route_run.guardrail("document_requirements", requirements_documenter)
         )
         
         # Create crew
         crew = Crew(
             agents=[business_analyst, domain_expert, requirements_documenter],
             tasks=[gather_requirements, validate_requirements, document_requirements],
+            max_rpm=max_rpm,
             verbose=True
         )
         
         return crew
     
-    def create_design_crew(self, project_id):
+    def create_design_crew(self, project_id, max_rpm=None):
         """Create a crew for system design"""
         # Get project details
         project = self.db.get_project(project_id)
         
         # Get requirements document
-        documents = self.db.get_documents(project_id)
-        requirements_doc = next((doc for doc in documents if doc['doc_type'] == 'Requirements'), None)
+        requirements_doc = self.db.get_latest_document(project_id, 'Requirements')
         
         if not requirements_doc:
             print("Warning: No requirements document found. Design crew may not have complete context.")
@@ -100,7 +121,7 @@ class CrewManager:
             role="System Architect",
             goal="Design a robust, scalable system architecture",
             backstory="You are a skilled system architect with experience in designing complex systems.",
-            llm=llm,
+            llm=self.router.llm_for("design_architecture"),
             verbose=True
         )
         
@@ -108,7 +129,7 @@ class CrewManager:
             role="Database Designer",
             goal="Design an efficient, normalized database schema",
             backstory="You specialize in database design and optimization.",
-            llm=llm,
+            llm=self.router.llm_for("design_database"),
             verbose=True
         )
         
@@ -116,16 +137,18 @@ class CrewManager:
             role="UI/UX Designer",
             goal="Create intuitive, user-friendly interface designs",
             backstory="You are an experienced UI/UX designer focused on creating engaging user experiences.",
-            llm=llm,
+            llm=self.router.llm_for("design_ui"),
             verbose=True
         )
         
-        # Create tasks
+        # Create tasks, validating each output against the model router's rules
+        route_run = self.router.start_run(self.metrics)
         design_architecture = Task(
             description=f"Design system architecture for project: {project['name']}\n\nRequirements: {requirements_content}",
             agent=system_architect,
             expected_output="A comprehensive system architecture document with component diagrams",
-            output_file="Output/architecture_document.md"
+            output_file="Output/architecture_document.md",
+            guardrail=route_run.guardrail("design_architecture", system_architect)
         )
         
         design_database = Task(
@@ -133,7 +156,8 @@ class CrewManager:
             agent=database_designer,
             expected_output="A database schema with entity-relationship diagrams",
             output_file="Output/database_schema.md",
-            context=[design_architecture]
+            context=[design_architecture],
+            guardrail=route_run.guardrail("design_database", database_designer)
         )
         
         design_ui = Task(
@@ -141,27 +165,28 @@ class CrewManager:
             agent=ui_designer,
             expected_output="UI/UX mockups and user flow diagrams",
             output_file="Output/ui_designs.md",
-            context=[design_architecture]
+            context=[design_architecture],
+            guardrail=route_run.guardrail("design_ui", ui_designer)
         )
         
         # Create crew
         crew = Crew(
             agents=[system_architect, database_designer, ui_designer],
             tasks=[design_architecture, design_database, design_ui],
+            max_rpm=max_rpm,
             verbose=True
         )
         
         return crew
     
-    def create_testing_crew(self, project_id):
+    def create_testing_crew(self, project_id, max_rpm=None):
         """Create a crew for testing"""
         # Get project details
         project = self.db.get_project(project_id)
         
         # Get requirements and design documents
-        documents = self.db.get_documents(project_id)
-        requirements_doc = next((doc for doc in documents if doc['doc_type'] == 'Requirements'), None)
-        design_doc = next((doc for doc in documents if doc['doc_type'] == 'Design'), None)
+        requirements_doc = self.db.get_latest_document(project_id, 'Requirements')
+        design_doc = self.db.get_latest_document(project_id, 'Design')
         
         if not requirements_doc:
             print("Warning: No requirements document found. Testing crew may not have complete context.")
@@ -182,7 +207,7 @@ class CrewManager:
             role="Test Manager",
             goal="Plan and coordinate testing activities",
             backstory="You are an experienced test manager with expertise in test planning and coordination.",
-            llm=llm,
+            llm=self.router.llm_for("create_test_plan"),
             verbose=True
         )
         
@@ -190,7 +215,7 @@ class CrewManager:
             role="Test Case Designer",
             goal="Design comprehensive test cases",
             backstory="You specialize in creating test cases that thoroughly validate system functionality.",
-            llm=llm,
+            llm=self.router.llm_for("design_test_cases"),
             verbose=True
         )
         
@@ -198,16 +223,18 @@ class CrewManager:
             role="Test Executor",
             goal="Execute test cases and report results",
             backstory="You are detail-oriented and skilled at executing test cases and identifying defects.",
-            llm=llm,
+            llm=self.router.llm_for("execute_tests"),
             verbose=True
         )
         
-        # Create tasks
+        # Create tasks, validating each output against the model router's rules
+        route_run = self.router.start_run(self.metrics)
         create_test_plan = Task(
             description=f"Create a test plan for project: {project['name']}\n\nRequirements: {requirements_content}\n\nSystem Design: {design_content}",
             agent=test_manager,
             expected_output="A comprehensive test plan with testing strategy and schedule",
-            output_file="Output/test_plan.md"
+            output_file="Output/test_plan.md",
+            guardrail=route_run.guardrail("create_test_plan", test_manager)
         )
         
         design_test_cases = Task(
@@ -215,7 +242,8 @@ class CrewManager:
             agent=test_designer,
             expected_output="A set of detailed test cases with steps, expected results, and traceability to requirements",
             output_file="Output/test_cases.md",
-            context=[create_test_plan]
+            context=[create_test_plan],
+            guardrail=route_run.guardrail("design_test_cases", test_designer)
         )
         
         execute_tests = Task(
@@ -223,52 +251,103 @@ class CrewManager:
             agent=test_executor,
             expected_output="Test execution results with pass/fail status and defect reports",
             output_file="Output/test_results.md",
-            context=[design_test_cases]
+            context=[design_test_cases],
+            guardrail=route_run.guardrail("execute_tests", test_executor)
         )
         
         # Create crew
         crew = Crew(
             agents=[test_manager, test_designer, test_executor],
             tasks=[create_test_plan, design_test_cases, execute_tests],
+            max_rpm=max_rpm,
             verbose=True
         )
         
         return crew
     
+    def crew_fingerprint(self, crew_type, project_id):
+        """Get a fingerprint of everything a crew run takes as input"""
+        project = self.db.get_project(project_id) or {}
+        parts = [crew_type, self.router.models_signature(), project.get('name') or "", project.get('description') or ""]
+        for doc_type in CREW_INPUT_DOCUMENTS.get(crew_type, []):
+            document = self.db.get_latest_document(project_id, doc_type)
+            parts.append((document['content_hash'] or "") if document else "")
+        return content_hash("\x1f".join(parts))
+    
+    def crew_lease_key(self, crew_type, project_id):
+        """Get the key identical crew runs share, and the fingerprint it is built from"""
+        fingerprint = self.crew_fingerprint(crew_type, project_id)
+        return f"{project_id}:{crew_type}:{fingerprint}", fingerprint
+    
     def run_crew(self, crew_type, project_id):
-        """Run a specific crew for a project"""
+        """
+        Run a specific crew for a project
+        
+        Identical requests (same project, crew type and inputs) made while a
+        run is in progress, in this process or another one sharing the
+        database, wait for that run and get its result instead of starting
+        a second one.
+        """
+        if crew_type not in CREW_INPUT_DOCUMENTS:
+            raise ValueError(f"Unknown crew type: {crew_type}")
+        
+        lease_key, fingerprint = self.crew_lease_key(crew_type, project_id)
+        started = time.perf_counter()
+        try:
+            result = _single_flight.do(lease_key, lambda: run_with_lease(
+                self.db, lease_key, project_id, crew_type, fingerprint, _lease_owner, CREW_LEASE_TTL,
+                lambda: self._run_crew(crew_type, project_id)
+            ))
+        except Exception:
+            CREW_RUNS.labels(crew_type, 'failed').inc()
+            raise
+        finally:
+            CREW_RUN_SECONDS.labels(crew_type).observe(time.perf_counter() - started)
+        CREW_RUNS.labels(crew_type, 'coalesced' if isinstance(result, CoalescedResult) else 'completed').inc()
+        return result
+    
+    def _run_crew(self, crew_type, project_id):
+        """Run a crew and save its result, returning (result, document_id, revision)"""
+        result = self.kickoff_crew(crew_type, project_id)
+        document_id, revision = self.save_crew_result(crew_type, project_id, result.raw)
+        return result, document_id, revision
+    
+    def kickoff_crew(self, crew_type, project_id, max_rpm=None):
+        """Run a crew without saving anything, returning the crew output"""
+        max_rpm = max_rpm or LLM_RATE_LIMIT_RPM or None
+        
         # Check prerequisites for each crew type
         if crew_type == "design" or crew_type == "testing":
             # Check if requirements document exists
-            documents = self.db.get_documents(project_id)
-            requirements_doc = next((doc for doc in documents if doc['doc_type'] == 'Requirements'), None)
+            requirements_doc = self.db.get_latest_document(project_id, 'Requirements')
             if not requirements_doc:
                 print(f"Warning: No requirements document found for project {project_id}.")
                 print("It's recommended to run the requirements crew first.")
         
         if crew_type == "testing":
             # Check if design document exists
-            documents = self.db.get_documents(project_id)
-            design_doc = next((doc for doc in documents if doc['doc_type'] == 'Design'), None)
+            design_doc = self.db.get_latest_document(project_id, 'Design')
             if not design_doc:
                 print(f"Warning: No design document found for project {project_id}.")
                 print("It's recommended to run the design crew before the testing crew.")
         
         # Create the appropriate crew
         if crew_type == "requirements":
-            crew = self.create_requirements_crew(project_id)
+            crew = self.create_requirements_crew(project_id, max_rpm)
         elif crew_type == "design":
-            crew = self.create_design_crew(project_id)
+            crew = self.create_design_crew(project_id, max_rpm)
         elif crew_type == "testing":
-            crew = self.create_testing_crew(project_id)
+            crew = self.create_testing_crew(project_id, max_rpm)
         else:
             raise ValueError(f"Unknown crew type: {crew_type}")
         
         print(f"\nStarting {crew_type.capitalize()} crew...")
         # Run the crew
-        result = crew.kickoff()
-        
-        
+        with span("crewai.kickoff", crew_type=crew_type, project_id=project_id):
+            return crew.kickoff()
+    
+    def save_crew_result(self, crew_type, project_id, content):
+        """Save a crew's output as a document revision, returning (document_id, revision)"""
         # Save the result as a document
         doc_type = {
             "requirements": "Requirements",
@@ -276,13 +355,15 @@ class CrewManager:
             "testing": "Testing"
         }.get(crew_type)
         
-        self.db.create_document(
+        # Reruns add a revision to the existing document instead of a new copy
+        document_id = self.db.save_document(
             project_id=project_id,
             name=f"{doc_type} Document",
-            content=result.raw,
+            content=content,
             doc_type=doc_type
         )
-        print(f"\n{doc_type} document saved to database.")
+        document = self.db.get_document(document_id)
+        print(f"\n{doc_type} document saved to database (revision {document['revision']}).")
         
         # Update the corresponding phase status
         phases = self.db.get_phases(project_id)
@@ -299,4 +380,7 @@ class CrewManager:
                 self.db.update_phase(phase['id'], status="Completed")
                 print(f"Phase '{phase_name}' marked as completed.")
         
-        return result
\ No newline at end of file
+        return document_id, document['revision']
+
+# Record a tracing span for crew creation and runs when tracing is enabled
+instrument_class(CrewManager, "crew")
@@ -0,0 +1,136 @@
+import threading
+import time
+
+from config.settings import (
+    LLM_API_KEY, LLM_MODEL_TIERS, LLM_TIER_ORDER, LLM_ROUTES, LLM_MIN_OUTPUT_CHARS,
+    LLM_TIMEOUT, LLM_HEDGE_ROUTES
+)
+from crews.resilience import ResilientLLM
+from utils.tracing import record_span
+
+class LLMRouter:
+    """
+    Picks the model tier for each agent role or task
+
+    Routes map to tiers through LLM_ROUTES and tiers map to models through
+    LLM_MODEL_TIERS. LLM instances are shared per model; all of them go
+    through the model's circuit breaker, and those of LLM_HEDGE_ROUTES also
+    hedge slow calls.
+    """
+
+    def __init__(self, tiers=None, routes=None, api_key=None, hedge_routes=None):
+        self.tiers = dict(tiers or LLM_MODEL_TIERS)
+        self.routes = dict(routes or LLM_ROUTES)
+        self.hedge_routes = set(LLM_HEDGE_ROUTES if hedge_routes is None else hedge_routes)
+        self.api_key = api_key if api_key is not None else LLM_API_KEY
+        self._llms = {}
+        self._lock = threading.Lock()
+
+    def tier_for(self, route):
+        """Get the model tier of a route"""
+        return self.routes.get(route, 'standard')
+
+    def model_for(self, tier):
+        """Get the model of a tier"""
+        return self.tiers.get(tier) or self.tiers.get('standard')
+
+    def llm_for(self, route=None, tier=None):
+        """Get the LLM for a route, on the route's tier unless a tier is given"""
+        model = self.model_for(tier or self.tier_for(route))
+        hedge = route in self.hedge_routes
+        with self._lock:
+            if (model, hedge) not in self._llms:
+                self._llms[(model, hedge)] = ResilientLLM(model=model, hedge=hedge, api_key=self.api_key,
+                                                          timeout=LLM_TIMEOUT)
+            return self._llms[(model, hedge)]
+
+    def larger_tier(self, tier):
+        """Get the next tier up that uses a different model, or None"""
+        model = self.model_for(tier)
+        position = LLM_TIER_ORDER.index(tier) if tier in LLM_TIER_ORDER else len(LLM_TIER_ORDER)
+        for candidate in LLM_TIER_ORDER[position + 1:]:
+            if self.model_for(candidate) != model:
+                return candidate
+        return None
+
+    def models_signature(self):
+        """Get a string describing the configured models, for cache keys"""
+        return ",".join(f"{tier}={self.model_for(tier)}" for tier in LLM_TIER_ORDER)
+
+    def start_run(self, db=None):
+        """Start tracking the task attempts of one crew run"""
+        return RouteRun(self, db)
+
+class RouteRun:
+    """
+    Validates task outputs of one crew run and records per-route metrics
+
+    Crews run their tasks sequentially, so each task attempt's latency is
+    the time since the previous attempt finished (or since the run started).
+    Each attempt is also recorded as a "task.<route>" tracing span.
+    """
+
+    def __init__(self, router, db=None):
+        self.router = router
+        self.db = db
+        self._last_mark = time.time_ns()
+        self._lock = threading.Lock()
+
+    def guardrail(self, route, agent, min_chars=None):
+        """
+        Create a task guardrail for a route
+
+        Outputs shorter than min_chars fail validation. When that happens
+        and a larger tier is configured, the agent is switched to it before
+        crewai retries the task.
+        """
+        min_chars = LLM_MIN_OUTPUT_CHARS if min_chars is None else min_chars
+        state = {'tier': self.router.tier_for(route)}
+
+        def validate(output):
+            raw = (getattr(output, 'raw', None) or str(output) or "").strip()
+            passed = len(raw) >= min_chars
+            self._record(route, state['tier'], passed, len(raw))
+            if passed:
+                return True, output
+
+            larger = self.router.larger_tier(state['tier'])
+            if larger:
+                print(f"Output of '{route}' failed validation on the {state['tier']} tier, retrying on {larger}.")
+                state['tier'] = larger
+                self._switch_llm(agent, self.router.llm_for(route, tier=larger))
+            return False, f"The answer must be a complete, detailed response of at least {min_chars} characters."
+
+        return validate
+
+    @staticmethod
+    def _switch_llm(agent, llm):
+        """Make an agent use another LLM for its next attempt"""
+        agent.llm = llm
+        executor = getattr(agent, 'agent_executor', None)
+        if executor is not None:
+            executor.llm = llm
+
+    def _record(self, route, tier, passed, output_chars):
+        """Record the latency and validation result of a task attempt"""
+        with self._lock:
+            started = self._last_mark
+            now = time.time_ns()
+            latency_ms = (now - started) / 1e6
+            record_span(f"task.{route}", started, now, tier=tier, passed=passed, output_chars=output_chars)
+            if self.db is not None:
+                try:
+                    self.db.record_llm_route_metric(route, tier, self.router.model_for(tier), latency_ms, passed, output_chars)
+                except Exception as e:
+                    print(f"Warning: could not record LLM route metric: {str(e)}")
+            # The next attempt starts once this one is recorded
+            self._last_mark = time.time_ns()
+
+_default_router = None
+
+def get_router():
+    """Get the router configured from settings"""
+    global _default_router
+    if _default_router is None:
+        _default_router = LLMRouter()
+    return _default_router
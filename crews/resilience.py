@@ -0,0 +1,97 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai import LLM
+
+from config.settings import LLM_HEDGE_PERCENTILE
+from crews.circuit_breaker import CircuitOpenError, get_breaker, get_latency_tracker
+from utils.metrics import LLM_CALLS, LLM_CALL_SECONDS, LLM_HEDGED_REQUESTS, LLM_HEDGE_LOSERS
+from utils.tracing import span
+
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+class ResilientLLM(LLM):
+    """
+    LLM guarded by a per-model circuit breaker, with optional hedging
+
+    With ``hedge`` set, a call that is still running after the model's
+    recent LLM_HEDGE_PERCENTILE latency gets a duplicate request, and
+    whichever answer arrives first is used. Calls that can execute tools
+    are never hedged, so tools never run twice.
+    """
+
+    def __init__(self, model, hedge=False, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.hedge = hedge
+        self.breaker = get_breaker(model)
+        self.latencies = get_latency_tracker(model)
+
+    def call(self, messages, *args, **kwargs):
+        with span("llm.call", model=self.model, hedge=self.hedge):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                LLM_CALLS.labels(self.model, 'circuit_open').inc()
+                raise
+            started = time.monotonic()
+            try:
+                if self.hedge and not kwargs.get('available_functions'):
+                    response = self._hedged_call(messages, *args, **kwargs)
+                else:
+                    response = super().call(messages, *args, **kwargs)
+            except Exception:
+                self.breaker.record_failure()
+                LLM_CALLS.labels(self.model, 'error').inc()
+                LLM_CALL_SECONDS.labels(self.model).observe(time.monotonic() - started)
+                raise
+            self.breaker.record_success()
+            elapsed = time.monotonic() - started
+            self.latencies.add(elapsed)
+            LLM_CALLS.labels(self.model, 'ok').inc()
+            LLM_CALL_SECONDS.labels(self.model).observe(elapsed)
+            return response
+
+    def _hedged_call(self, messages, *args, **kwargs):
+        """Call the model, sending a second request if the first one is slow"""
+        threshold = self.latencies.percentile(LLM_HEDGE_PERCENTILE)
+        if threshold is None:
+            # Not enough latency samples to hedge on yet
+            return super().call(messages, *args, **kwargs)
+
+        primary = self._submit(super().call, messages, *args, **kwargs)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        print(f"{self.model} call exceeded {threshold:.1f}s, sending a hedged request.")
+        LLM_HEDGED_REQUESTS.labels(self.model).inc()
+        pending = {primary, self._submit(super().call, messages, *args, **kwargs)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._discard(pending)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    def _submit(function, *args, **kwargs):
+        """Run a call on the hedge executor in a copy of the caller's context, keeping its tracing span"""
+        context = contextvars.copy_context()
+        return _hedge_executor.submit(context.run, function, *args, **kwargs)
+
+    def _discard(self, futures):
+        """Cancel the requests that lost a hedge, counting the outcome of those already running"""
+        for future in futures:
+            if future.cancel():
+                LLM_HEDGE_LOSERS.labels(self.model, 'cancelled').inc()
+            else:
+                future.add_done_callback(self._count_loser)
+
+    def _count_loser(self, future):
+        """Count the outcome of a request whose answer was not used"""
+        outcome = 'ok' if future.exception() is None else 'error'
+        LLM_HEDGE_LOSERS.labels(self.model, outcome).inc()
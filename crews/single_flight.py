@@ -0,0 +1,121 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+class CoalescedResult:
+    """Result of a crew run that was started by another request"""
+
+    def __init__(self, raw, document_id=None, revision=None):
+        self.raw = raw
+        self.document_id = document_id
+        self.revision = revision
+
+    def __str__(self):
+        return self.raw
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key within this process
+
+    The first caller runs the function; callers arriving while it runs wait
+    for it and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+class LeaseHeartbeat:
+    """Renews a crew lease in the background while its run is in progress"""
+
+    def __init__(self, db, lease_key, owner, ttl):
+        self.db = db
+        self.lease_key = lease_key
+        self.owner = owner
+        self.ttl = ttl
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.ttl / 3):
+            if not self.db.renew_crew_lease(self.lease_key, self.owner, self.ttl):
+                print(f"Warning: lost crew lease {self.lease_key}.")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+def make_owner_id():
+    """Get an ID identifying this process as a lease holder"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def run_with_lease(db, lease_key, project_id, crew_type, fingerprint, owner, ttl, function, poll_interval=1.0):
+    """
+    Run a crew at most once at a time across processes
+
+    The process that takes the lease in the database runs ``function``,
+    which must return (result, document_id, revision). Other processes wait
+    for the lease to finish and get the saved document revision instead of
+    running the crew again. If the holder dies, its lease expires and a
+    waiting process takes over.
+
+    Returns:
+        The result of ``function``, or a CoalescedResult for waiters
+    """
+    while True:
+        acquired, lease = db.acquire_crew_lease(lease_key, project_id, crew_type, fingerprint, owner, ttl)
+        if acquired:
+            try:
+                with LeaseHeartbeat(db, lease_key, owner, ttl):
+                    result, document_id, revision = function()
+            except Exception as e:
+                db.finish_crew_lease(lease_key, owner, 'Failed', error=str(e))
+                raise
+            db.finish_crew_lease(lease_key, owner, 'Completed', document_id=document_id, revision=revision)
+            return result
+
+        print(f"Identical {crew_type} crew run already in progress for project {project_id}, waiting for its result...")
+        holder = lease['owner']
+        while True:
+            time.sleep(poll_interval)
+            lease = db.get_crew_lease(lease_key)
+            if lease is None or lease['owner'] != holder:
+                break
+            if lease['status'] == 'Completed':
+                content = db.get_document_revision(lease['document_id'], lease['revision'])
+                return CoalescedResult(content, lease['document_id'], lease['revision'])
+            if lease['status'] == 'Failed':
+                raise RuntimeError(f"Crew run failed: {lease['error']}")
+            if lease['expires_at'] <= time.time():
+                # The holder stopped renewing the lease; try to take over
+                break
@@ -0,0 +1,466 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.settings import ANALYTICS_DIR, ANALYTICS_PARTITIONS, DEFAULT_PHASES
+
+# Changes read from the change feed per query
+CHANGES_BATCH = 1000
+
+# Snapshot datasets partitioned by project. Each has the query reading its
+# rows, the SQL expression of a row's project ID, the columns parsed as
+# timestamps and its Parquet schema.
+PROJECT_DATASETS = {
+    'projects': {
+        'query': "SELECT id AS project_id, name, status, created_at, updated_at FROM projects",
+        'project': "id",
+        'timestamps': ['created_at', 'updated_at'],
+        'schema': pa.schema([
+            ('project_id', pa.int64()), ('name', pa.string()), ('status', pa.string()),
+            ('created_at', pa.timestamp('s')), ('updated_at', pa.timestamp('s')),
+        ]),
+    },
+    'phases': {
+        'query': "SELECT id AS phase_id, project_id, name, status, start_date, end_date FROM phases",
+        'project': "project_id",
+        'timestamps': ['start_date', 'end_date'],
+        'schema': pa.schema([
+            ('phase_id', pa.int64()), ('project_id', pa.int64()), ('name', pa.string()), ('status', pa.string()),
+            ('start_date', pa.timestamp('s')), ('end_date', pa.timestamp('s')),
+        ]),
+    },
+    'tasks': {
+        'query': "SELECT t.id AS task_id, p.project_id, t.phase_id, p.name AS phase_name, t.status, "
+                 "t.assigned_to, t.due_date FROM tasks t JOIN phases p ON t.phase_id = p.id",
+        'project': "p.project_id",
+        'timestamps': ['due_date'],
+        'schema': pa.schema([
+            ('task_id', pa.int64()), ('project_id', pa.int64()), ('phase_id', pa.int64()),
+            ('phase_name', pa.string()), ('status', pa.string()), ('assigned_to', pa.string()),
+            ('due_date', pa.timestamp('s')),
+        ]),
+    },
+    'test_cases': {
+        'query': "SELECT id AS test_case_id, project_id, status FROM test_cases",
+        'project': "project_id",
+        'timestamps': [],
+        'schema': pa.schema([('test_case_id', pa.int64()), ('project_id', pa.int64()), ('status', pa.string())]),
+    },
+    'crew_runs': {
+        'query': "SELECT id AS run_id, batch_id, project_id, crew_type, status, attempts, duration, "
+                 "created_at, updated_at FROM crew_batch_runs",
+        'project': "project_id",
+        'timestamps': ['created_at', 'updated_at'],
+        'schema': pa.schema([
+            ('run_id', pa.int64()), ('batch_id', pa.string()), ('project_id', pa.int64()),
+            ('crew_type', pa.string()), ('status', pa.string()), ('attempts', pa.int64()),
+            ('duration', pa.float64()), ('created_at', pa.timestamp('s')), ('updated_at', pa.timestamp('s')),
+        ]),
+    },
+}
+
+# LLM task attempts; not tied to a project, so appended to in parts
+LLM_CALLS_SCHEMA = pa.schema([
+    ('call_id', pa.int64()), ('route', pa.string()), ('tier', pa.string()), ('model', pa.string()),
+    ('latency_ms', pa.float64()), ('passed', pa.int64()), ('output_chars', pa.int64()),
+    ('created_at', pa.timestamp('s')),
+])
+
+# Parts of the LLM calls dataset merged into one once there are more than this
+LLM_CALLS_MAX_PARTS = 16
+
+# Datasets to refresh when the change feed shows a change to a table. Tasks
+# carry their phase's name, so phase changes refresh them too.
+CHANGE_DATASETS = {
+    'projects': ['projects'],
+    'phases': ['phases', 'tasks'],
+    'tasks': ['tasks'],
+    'test_cases': ['test_cases'],
+}
+
+STATE_FILE = '_state.json'
+
+class AnalyticsSnapshot:
+    """
+    Columnar copy of the project data for portfolio reporting
+
+    Projects, phases, tasks, test cases and crew batch runs are written to
+    Parquet files in output_dir, one dataset directory per table, split into
+    partitions by project ID (bucket=NN subdirectories). LLM task attempts
+    are appended in parts.
+
+    The first refresh writes everything. Later refreshes only rewrite the
+    partitions holding projects that changed: the change feed tells which
+    projects had project data changed, updated_at which had batch runs
+    updated, and LLM attempts are appended from the last ID written. A
+    partition file is replaced in one step, so readers never see half of it.
+    """
+
+    def __init__(self, db, output_dir=ANALYTICS_DIR, partitions=ANALYTICS_PARTITIONS):
+        self.db = db
+        self.output_dir = output_dir
+        self.partitions = partitions
+
+    def read_state(self):
+        """Get the state saved by the last refresh, or None if there is no snapshot"""
+        return read_snapshot_state(self.output_dir)
+
+    def refresh(self, full=False):
+        """
+        Bring the snapshot up to date with the database
+
+        Args:
+            full (bool): Rewrite everything instead of the changed partitions
+
+        Returns:
+            dict: Whether the refresh was 'full', the number of partitions
+            'written' per dataset, LLM 'calls_appended' and 'duration' in seconds
+        """
+        started = time.time()
+        state = self.read_state()
+        if (state is None or state.get('url') != self.db.url
+                or state.get('partitions') != self.partitions):
+            full = True
+
+        # Include writes still waiting in this process's write queue
+        self.db.write_queue.flush()
+
+        # Read the watermarks before the data, so nothing written meanwhile is missed
+        if full:
+            change_seq = self.db.latest_change_seq()
+            dirty = {name: set(range(self.partitions)) for name in PROJECT_DATASETS}
+        else:
+            change_seq, dirty, reset = self._changed_partitions(state['change_seq'])
+            if reset:
+                return self.refresh(full=True)
+            dirty['crew_runs'] = set()
+
+        conn = self.db.backend.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(updated_at) FROM crew_batch_runs")
+            runs_updated_at = cursor.fetchone()[0]
+            if not full and runs_updated_at is not None:
+                if state.get('runs_updated_at'):
+                    # Timestamps have whole seconds, so runs updated in the
+                    # second of the last refresh are read again
+                    cursor.execute(
+                        "SELECT DISTINCT project_id % ? FROM crew_batch_runs WHERE updated_at >= ?",
+                        (self.partitions, state['runs_updated_at'])
+                    )
+                    dirty['crew_runs'] = {row[0] for row in cursor.fetchall()}
+                else:
+                    dirty['crew_runs'] = set(range(self.partitions))
+
+            if full:
+                for name in [*PROJECT_DATASETS, 'llm_calls']:
+                    shutil.rmtree(os.path.join(self.output_dir, name), ignore_errors=True)
+            os.makedirs(self.output_dir, exist_ok=True)
+
+            written = {}
+            for name, dataset in PROJECT_DATASETS.items():
+                if dirty[name]:
+                    self._write_partitions(cursor, name, dataset, dirty[name])
+                written[name] = len(dirty[name])
+
+            last_call_id = 0 if full else state.get('last_call_id', 0)
+            appended, last_call_id = self._append_llm_calls(cursor, last_call_id)
+        finally:
+            conn.close()
+
+        state = {
+            'url': self.db.url,
+            'partitions': self.partitions,
+            'change_seq': change_seq,
+            'runs_updated_at': runs_updated_at,
+            'last_call_id': last_call_id,
+            'refreshed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        _write_atomic(os.path.join(self.output_dir, STATE_FILE), json.dumps(state, indent=2).encode('utf-8'))
+
+        return {
+            'full': full,
+            'written': written,
+            'calls_appended': appended,
+            'duration': time.time() - started,
+        }
+
+    def _changed_partitions(self, seq):
+        """
+        Read the change feed after seq
+
+        Returns:
+            tuple: (last seq read, partitions to rewrite per dataset, whether the feed was reset)
+        """
+        dirty = {name: set() for name in PROJECT_DATASETS}
+        while True:
+            feed = self.db.changes_since(seq, CHANGES_BATCH, list(CHANGE_DATASETS))
+            if feed['reset']:
+                return feed['last_seq'], dirty, True
+            for change in feed['changes']:
+                if change['project_id'] is None:
+                    continue
+                for name in CHANGE_DATASETS[change['table_name']]:
+                    dirty[name].add(change['project_id'] % self.partitions)
+            seq = feed['last_seq']
+            if len(feed['changes']) < CHANGES_BATCH:
+                return seq, dirty, False
+
+    def _write_partitions(self, cursor, name, dataset, buckets):
+        """Rewrite some partitions of a dataset from the database"""
+        cursor.execute(
+            f"{dataset['query']} WHERE {dataset['project']} % ? IN ({', '.join('?' for _ in buckets)})",
+            (self.partitions, *sorted(buckets))
+        )
+        frame = _to_frame(cursor, dataset['schema'], dataset['timestamps'])
+        groups = dict(tuple(frame.groupby(frame['project_id'] % self.partitions))) if len(frame) else {}
+
+        dataset_dir = os.path.join(self.output_dir, name)
+        for bucket in buckets:
+            path = os.path.join(dataset_dir, f"bucket={bucket:02d}", "data.parquet")
+            rows = groups.get(bucket)
+            if rows is None:
+                # Every row of the partition was deleted
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            table = pa.Table.from_pandas(rows, schema=dataset['schema'], preserve_index=False)
+            _write_table_atomic(table, path)
+
+    def _append_llm_calls(self, cursor, last_call_id):
+        """
+        Append the LLM task attempts recorded after last_call_id
+
+        Returns:
+            tuple: (number of attempts appended, ID of the last one)
+        """
+        cursor.execute(
+            "SELECT id AS call_id, route, tier, model, latency_ms, passed, output_chars, created_at "
+            "FROM llm_route_metrics WHERE id > ? ORDER BY id",
+            (last_call_id,)
+        )
+        frame = _to_frame(cursor, LLM_CALLS_SCHEMA, ['created_at'])
+        if not len(frame):
+            return 0, last_call_id
+
+        dataset_dir = os.path.join(self.output_dir, 'llm_calls')
+        os.makedirs(dataset_dir, exist_ok=True)
+        first_id, last_id = int(frame['call_id'].iloc[0]), int(frame['call_id'].iloc[-1])
+        table = pa.Table.from_pandas(frame, schema=LLM_CALLS_SCHEMA, preserve_index=False)
+        _write_table_atomic(table, os.path.join(dataset_dir, f"part-{first_id:012d}-{last_id:012d}.parquet"))
+
+        parts = sorted(part for part in os.listdir(dataset_dir) if part.endswith('.parquet'))
+        if len(parts) > LLM_CALLS_MAX_PARTS:
+            merged = pq.read_table(dataset_dir, schema=LLM_CALLS_SCHEMA)
+            first = parts[0].split('-')[1]
+            _write_table_atomic(merged, os.path.join(dataset_dir, f"part-{first}-{last_id:012d}.parquet"))
+            for part in parts:
+                if part != f"part-{first}-{last_id:012d}.parquet":
+                    os.remove(os.path.join(dataset_dir, part))
+        return len(frame), last_id
+
+def _to_frame(cursor, schema, timestamps):
+    """Read the rows of an executed query into a DataFrame typed for a schema"""
+    columns = [column[0] for column in cursor.description]
+    frame = pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns)
+    for column in timestamps:
+        # Dates are free text in some tables; anything unparseable becomes NaT
+        frame[column] = pd.to_datetime(frame[column], errors='coerce', format='mixed').astype('datetime64[s]')
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            frame[field.name] = frame[field.name].astype('Int64')
+    return frame
+
+def _write_table_atomic(table, path):
+    """Write a Parquet file under a temporary name and move it into place"""
+    pq.write_table(table, path + ".tmp", compression='zstd')
+    os.replace(path + ".tmp", path)
+
+def _write_atomic(path, data):
+    """Write a file under a temporary name and move it into place"""
+    with open(path + ".tmp", 'wb') as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+def read_snapshot_state(output_dir=ANALYTICS_DIR):
+    """Get the state saved by the last refresh of a snapshot, or None if there is none"""
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def load_snapshot(output_dir=ANALYTICS_DIR):
+    """
+    Read every dataset of a snapshot
+
+    Returns:
+        dict: DataFrame per dataset name (projects, phases, tasks, test_cases,
+        crew_runs, llm_calls); datasets without files are empty
+    """
+    schemas = {name: dataset['schema'] for name, dataset in PROJECT_DATASETS.items()}
+    schemas['llm_calls'] = LLM_CALLS_SCHEMA
+    frames = {}
+    for name, schema in schemas.items():
+        path = os.path.join(output_dir, name)
+        if os.path.isdir(path) and any(files for _, _, files in os.walk(path)):
+            table = pq.read_table(path, schema=schema)
+        else:
+            table = schema.empty_table()
+        frames[name] = table.to_pandas()
+    return frames
+
+# Metrics computed from a loaded snapshot
+
+def phase_throughput(phases, tasks):
+    """
+    Completion of phases and their tasks per phase name
+
+    Returns:
+        DataFrame: phase, phases, phases_completed, completion_rate,
+        median_days (start to end of completed phases), tasks,
+        tasks_completed and task_completion_rate; default phases first
+    """
+    phase_stats = phases.assign(
+        completed=phases['status'] == 'Completed',
+        days=(phases['end_date'] - phases['start_date']).dt.total_seconds() / 86400,
+    )
+    phase_stats['days'] = phase_stats['days'].where(phase_stats['completed'])
+    by_phase = phase_stats.groupby('name').agg(
+        phases=('phase_id', 'size'),
+        phases_completed=('completed', 'sum'),
+        median_days=('days', 'median'),
+    )
+    by_task = tasks.assign(completed=tasks['status'] == 'Completed').groupby('phase_name').agg(
+        tasks=('task_id', 'size'),
+        tasks_completed=('completed', 'sum'),
+    )
+    result = by_phase.join(by_task, how='outer').fillna({
+        'phases': 0, 'phases_completed': 0, 'tasks': 0, 'tasks_completed': 0
+    })
+    result['completion_rate'] = result['phases_completed'] / result['phases'].where(result['phases'] > 0)
+    result['task_completion_rate'] = result['tasks_completed'] / result['tasks'].where(result['tasks'] > 0)
+
+    order = {name: index for index, (name, _) in enumerate(DEFAULT_PHASES)}
+    result = result.reset_index(names='phase')
+    result = result.sort_values('phase', key=lambda names: names.map(lambda name: (order.get(name, len(order)), name)))
+    return result[['phase', 'phases', 'phases_completed', 'completion_rate', 'median_days',
+                   'tasks', 'tasks_completed', 'task_completion_rate']].reset_index(drop=True)
+
+def crew_run_durations(crew_runs):
+    """
+    Outcome and duration of batch crew runs per crew type
+
+    Returns:
+        DataFrame: crew_type, runs, completed, failed, success_rate,
+        avg_attempts and mean, median and 95th percentile duration in seconds
+    """
+    runs = crew_runs.assign(
+        completed=crew_runs['status'] == 'Completed',
+        failed=crew_runs['status'] == 'Failed',
+    )
+    result = runs.groupby('crew_type').agg(
+        runs=('run_id', 'size'),
+        completed=('completed', 'sum'),
+        failed=('failed', 'sum'),
+        avg_attempts=('attempts', 'mean'),
+        mean_duration=('duration', 'mean'),
+        median_duration=('duration', 'median'),
+        p95_duration=('duration', lambda durations: durations.quantile(0.95)),
+    ).reset_index()
+    finished = result['completed'] + result['failed']
+    result.insert(4, 'success_rate', result['completed'] / finished.where(finished > 0))
+    return result
+
+def test_pass_rates(test_cases, projects):
+    """
+    Test results per project
+
+    Returns:
+        DataFrame: project_id, project, tests, run, passed, failed and
+        pass_rate (passed of the tests run), lowest pass rate first
+    """
+    tests = test_cases.assign(
+        run=test_cases['status'].isin(['Passed', 'Failed']),
+        passed=test_cases['status'] == 'Passed',
+        failed=test_cases['status'] == 'Failed',
+    )
+    result = tests.groupby('project_id').agg(
+        tests=('test_case_id', 'size'),
+        run=('run', 'sum'),
+        passed=('passed', 'sum'),
+        failed=('failed', 'sum'),
+    ).reset_index()
+    result['pass_rate'] = result['passed'] / result['run'].where(result['run'] > 0)
+    result = result.merge(
+        projects[['project_id', 'name']].rename(columns={'name': 'project'}), on='project_id', how='left'
+    )
+    result = result.sort_values(['pass_rate', 'tests'], ascending=[True, False], na_position='last')
+    return result[['project_id', 'project', 'tests', 'run', 'passed', 'failed', 'pass_rate']].reset_index(drop=True)
+
+def llm_route_summary(llm_calls):
+    """
+    LLM task attempts per route and model
+
+    Returns:
+        DataFrame: route, model, attempts, avg and 95th percentile latency
+        in milliseconds and validation pass_rate
+    """
+    return llm_calls.groupby(['route', 'model']).agg(
+        attempts=('call_id', 'size'),
+        avg_latency_ms=('latency_ms', 'mean'),
+        p95_latency_ms=('latency_ms', lambda latencies: latencies.quantile(0.95)),
+        pass_rate=('passed', 'mean'),
+    ).reset_index()
+
+class AnalyticsScheduler:
+    """Refreshes an analytics snapshot every interval seconds on a background thread"""
+
+    def __init__(self, snapshot, interval=900, report=print):
+        self.snapshot = snapshot
+        self.interval = interval
+        self.report = report
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, full=False):
+        """Refresh the snapshot once, reporting instead of raising errors"""
+        try:
+            result = self.snapshot.refresh(full)
+            written = sum(result['written'].values())
+            self.report(f"Analytics snapshot {'rebuilt' if result['full'] else 'refreshed'}: "
+                        f"{written} partitions written, {result['calls_appended']} LLM calls appended "
+                        f"in {result['duration']:.1f}s")
+            return result
+        except Exception as e:
+            self.report(f"Analytics snapshot refresh failed: {str(e)}")
+            return None
+
+    def run(self):
+        """Refresh the snapshot until stopped"""
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start refreshing on a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="analytics-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop refreshing"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import functools
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from database.db_manager import DatabaseManager
+
+# DatabaseManager methods that only read, run concurrently on the reader threads
+READ_METHODS = (
+    'get_projects', 'get_project', 'get_projects_page', 'count_projects', 'search_projects',
+    'get_phases', 'get_phase',
+    'get_tasks', 'get_task',
+    'get_overdue_tasks', 'get_tasks_due_between', 'get_tasks_due_this_week', 'get_phases_active_between',
+    'get_flag_counts', 'get_flagged_overdue_tasks', 'get_flagged_stalled_phases',
+    'get_documents', 'get_document', 'get_latest_document', 'search_documents',
+    'get_document_revisions', 'get_document_revision', 'diff_document_revisions',
+    'compare_document_revisions',
+    'get_test_cases', 'get_test_case',
+    'latest_change_seq', 'changes_since',
+)
+
+# DatabaseManager methods that write, run one at a time on the writer thread
+WRITE_METHODS = (
+    'create_project', 'update_project',
+    'create_phase', 'update_phase',
+    'create_task', 'update_task',
+    'create_document', 'save_document', 'add_document_revision',
+    'create_test_case', 'update_test_case',
+    'export_jsonl', 'import_jsonl', 'import_records',
+    'compact_changes', 'sweep_flags',
+)
+
+class AsyncDatabaseManager:
+    """
+    Asyncio front end for DatabaseManager
+
+    Offers the same methods as DatabaseManager as coroutines. Writes are
+    serialized on a single writer thread, reads run on a pool of reader
+    threads, so awaiting database calls never blocks the event loop and
+    independent reads can overlap with each other and with other I/O.
+    SQLite databases are switched to WAL mode so readers are not blocked by
+    the writer.
+    """
+
+    def __init__(self, db_path=None, readers=4):
+        self.db = DatabaseManager(db_path)
+        self.db_path = self.db.db_path
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+        self._enable_wal()
+
+    def _enable_wal(self):
+        """Switch an SQLite database to write-ahead logging"""
+        if self.db.backend.name != 'sqlite':
+            return
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+
+    async def _run(self, executor, method, *args, **kwargs):
+        """Run a DatabaseManager method on one of the executors"""
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so tracing spans nest under the caller's span
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, method, *args, **kwargs))
+
+    async def run_read(self, function, *args, **kwargs):
+        """Run any read-only callable taking the DatabaseManager on the reader threads"""
+        return await self._run(self._readers, function, self.db, *args, **kwargs)
+
+    async def run_write(self, function, *args, **kwargs):
+        """Run any writing callable taking the DatabaseManager on the writer thread"""
+        return await self._run(self._writer, function, self.db, *args, **kwargs)
+
+    def close(self):
+        """Wait for pending calls and stop the executor threads"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+def _make_async_method(name, executor_attr):
+    """Create a coroutine method that runs a DatabaseManager method on an executor"""
+    method = getattr(DatabaseManager, name)
+
+    @functools.wraps(method)
+    async def async_method(self, *args, **kwargs):
+        return await self._run(getattr(self, executor_attr), getattr(self.db, name), *args, **kwargs)
+
+    return async_method
+
+for _name in READ_METHODS:
+    setattr(AsyncDatabaseManager, _name, _make_async_method(_name, '_readers'))
+
+for _name in WRITE_METHODS:
+    setattr(AsyncDatabaseManager, _name, _make_async_method(_name, '_writer'))
@@ -0,0 +1,331 @@
+import os
+import re
+import sqlite3
+import threading
+
+from config.settings import DATABASE_POOL_SIZE, DATABASE_POOL_TIMEOUT
+
+# Key of the PostgreSQL advisory lock standing in for SQLite's BEGIN IMMEDIATE
+WRITE_LOCK_KEY = 7310452
+
+# The current time in SQLite's CURRENT_TIMESTAMP format (UTC, 'YYYY-MM-DD HH:MM:SS')
+_PG_CURRENT_TIMESTAMP = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+
+_STRING_LITERAL_RE = re.compile(r"('(?:[^']|'')*')")
+_PRAGMA_RE = re.compile(r"^\s*PRAGMA\s+(\w+)\s*(?:=\s*(\w+))?\s*;?\s*$", re.IGNORECASE)
+_BEGIN_RE = re.compile(r"^\s*BEGIN(?:\s+(DEFERRED|IMMEDIATE|EXCLUSIVE))?(?:\s+TRANSACTION)?\s*;?\s*$", re.IGNORECASE)
+_DDL_RE = re.compile(r"^\s*(?:CREATE|ALTER)\s+TABLE\b", re.IGNORECASE)
+_INSERT_RE = re.compile(r"^\s*INSERT\s+INTO\s+(\w+)", re.IGNORECASE)
+
+# Rewrites of SQLite SQL for PostgreSQL, applied outside string literals
+_PG_REWRITES = [
+    (re.compile(r"\bIS\s+NOT\s+\?", re.IGNORECASE), "IS DISTINCT FROM ?"),
+    (re.compile(r"\bIS\s+NOT\s+(?=excluded\.)", re.IGNORECASE), "IS DISTINCT FROM "),
+    (re.compile(r"\bIS\s+\?", re.IGNORECASE), "IS NOT DISTINCT FROM ?"),
+    (re.compile(r"\bLIKE\b", re.IGNORECASE), "ILIKE"),
+    (re.compile(r"\bCURRENT_TIMESTAMP\b", re.IGNORECASE), _PG_CURRENT_TIMESTAMP),
+]
+
+# Rewrites of SQLite column types and clauses in CREATE/ALTER TABLE statements
+_PG_DDL_REWRITES = [
+    (re.compile(r"\bINTEGER\s+PRIMARY\s+KEY\s+AUTOINCREMENT\b", re.IGNORECASE), "SERIAL PRIMARY KEY"),
+    (re.compile(r"\bBLOB\b", re.IGNORECASE), "BYTEA"),
+    (re.compile(r"\bREAL\b", re.IGNORECASE), "DOUBLE PRECISION"),
+    # Timestamps are kept as text, as SQLite stores them
+    (re.compile(r"\bTIMESTAMP\b", re.IGNORECASE), "TEXT"),
+    (re.compile(r"\bADD\s+COLUMN\s+(?!IF\b)", re.IGNORECASE), "ADD COLUMN IF NOT EXISTS "),
+]
+
+def translate_sql(sql, has_params=True):
+    """
+    Translate a statement written for SQLite into PostgreSQL
+
+    ? placeholders become %s, LIKE becomes the case-insensitive ILIKE,
+    IS ? becomes IS NOT DISTINCT FROM %s (IS NOT ? and IS NOT
+    excluded.<column> become IS DISTINCT FROM) and CURRENT_TIMESTAMP produces
+    the text SQLite would. CREATE/ALTER TABLE statements also get their
+    column types mapped. String literals are left alone.
+
+    Args:
+        sql (str): SQLite statement
+        has_params (bool): Whether the statement is run with parameters; %
+            signs are only escaped for statements that are
+
+    Returns:
+        str: PostgreSQL statement
+    """
+    is_ddl = _DDL_RE.match(sql) is not None
+    parts = _STRING_LITERAL_RE.split(sql)
+    for index, part in enumerate(parts):
+        if has_params:
+            part = part.replace('%', '%%')
+        if index % 2 == 0:
+            for pattern, replacement in _PG_REWRITES:
+                part = pattern.sub(replacement, part)
+            if is_ddl:
+                for pattern, replacement in _PG_DDL_REWRITES:
+                    part = pattern.sub(replacement, part)
+            part = part.replace('?', '%s')
+        parts[index] = part
+    return "".join(parts)
+
+class SQLiteBackend:
+    """Database file opened with the sqlite3 module; the default backend"""
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self.url = f"sqlite:///{os.path.abspath(path)}"
+
+    def connect(self):
+        """Open a connection"""
+        return sqlite3.connect(self.path)
+
+class PostgresBackend:
+    """
+    PostgreSQL server reached through a pool of psycopg2 connections
+
+    Connections handed out by connect() behave like sqlite3 connections for
+    the statements DatabaseManager runs: SQL is translated with
+    translate_sql, row_factory = sqlite3.Row gives rows that can be indexed
+    by column name, PRAGMA user_version is kept in a schema_version table
+    and BEGIN IMMEDIATE takes a database-wide advisory lock. Closing a
+    connection rolls back anything uncommitted and returns it to the pool.
+    """
+
+    name = 'postgresql'
+
+    def __init__(self, url, pool_size=DATABASE_POOL_SIZE, timeout=DATABASE_POOL_TIMEOUT):
+        self.url = url
+        self.path = None
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = None
+        self._pool_pid = None
+        self._inherited_pools = []
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Get the connection pool of this process, creating it on first use"""
+        with self._lock:
+            # Connections cannot be shared with forked worker processes
+            if self._pool is None or self._pool_pid != os.getpid():
+                if self._pool is not None:
+                    # Keep the parent's pool referenced: closing its connections
+                    # here would close the sockets the parent is still using
+                    self._inherited_pools.append(self._pool)
+                try:
+                    from psycopg2.pool import ThreadedConnectionPool
+                except ImportError:
+                    raise ImportError("PostgreSQL databases need psycopg2: pip install psycopg2-binary")
+                self._pool = ThreadedConnectionPool(1, self.pool_size, dsn=self.url)
+                self._pool_pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(self.pool_size)
+            return self._pool, self._slots
+
+    def connect(self):
+        """Take a connection from the pool, waiting up to timeout seconds for one to be free"""
+        pool, slots = self._get_pool()
+        if not slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection free after {self.timeout}s (pool size {self.pool_size})")
+        try:
+            conn = pool.getconn()
+            _register_float_decimals(conn)
+        except Exception:
+            slots.release()
+            raise
+        return PostgresConnection(conn, lambda: self._release(pool, slots, conn))
+
+    @staticmethod
+    def _release(pool, slots, conn):
+        """Return a connection to its pool"""
+        try:
+            if not conn.closed:
+                conn.rollback()
+            pool.putconn(conn, close=bool(conn.closed))
+        except Exception:
+            pool.putconn(conn, close=True)
+        finally:
+            slots.release()
+
+def _register_float_decimals(conn):
+    """Return NUMERIC results (AVG, SUM of reals) as floats, as SQLite does"""
+    import psycopg2.extensions
+    float_decimals = psycopg2.extensions.new_type(
+        psycopg2.extensions.DECIMAL.values, 'FLOAT_DECIMAL',
+        lambda value, cursor: float(value) if value is not None else None
+    )
+    psycopg2.extensions.register_type(float_decimals, conn)
+
+class PostgresConnection:
+    """Pooled psycopg2 connection with the parts of the sqlite3 connection API DatabaseManager uses"""
+
+    # Lets migrations tell this connection from an sqlite3 one
+    dialect = 'postgresql'
+
+    def __init__(self, conn, release):
+        self._conn = conn
+        self._release = release
+        self.row_factory = None
+
+    def cursor(self):
+        if self.row_factory is not None:
+            from psycopg2.extras import DictCursor
+            return PostgresCursor(self._conn, self._conn.cursor(cursor_factory=DictCursor))
+        return PostgresCursor(self._conn, self._conn.cursor())
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn = None
+            self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Like sqlite3: commit or roll back the transaction, keep the connection open
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+class PostgresCursor:
+    """psycopg2 cursor taking SQLite statements"""
+
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
+        self._rows = None
+        self._insert_table = None
+
+    def execute(self, sql, parameters=()):
+        self._rows = None
+        self._insert_table = None
+        pragma = _PRAGMA_RE.match(sql)
+        if pragma:
+            self._pragma(pragma.group(1).lower(), pragma.group(2))
+            return self
+        begin = _BEGIN_RE.match(sql)
+        if begin:
+            # psycopg2 starts transactions itself; an immediate transaction
+            # also takes the write lock, as SQLite's would
+            if (begin.group(1) or '').upper() in ('IMMEDIATE', 'EXCLUSIVE'):
+                self._cursor.execute("SELECT pg_advisory_xact_lock(%s)", (WRITE_LOCK_KEY,))
+            return self
+        parameters = tuple(parameters) if parameters else None
+        self._cursor.execute(translate_sql(sql, parameters is not None), parameters)
+        insert = _INSERT_RE.match(sql)
+        if insert:
+            self._insert_table = insert.group(1)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        from psycopg2.extras import execute_batch
+        self._rows = None
+        execute_batch(self._cursor, translate_sql(sql), [tuple(parameters) for parameters in seq_of_parameters])
+        return self
+
+    def _pragma(self, name, value):
+        """Emulate the PRAGMAs DatabaseManager uses; others have no PostgreSQL equivalent and do nothing"""
+        if name != 'user_version':
+            self._rows = []
+            return
+        self._cursor.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        if value is None:
+            self._cursor.execute("SELECT version FROM schema_version")
+            row = self._cursor.fetchone()
+            self._rows = [(row[0] if row else 0,)]
+        else:
+            self._cursor.execute("DELETE FROM schema_version")
+            self._cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (int(value),))
+            self._rows = []
+
+    @property
+    def lastrowid(self):
+        # The ID sequence of the table inserted into; lastval() could belong
+        # to a row a trigger inserted elsewhere
+        if self._insert_table is None:
+            return None
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute("SELECT currval(pg_get_serial_sequence(%s, 'id'))", (self._insert_table,))
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        if self._rows is not None:
+            return None
+        return self._cursor.description
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        if self._rows is not None:
+            rows, self._rows = self._rows[:size or 1], self._rows[size or 1:]
+            return rows
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+# Backends created so far, per URL, so that connection pools are shared
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(url):
+    """
+    Get the backend of a database URL or path
+
+    Args:
+        url (str): A path to an SQLite file, a sqlite:/// URL or a
+            postgresql:// (or postgres://) URL
+
+    Returns:
+        SQLiteBackend or PostgresBackend: Backend shared by all callers using the same URL
+    """
+    with _backends_lock:
+        backend = _backends.get(url)
+        if backend is None:
+            if url.startswith(('postgresql://', 'postgres://')):
+                backend = PostgresBackend(url)
+            elif url.startswith('sqlite:///'):
+                backend = SQLiteBackend(url[len('sqlite:///'):])
+            elif '://' in url:
+                raise ValueError(f"Unsupported database URL: {url.split('://', 1)[0]}://")
+            else:
+                backend = SQLiteBackend(url)
+            _backends[url] = backend
+        return backend
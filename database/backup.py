@@ -0,0 +1,258 @@
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from config.settings import BACKUP_DIR, BACKUP_KEEP
+
+# Pages copied per backup step; locks are released between steps
+PAGES_PER_STEP = 1024
+
+# Seconds to wait between backup steps, giving writers a chance to run
+STEP_SLEEP = 0.005
+
+# A write to the source database by another connection restarts an
+# incremental backup. After this many restarts the rest is copied in one step.
+MAX_RESTARTS = 3
+
+# Snapshot file names: <database name>-<YYYYmmdd-HHMMSS>[-n].db.gz
+_SNAPSHOT_RE = re.compile(r'^(?P<name>.+)-(?P<stamp>\d{8}-\d{6})(?:-\d+)?\.db\.gz$')
+
+class _TooManyRestarts(Exception):
+    pass
+
+def _copy_database(source_path, target_path, pages=PAGES_PER_STEP, sleep=STEP_SLEEP):
+    """
+    Copy a live database with the SQLite online backup API
+
+    The copy is made in steps of pages, so writers are only blocked for the
+    duration of one step. If other connections keep changing the database
+    the copy restarts; after MAX_RESTARTS restarts the remaining copy is
+    done in a single step.
+
+    Returns:
+        int: Number of restarts
+    """
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=sleep)
+        except _TooManyRestarts:
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+        source.close()
+    return min(restarts, MAX_RESTARTS)
+
+def _check_integrity(db_path):
+    """Raise an error if a database file is damaged"""
+    conn = sqlite3.connect(db_path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise sqlite3.DatabaseError(f"Integrity check of {db_path} failed: {result}")
+
+def _snapshot_path(db_path, backup_dir, when):
+    """Get an unused snapshot file name for a database"""
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    stamp = when.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(backup_dir, f"{name}-{stamp}.db.gz")
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(backup_dir, f"{name}-{stamp}-{counter}.db.gz")
+        counter += 1
+    return path
+
+def create_snapshot(db_path='database/projects.db', backup_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """
+    Take a compressed snapshot of a live database
+
+    The database is copied with the online backup API into a temporary
+    file, checked for integrity and gzip-compressed into backup_dir.
+    Compression happens after the copy, so it never holds a lock on the
+    live database. Older snapshots beyond keep are deleted.
+
+    Args:
+        db_path (str): Path to the database to back up
+        backup_dir (str): Directory the snapshots are kept in
+        keep (int): Number of snapshots of this database to keep (0 keeps all)
+
+    Returns:
+        dict: Path, size in bytes, duration in seconds and number of restarts
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database not found: {db_path}")
+    os.makedirs(backup_dir, exist_ok=True)
+
+    started = time.time()
+    path = _snapshot_path(db_path, backup_dir, datetime.now())
+    copy_path = path[:-len('.gz')] + ".tmp"
+    try:
+        restarts = _copy_database(db_path, copy_path)
+        _check_integrity(copy_path)
+        with open(copy_path, 'rb') as source, gzip.open(path + ".tmp", 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(path + ".tmp", path)
+    finally:
+        for leftover in (copy_path, path + ".tmp"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    if keep:
+        prune_snapshots(db_path, backup_dir, keep)
+
+    return {
+        'path': path,
+        'size': os.path.getsize(path),
+        'duration': time.time() - started,
+        'restarts': restarts,
+    }
+
+def list_snapshots(db_path='database/projects.db', backup_dir=BACKUP_DIR):
+    """
+    List the snapshots of a database, newest first
+
+    Returns:
+        list: Snapshots as dicts with path, taken_at (datetime) and size
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    snapshots = []
+    for file_name in os.listdir(backup_dir):
+        match = _SNAPSHOT_RE.match(file_name)
+        if not match or match.group('name') != name:
+            continue
+        path = os.path.join(backup_dir, file_name)
+        snapshots.append({
+            'path': path,
+            'taken_at': datetime.strptime(match.group('stamp'), '%Y%m%d-%H%M%S'),
+            'size': os.path.getsize(path),
+        })
+    snapshots.sort(key=lambda snapshot: (snapshot['taken_at'], snapshot['path']), reverse=True)
+    return snapshots
+
+def prune_snapshots(db_path='database/projects.db', backup_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """
+    Delete all but the newest keep snapshots of a database
+
+    Returns:
+        list: Paths of the deleted snapshots
+    """
+    removed = []
+    for snapshot in list_snapshots(db_path, backup_dir)[keep:]:
+        os.remove(snapshot['path'])
+        removed.append(snapshot['path'])
+    return removed
+
+def find_snapshot(db_path='database/projects.db', backup_dir=BACKUP_DIR, at=None):
+    """Get the newest snapshot taken at or before a point in time, or None"""
+    for snapshot in list_snapshots(db_path, backup_dir):
+        if at is None or snapshot['taken_at'] <= at:
+            return snapshot
+    return None
+
+def restore_snapshot(snapshot_path, db_path='database/projects.db', backup_dir=BACKUP_DIR):
+    """
+    Restore a database from a snapshot
+
+    The snapshot is decompressed and checked first, and a snapshot of the
+    current database is taken before it is overwritten. The restore itself
+    goes through the backup API, so connections that are open on the
+    database see either the old or the restored content.
+
+    Args:
+        snapshot_path (str): Snapshot file (.db.gz, or an uncompressed .db)
+        db_path (str): Database to restore into
+        backup_dir (str): Directory for the snapshot of the current database
+
+    Returns:
+        str: Path of the snapshot taken of the current database, or None if it did not exist
+    """
+    copy_path = f"{db_path}.restore.tmp"
+    try:
+        if snapshot_path.endswith('.gz'):
+            with gzip.open(snapshot_path, 'rb') as source, open(copy_path, 'wb') as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+        else:
+            shutil.copyfile(snapshot_path, copy_path)
+        _check_integrity(copy_path)
+
+        previous = None
+        if os.path.exists(db_path):
+            previous = create_snapshot(db_path, backup_dir, keep=0)['path']
+
+        source = sqlite3.connect(copy_path)
+        target = sqlite3.connect(db_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        return previous
+    finally:
+        if os.path.exists(copy_path):
+            os.remove(copy_path)
+
+class BackupScheduler:
+    """Takes a snapshot of a database every interval seconds on a background thread"""
+
+    def __init__(self, db_path='database/projects.db', backup_dir=BACKUP_DIR, interval=3600, keep=BACKUP_KEEP,
+                 report=print):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.keep = keep
+        self.report = report
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Take one snapshot, reporting instead of raising errors"""
+        try:
+            result = create_snapshot(self.db_path, self.backup_dir, self.keep)
+            self.report(f"Backup {result['path']} written ({result['size'] / 1024:,.0f} KiB "
+                        f"in {result['duration']:.1f}s, {result['restarts']} restarts)")
+            return result
+        except Exception as e:
+            self.report(f"Backup of {self.db_path} failed: {str(e)}")
+            return None
+
+    def run(self):
+        """Take snapshots until stopped"""
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start taking snapshots on a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="backup-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop taking snapshots"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
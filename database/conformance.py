@@ -0,0 +1,394 @@
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from datetime import date, timedelta
+
+# Add the project root to the path so we can import our modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from database.db_manager import DatabaseManager
+from database.write_queue import COMMITTED
+from models.project_models import DocumentRevision, Project
+
+# Format of the timestamps SQLite's CURRENT_TIMESTAMP writes
+_TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+def check(condition, message):
+    """Fail the current check with a message unless condition holds"""
+    if not condition:
+        raise AssertionError(message)
+
+def check_projects(db, tag):
+    """Projects are created, read, updated, paged, counted and searched case-insensitively"""
+    before = db.count_projects()
+    ids = [db.create_project(f"{tag} project {index}", f"Description {index}") for index in range(3)]
+    check(all(isinstance(project_id, int) for project_id in ids), f"IDs are not ints: {ids}")
+
+    project = db.get_project(ids[0])
+    check(isinstance(project, Project), f"get_project returned {type(project).__name__}")
+    check(project['status'] == 'Not Started', f"default status is {project['status']!r}")
+    check(_TIMESTAMP_RE.match(project['created_at'] or ""), f"created_at is {project['created_at']!r}")
+
+    db.update_project(ids[0], name=f"{tag} renamed", status="In Progress")
+    project = db.get_project(ids[0])
+    check((project['name'], project['status']) == (f"{tag} renamed", "In Progress"), f"update_project gave {project}")
+
+    check(db.count_projects() == before + 3, "count_projects did not grow by 3")
+    check(db.count_projects(status="In Progress") >= 1, "count_projects by status missed the update")
+    page = [p['id'] for p in db.get_projects_page(limit=2)]
+    check(page == [ids[2], ids[1]], f"newest projects page is {page}, expected {[ids[2], ids[1]]}")
+
+    found = {p['id'] for p in db.search_projects(tag.upper())}
+    check(found == set(ids), f"search_projects found {sorted(found)}, expected {sorted(ids)}")
+    check(db.get_project(-1) is None, "get_project of a missing ID is not None")
+    return ids[0]
+
+def check_phases_and_tasks(db, tag):
+    """Phases and tasks are created, updated and streamed in order"""
+    project_id = db.create_project(f"{tag} phases", "")
+    phase_ids = [db.create_phase(project_id, f"Phase {index}", "") for index in range(2)]
+    task_ids = [db.create_task(phase_id, f"Task {index}", "", assigned_to="analyst", due_date="2030-01-31")
+                for phase_id in reversed(phase_ids) for index in range(2)]
+
+    db.update_phase(phase_ids[0], status="Completed", start_date="2030-01-01")
+    phase = db.get_phase(phase_ids[0])
+    check((phase['status'], phase['start_date']) == ("Completed", "2030-01-01"), f"update_phase gave {phase}")
+
+    db.update_task(task_ids[0], status="Completed", assigned_to=None)
+    task = db.get_task(task_ids[0])
+    check(task['status'] == "Completed" and task['assigned_to'] == "analyst", f"update_task gave {task}")
+
+    check([p['id'] for p in db.get_phases(project_id)] == phase_ids, "get_phases is not in ID order")
+    streamed = [task['id'] for task in db.iter_project_tasks(project_id, chunk_size=1)]
+    check(streamed == task_ids[2:] + task_ids[:2], f"iter_project_tasks gave {streamed}")
+
+def check_date_ranges(db, tag):
+    """Due and phase dates are queried by day, whatever text they were entered as"""
+    today = date.today()
+    project_id = db.create_project(f"{tag} dates", "")
+    phase_id = db.create_phase(project_id, "Build", "")
+    due = {
+        "overdue": (today - timedelta(days=3)).isoformat(),
+        "today": f"{today.isoformat()} 17:30:00",
+        "done": (today - timedelta(days=1)).isoformat(),
+        "later": (today + timedelta(days=30)).isoformat(),
+        "bad": "now",
+        "none": None,
+    }
+    ids = {name: db.create_task(phase_id, name, "", due_date=due_date) for name, due_date in due.items()}
+    db.update_task(ids["done"], status="Completed")
+    check(db.get_task(ids["bad"])['due_ts'] is None, "a due date that is not a date got a timestamp")
+
+    overdue = [task['id'] for task in db.get_overdue_tasks(project_id=project_id)]
+    check(overdue == [ids["overdue"]], f"overdue tasks are {overdue}")
+    check(db.get_overdue_tasks(project_id=project_id)[0]['phase_name'] == "Build", "overdue tasks lack their phase")
+    upcoming = [task['id'] for task in db.get_tasks_due_between(today, today + timedelta(days=30), project_id)]
+    check(upcoming == [ids["today"], ids["later"]], f"tasks due in the next 30 days are {upcoming}")
+    this_week = [task['id'] for task in db.get_tasks_due_this_week(project_id=project_id)]
+    check(this_week == [ids["today"]], f"tasks due this week are {this_week}")
+
+    db.update_phase(phase_id, start_date=(today - timedelta(days=10)).isoformat(),
+                    end_date=(today - timedelta(days=5)).isoformat())
+    running_id = db.create_phase(project_id, "Run", "")
+    db.update_phase(running_id, start_date=(today - timedelta(days=2)).isoformat())
+    active = [phase['id'] for phase in db.get_phases_active_between(today - timedelta(days=5), today, project_id)]
+    check(active == [phase_id, running_id], f"phases active in the last 5 days are {active}")
+    active = [phase['id'] for phase in db.get_phases_active_between(today - timedelta(days=4), today, project_id)]
+    check(active == [running_id], f"phases active in the last 4 days are {active}")
+
+def check_flag_sweeps(db, tag):
+    """Incremental sweeps flag the same overdue tasks and stalled phases as a full rebuild"""
+    today = date.today()
+    project_id = db.create_project(f"{tag} flags", "")
+    phase_id = db.create_phase(project_id, "Build", "")
+    ids = [db.create_task(phase_id, f"Task {days}", "", due_date=(today + timedelta(days=days)).isoformat())
+           for days in (-3, -1, 0, 2)]
+    db.sweep_flags()
+
+    def flagged(now=None):
+        db.sweep_flags(now=now)
+        tasks = [task['id'] for task in db.get_flagged_overdue_tasks(project_id=project_id)]
+        phases = [phase['id'] for phase in db.get_flagged_stalled_phases(project_id=project_id)]
+        return tasks, phases
+
+    check(flagged() == (ids[:2], []), f"overdue tasks are {flagged()[0]}")
+    db.update_task(ids[0], status="Completed")
+    db.update_task(ids[3], due_date=(today - timedelta(days=5)).isoformat())
+    check(flagged() == ([ids[3], ids[1]], []), f"changed tasks were not rechecked: {flagged()[0]}")
+    db.update_phase(phase_id, status="In Progress")
+    check(db.get_phase(phase_id)['status_ts'] is not None, "a status change did not set status_ts")
+    three_weeks = time.time() + 21 * 24 * 60 * 60
+    check(flagged(three_weeks) == ([ids[3], ids[1], ids[2]], [phase_id]), "later sweeps missed newly due items")
+
+    incremental = flagged(three_weeks)
+    db.sweep_flags(now=three_weeks, full=True)
+    check(flagged(three_weeks) == incremental, "a full sweep disagrees with the incremental ones")
+    check(db.get_flag_counts()['overdue_task']['flagged'] >= 3, "flag counts were not updated")
+    db.update_phase(phase_id, status="Completed")
+    check(flagged(three_weeks)[1] == [], "a completed phase is still stalled")
+
+def check_documents(db, tag):
+    """Saving a document again adds a revision that can be read back and diffed"""
+    project_id = db.create_project(f"{tag} documents", "")
+    first = "# Requirements\n\nThe system shall export reports.\n"
+    second = first + "\nThe system shall import CSV files with 100% accuracy.\n"
+
+    doc_id = db.save_document(project_id, "Requirements", first, "Requirements")
+    check(db.save_document(project_id, "Requirements", second, "Requirements") == doc_id,
+          "saving again created a new document")
+    check(db.get_document(doc_id)['revision'] == 2, "saving again did not add a revision")
+
+    revisions = db.get_document_revisions(doc_id)
+    check([r['revision'] for r in revisions] == [2, 1], f"revisions are {[r['revision'] for r in revisions]}")
+    check(all(isinstance(r, DocumentRevision) for r in revisions), "revisions are not DocumentRevision models")
+    check(db.get_document_revision(doc_id, 1) == first, "revision 1 does not read back")
+    check(db.get_document_revision(doc_id, 2) == second, "revision 2 does not read back")
+    check(db.get_document_revision(doc_id, 3) is None, "a missing revision is not None")
+    check("+The system shall import CSV files" in db.diff_document_revisions(doc_id, 1, 2), "diff misses the change")
+    comparison = db.compare_document_revisions(doc_id, 1, 2)
+    check(comparison is not None and (comparison['added'], comparison['removed']) == (2, 0),
+          f"side-by-side comparison counts are wrong: {comparison and (comparison['added'], comparison['removed'])}")
+    check([s['status'] for s in comparison['sections']] == ['changed'], "the changed section was not found")
+    check(db.compare_document_revisions(doc_id, 1, 2) is comparison, "the comparison was not cached")
+    check(db.compare_document_revisions(doc_id, 1, 3) is None, "comparing a missing revision is not None")
+
+    latest = db.get_latest_document(project_id, "Requirements")
+    check(latest is not None and latest['id'] == doc_id, "get_latest_document missed the document")
+    found = db.search_documents("CSV FILES", project_id=project_id)
+    check([d['id'] for d in found] == [doc_id], "search_documents did not match content case-insensitively")
+    check('content' not in found[0], "search_documents returned content")
+    check(db.search_documents("100%", project_id=project_id), "search_documents did not match a % sign")
+    light = list(db.iter_documents(project_id, with_content=False))
+    check(len(light) == 1 and 'content' not in light[0], "iter_documents(with_content=False) returned content")
+
+def check_test_cases(db, tag):
+    """Test cases are created and updated"""
+    project_id = db.create_project(f"{tag} test cases", "")
+    test_id = db.create_test_case(project_id, "Login", "Log in with a valid user", "Dashboard is shown")
+    db.update_test_case(test_id, actual_result="Dashboard is shown", status="Passed")
+    tests = db.get_test_cases(project_id)
+    check([(t['id'], t['status']) for t in tests] == [(test_id, "Passed")], f"get_test_cases gave {tests}")
+    check(db.get_test_case(test_id)['actual_result'] == "Dashboard is shown", "update_test_case lost actual_result")
+
+def check_crew_leases(db, tag):
+    """A running lease blocks other owners until it is finished; old leases are purged"""
+    key = f"{tag}-lease"
+    taken, lease = db.acquire_crew_lease(key, 1, "requirements", "fp", "owner-a", ttl=60)
+    check(taken and lease['owner'] == "owner-a", f"first acquire gave {taken}, {lease}")
+    taken, lease = db.acquire_crew_lease(key, 1, "requirements", "fp", "owner-b", ttl=60)
+    check(not taken and lease['owner'] == "owner-a", "a running lease was taken over")
+    check(db.renew_crew_lease(key, "owner-a", 60), "the holder could not renew its lease")
+    check(not db.renew_crew_lease(key, "owner-b", 60), "another owner renewed the lease")
+
+    db.finish_crew_lease(key, "owner-a", "Completed", document_id=7, revision=2)
+    check(db.get_crew_lease(key)['document_id'] == 7, "finish_crew_lease did not record the document")
+    taken, lease = db.acquire_crew_lease(key, 1, "requirements", "fp", "owner-b", ttl=60)
+    check(taken and lease['owner'] == "owner-b", "a finished lease could not be taken")
+    check(lease['document_id'] is None and lease['finished_at'] is None, "a retaken lease kept the old outcome")
+
+    finished, stale = f"{tag}-finished-lease", f"{tag}-stale-lease"
+    db.acquire_crew_lease(finished, 1, "design", "fp", "owner-a", ttl=60)
+    db.finish_crew_lease(finished, "owner-a", "Completed")
+    db.acquire_crew_lease(stale, 1, "testing", "fp", "owner-a", ttl=-1)
+    taken, _ = db.acquire_crew_lease(key, 1, "requirements", "fp", "owner-c", ttl=60, retention_hours=0)
+    check(not taken, "a running lease was taken over while purging")
+    check(db.get_crew_lease(finished) is None and db.get_crew_lease(stale) is None,
+          "finished and expired leases past retention were kept")
+    check(db.get_crew_lease(key)['owner'] == "owner-b", "purging removed a running lease")
+
+def check_crew_batches(db, tag):
+    """Adding batch runs twice keeps one run per project and crew; summaries count by status"""
+    batch_id = f"{tag}-batch"
+    db.add_crew_batch_runs(batch_id, [1, 2], ["requirements", "design"])
+    db.add_crew_batch_runs(batch_id, [1, 2], ["requirements", "design"])
+    runs = db.get_crew_batch_runs(batch_id)
+    check(len(runs) == 4, f"batch has {len(runs)} runs, expected 4")
+
+    db.update_crew_batch_run(runs[0]['id'], "Completed", document_id=3, duration=1.5, attempted=True)
+    db.update_crew_batch_run(runs[1]['id'], "Failed", error="boom", attempted=True)
+    check(len(db.get_crew_batch_runs(batch_id, status="Pending")) == 2, "status filter is wrong")
+    run = db.get_crew_batch_runs(batch_id, status="Completed")[0]
+    check(run['attempts'] == 1 and run['duration'] == 1.5, f"update_crew_batch_run gave {run}")
+    check(_TIMESTAMP_RE.match(run['updated_at'] or ""), f"updated_at is {run['updated_at']!r}")
+
+    summary = next(b for b in db.get_crew_batches() if b['batch_id'] == batch_id)
+    check((summary['runs'], summary['completed'], summary['failed']) == (4, 1, 1), f"batch summary is {summary}")
+
+def check_llm_route_stats(db, tag):
+    """Route statistics average to floats"""
+    route = f"{tag}-route"
+    db.record_llm_route_metric(route, "small", "model-a", 100.0, True, 300)
+    db.record_llm_route_metric(route, "small", "model-a", 200.0, False, 101)
+    stats = next(s for s in db.get_llm_route_stats() if s['route'] == route)
+    check(stats['attempts'] == 2, f"attempts is {stats['attempts']}")
+    check(isinstance(stats['pass_rate'], float) and stats['pass_rate'] == 0.5, f"pass_rate is {stats['pass_rate']!r}")
+    check(stats['avg_latency_ms'] == 150.0 and stats['avg_output_chars'] == 200.5, f"averages are {stats}")
+
+def check_write_queue(db, tag):
+    """Queued writes from many threads all commit, and a failing write fails alone"""
+    route = f"{tag}-queued"
+    threads = [
+        threading.Thread(target=lambda: [
+            db.record_llm_route_metric(route, "small", "model-a", 10.0, True, 1) for _ in range(25)
+        ])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        db.write_queue.submit("INSERT INTO no_such_table (id) VALUES (?)", (1,), COMMITTED)
+        failed = False
+    except Exception:
+        failed = True
+    check(failed, "a write to a missing table succeeded")
+    for thread in threads:
+        thread.join()
+    stats = next(s for s in db.get_llm_route_stats() if s['route'] == route)
+    check(stats['attempts'] == 200, f"{stats['attempts']} of 200 queued writes were committed")
+
+def check_bulk_round_trip(db, tag):
+    """Exported projects import idempotently"""
+    project_id = db.create_project(f"{tag} bulk", "Round trip")
+    phase_id = db.create_phase(project_id, "Design", "")
+    db.create_task(phase_id, "Draw diagrams", "")
+    db.create_document(project_id, "Design", "<h1>Design</h1>", "Design")
+    db.create_test_case(project_id, "Smoke", "", "")
+
+    exported = io.StringIO()
+    check(db.export_jsonl(exported, project_ids=[project_id]) == 1, "export_jsonl did not export the project")
+    record = json.loads(exported.getvalue())
+    record['external_id'] = f"{tag}-bulk"
+    record['name'] = f"{tag} imported"
+
+    before = db.count_projects()
+    db.import_records([record])
+    seq = db.latest_change_seq()
+    db.import_records([record])
+    check(db.count_projects() == before + 1, "importing the same record twice duplicated the project")
+    check(db.latest_change_seq() == seq, "importing unchanged records wrote changes")
+    imported = db.search_projects(f"{tag} imported")
+    check(len(imported) == 1, f"found {len(imported)} imported projects")
+    phases = db.get_phases(imported[0]['id'])
+    check([p['name'] for p in phases] == ["Design"], "imported phases are wrong")
+    check(len(db.get_tasks(phases[0]['id'])) == 1, "imported tasks are wrong")
+    check(len(db.get_documents(imported[0]['id'])) == 1, "imported documents are wrong")
+
+    # An export imported back into the same database updates the exported rows
+    before = db.count_projects()
+    db.import_jsonl(io.StringIO(exported.getvalue()))
+    check(db.count_projects() == before, "importing an export into its own database duplicated the project")
+
+    # Changed content imported onto a document keeps its earlier revisions
+    document_id = db.get_documents(project_id)[0]['id']
+    db.add_document_revision(document_id, "<h1>Design</h1>\n<p>Second</p>")
+    record = json.loads(exported.getvalue())
+    record['documents'][0]['content'] = "<h1>Redesign</h1>"
+    db.import_records([record])
+    history = [db.get_document_revision(document_id, revision) for revision in (1, 2, 3)]
+    check(history == ["<h1>Design</h1>", "<h1>Design</h1>\n<p>Second</p>", "<h1>Redesign</h1>"],
+          f"revisions after importing changed content are {history}")
+
+def check_change_feed(db, tag):
+    """Inserts, updates and deletes are logged in order and compaction keeps the latest change per row"""
+    start = db.latest_change_seq()
+    project_id = db.create_project(f"{tag} feed", "")
+    phase_id = db.create_phase(project_id, "Design", "")
+    task_id = db.create_task(phase_id, "Sketch", "")
+    db.update_task(task_id, status="Completed")
+    db.create_test_case(project_id, "Smoke", "", "")
+
+    feed = db.changes_since(start)
+    changes = [(c['table_name'], c['op'], c['project_id']) for c in feed['changes']]
+    expected = [('projects', 'insert', project_id), ('phases', 'insert', project_id), ('tasks', 'insert', project_id),
+                ('tasks', 'update', project_id), ('test_cases', 'insert', project_id)]
+    check(changes == expected, f"changes are {changes}")
+    seqs = [c['seq'] for c in feed['changes']]
+    check(seqs == sorted(seqs) and feed['last_seq'] == seqs[-1], "sequence numbers are out of order")
+    check(not feed['reset'], "a fresh feed asked for a reset")
+    check(db.changes_since(feed['last_seq'])['changes'] == [], "changes were returned twice")
+
+    limited = db.changes_since(start, limit=2, tables=['tasks'])
+    check([c['op'] for c in limited['changes']] == ['insert', 'update'], "table filter is wrong")
+    check(limited['last_seq'] == seqs[3], "last_seq of a full page is not its last change")
+
+    result = db.compact_changes(retention_days=1)
+    check(result['collapsed'] >= 1 and result['trimmed'] == 0, f"compact_changes gave {result}")
+    tasks = [c for c in db.changes_since(start)['changes'] if c['table_name'] == 'tasks']
+    check([(c['row_id'], c['op']) for c in tasks] == [(task_id, 'update')], "compaction lost the latest task change")
+
+    db.compact_changes(retention_days=0)
+    check(db.changes_since(start)['reset'], "reading trimmed changes did not ask for a reset")
+    check(db.latest_change_seq() >= seqs[-1], "latest_change_seq went back after trimming")
+    resume = db.changes_since(start)['last_seq']
+    db.create_project(f"{tag} after trim", "")
+    after = db.changes_since(resume)
+    check(not after['reset'] and len(after['changes']) == 1, "the feed did not continue after trimming")
+
+CHECKS = [
+    check_projects,
+    check_phases_and_tasks,
+    check_date_ranges,
+    check_flag_sweeps,
+    check_documents,
+    check_test_cases,
+    check_crew_leases,
+    check_crew_batches,
+    check_llm_route_stats,
+    check_write_queue,
+    check_bulk_round_trip,
+    check_change_feed,
+]
+
+def run_conformance(db, report=print):
+    """
+    Run every check against a database
+
+    Args:
+        db (DatabaseManager): Database to check; it should be empty
+        report (callable): Called with one line per check
+
+    Returns:
+        list: Names of the failed checks
+    """
+    tag = f"conf-{uuid.uuid4().hex[:8]}"
+    failed = []
+    for check_function in CHECKS:
+        name = check_function.__name__[len('check_'):]
+        try:
+            check_function(db, tag)
+            report(f"PASS {name}")
+        except Exception as e:
+            failed.append(name)
+            report(f"FAIL {name}: {str(e) or type(e).__name__}")
+            if not isinstance(e, AssertionError):
+                report(traceback.format_exc().rstrip())
+    return failed
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Check that a database backend behaves like the SQLite default")
+    parser.add_argument("db_url", nargs="?",
+                        help="URL of an empty database to check (default: a new temporary SQLite database)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.db_url:
+        db = DatabaseManager(args.db_url)
+        print(f"Checking {db.backend.name} database")
+        return 1 if run_conformance(db) else 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = DatabaseManager(os.path.join(temp_dir, "conformance.db"))
+        print("Checking a temporary SQLite database")
+        return 1 if run_conformance(db) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
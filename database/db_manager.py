@@ -1,22 +1,133 @@
+import calendar
 import sqlite3
 import os
-from datetime import datetime
+import json
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 
+from config.settings import (
+    CHANGES_RETENTION_DAYS, CREW_LEASE_RETENTION_HOURS, DATABASE_PATH, DATABASE_URL, QUERY_STATS_ENABLED, STALLED_PHASE_DAYS
+)
+from database import query_stats
+from database.backends import get_backend
+from database.flags import FLAG_KINDS, FLAG_RECHECK_CHUNK, OVERDUE_TASK, STALLED_PHASE, flag_insert_sql
+from database.schema import apply_migrations, KEYFRAME_INTERVAL
+from database.write_queue import BUFFERED, COMMITTED, get_write_queue
+from models.project_models import Document, DocumentRevision, Phase, Project, Task, TestCase, hydrator
+from utils.text_delta import make_delta, apply_delta, compress_text, decompress_text, content_hash
+from utils.text_diff import compare_documents, get_cached_comparison, unified_diff
+from utils.metrics import time_db_methods
+from utils.tracing import instrument_class
+
+# Columns written by bulk import/export, per table
+BULK_COLUMNS = {
+    'projects': ['name', 'description', 'status', 'created_at', 'updated_at'],
+    'phases': ['name', 'description', 'status', 'start_date', 'end_date'],
+    'tasks': ['name', 'description', 'status', 'assigned_to', 'due_date'],
+    'documents': ['name', 'content', 'doc_type', 'created_at', 'updated_at'],
+    'test_cases': ['name', 'description', 'expected_result', 'actual_result', 'status'],
+}
+
+# Values used for columns missing from imported items, per table
+BULK_DEFAULTS = {
+    'projects': {'status': 'Not Started', 'created_at': 'now', 'updated_at': 'now'},
+    'phases': {'status': 'Not Started'},
+    'tasks': {'status': 'Not Started'},
+    'documents': {'created_at': 'now', 'updated_at': 'now'},
+    'test_cases': {'status': 'Not Run'},
+}
+
+# Seconds in a day
+DAY_SECONDS = 24 * 60 * 60
+
+def _day_start(day=None):
+    """
+    Get the epoch seconds the date columns give the start of a day
+
+    Args:
+        day (date, optional): The day; defaults to today
+
+    Returns:
+        int: Seconds since the epoch of midnight UTC, as dates are stored without a time zone
+    """
+    return calendar.timegm((day or date.today()).timetuple())
+
 class DatabaseManager:
-    def __init__(self, db_path='database/projects.db'):
-        self.db_path = db_path
+    # Database URLs whose schema has already been migrated in this process
+    _migrated_paths = set()
+
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path (str, optional): Path of an SQLite database or a database URL
+                (sqlite:///..., postgresql://...); defaults to DATABASE_URL
+        """
+        self.backend = get_backend(db_path or DATABASE_URL)
+        # URL of the database, and the file path for SQLite databases
+        self.url = self.backend.url
+        self.db_path = self.backend.path
         self._ensure_db_exists()
     
     def _ensure_db_exists(self):
         """Ensure the database file exists"""
-        if not Path(self.db_path).exists():
-            # Run the setup script if database doesn't exist
+        if (self.backend.name == 'sqlite' and not Path(self.db_path).exists()
+                and os.path.abspath(self.db_path) == DATABASE_PATH):
+            # Run the setup script if the default database doesn't exist
             import setup
+        self._ensure_schema()
+    
+    def _ensure_schema(self):
+        """Apply any pending schema migrations"""
+        key = self.url
+        if key in DatabaseManager._migrated_paths:
+            return
+        if self.backend.name == 'sqlite':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._get_connection()
+        try:
+            apply_migrations(conn)
+        finally:
+            conn.close()
+        DatabaseManager._migrated_paths.add(key)
     
     def _get_connection(self):
         """Get a connection to the database"""
-        return sqlite3.connect(self.db_path)
+        conn = self.backend.connect()
+        # Query statistics are recorded for SQLite databases only
+        if QUERY_STATS_ENABLED and self.backend.name == 'sqlite':
+            return query_stats.wrap(conn, self.db_path)
+        return conn
+    
+    @property
+    def write_queue(self):
+        """Write queue group-committing the high-frequency writes of this process"""
+        return get_write_queue(self.backend)
+    
+    def _fetch_models(self, model, query, params=()):
+        """Run a query and return its rows as models"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            hydrate = hydrator(model, tuple(column[0] for column in cursor.description))
+            return [hydrate(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def _fetch_model(self, model, query, params=()):
+        """Run a query and return its first row as a model, or None"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return hydrator(model, tuple(column[0] for column in cursor.description))(row)
+        finally:
+            conn.close()
     
     # Project methods
     def create_project(self, name, description):
@@ -34,23 +145,11 @@ class DatabaseManager:
     
     def get_projects(self):
         """Get all projects"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM projects ORDER BY created_at DESC")
-        projects = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return projects
+        return self._fetch_models(Project, "SELECT * FROM projects ORDER BY created_at DESC")
     
     def get_project(self, project_id):
         """Get a project by ID"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
-        project = cursor.fetchone()
-        conn.close()
-        return dict(project) if project else None
+        return self._fetch_model(Project, "SELECT * FROM projects WHERE id = ?", (project_id,))
     
     def update_project(self, project_id, name=None, description=None, status=None):
         """Update a project"""
@@ -74,8 +173,7 @@ class DatabaseManager:
             params.append(status)
         
         if update_parts:
-            update_parts.append("updated_at = ?")
-            params.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            update_parts.append("updated_at = CURRENT_TIMESTAMP")
             
             query = f"UPDATE projects SET {', '.join(update_parts)} WHERE id = ?"
             params.append(project_id)
@@ -85,6 +183,42 @@ class DatabaseManager:
         
         conn.close()
     
+    def get_projects_page(self, limit=50, offset=0, status=None):
+        """Get one page of projects, newest first, optionally filtered by status"""
+        if status:
+            return self._fetch_models(
+                Project,
+                "SELECT * FROM projects WHERE status = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (status, limit, offset)
+            )
+        return self._fetch_models(
+            Project,
+            "SELECT * FROM projects ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (limit, offset)
+        )
+    
+    def count_projects(self, status=None):
+        """Count projects, optionally only those with a status"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        if status:
+            cursor.execute("SELECT COUNT(*) FROM projects WHERE status = ?", (status,))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM projects")
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def search_projects(self, query, limit=50, offset=0):
+        """Search projects by name or description"""
+        pattern = f"%{query}%"
+        return self._fetch_models(
+            Project,
+            "SELECT * FROM projects WHERE name LIKE ? OR description LIKE ? "
+            "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (pattern, pattern, limit, offset)
+        )
+    
     # Phase methods
     def create_phase(self, project_id, name, description):
         """Create a new phase"""
@@ -101,13 +235,11 @@ class DatabaseManager:
     
     def get_phases(self, project_id):
         """Get all phases for a project"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM phases WHERE project_id = ? ORDER BY id", (project_id,))
-        phases = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return phases
+        return self._fetch_models(Phase, "SELECT * FROM phases WHERE project_id = ? ORDER BY id", (project_id,))
+    
+    def get_phase(self, phase_id):
+        """Get a phase by ID"""
+        return self._fetch_model(Phase, "SELECT * FROM phases WHERE id = ?", (phase_id,))
     
     def update_phase(self, phase_id, name=None, description=None, status=None, start_date=None, end_date=None):
         """Update a phase"""
@@ -163,13 +295,11 @@ class DatabaseManager:
     
     def get_tasks(self, phase_id):
         """Get all tasks for a phase"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tasks WHERE phase_id = ? ORDER BY id", (phase_id,))
-        tasks = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return tasks
+        return self._fetch_models(Task, "SELECT * FROM tasks WHERE phase_id = ? ORDER BY id", (phase_id,))
+    
+    def get_task(self, task_id):
+        """Get a task by ID"""
+        return self._fetch_model(Task, "SELECT * FROM tasks WHERE id = ?", (task_id,))
     
     def update_task(self, task_id, name=None, description=None, status=None, assigned_to=None, due_date=None):
         """Update a task"""
@@ -209,14 +339,90 @@ class DatabaseManager:
         
         conn.close()
     
+    # Date range methods
+    def get_overdue_tasks(self, as_of=None, project_id=None, limit=None):
+        """
+        Get unfinished tasks whose due date is before a day, most overdue first
+        
+        Args:
+            as_of (date, optional): Day the tasks are overdue on; defaults to today
+            project_id (int, optional): Only return tasks of this project
+            limit (int, optional): Maximum number of tasks returned
+        
+        Returns:
+            list: Task models, with the project_id and phase_name of their phase
+        """
+        return self._fetch_open_tasks_due(None, _day_start(as_of), project_id, limit)
+    
+    def get_tasks_due_between(self, start, end, project_id=None, limit=None):
+        """
+        Get unfinished tasks due on a day from start to end (inclusive), soonest first
+        
+        Args:
+            start (date): First day
+            end (date): Last day
+            project_id (int, optional): Only return tasks of this project
+            limit (int, optional): Maximum number of tasks returned
+        
+        Returns:
+            list: Task models, with the project_id and phase_name of their phase
+        """
+        return self._fetch_open_tasks_due(_day_start(start), _day_start(end) + DAY_SECONDS, project_id, limit)
+    
+    def get_tasks_due_this_week(self, as_of=None, project_id=None, limit=None):
+        """Get unfinished tasks due from today (or as_of) to the end of its week (Sunday)"""
+        day = as_of or date.today()
+        return self.get_tasks_due_between(day, day + timedelta(days=6 - day.weekday()), project_id, limit)
+    
+    def _fetch_open_tasks_due(self, start_ts, end_ts, project_id, limit):
+        """Get unfinished tasks with start_ts <= due_ts < end_ts (either bound may be None)"""
+        # status != 'Completed' lets the partial index on open tasks' due dates be used
+        query = (
+            "SELECT t.*, p.project_id, p.name AS phase_name FROM tasks t JOIN phases p ON p.id = t.phase_id "
+            "WHERE t.status != 'Completed' AND t.due_ts IS NOT NULL"
+        )
+        params = []
+        if start_ts is not None:
+            query += " AND t.due_ts >= ?"
+            params.append(start_ts)
+        if end_ts is not None:
+            query += " AND t.due_ts < ?"
+            params.append(end_ts)
+        if project_id is not None:
+            query += " AND p.project_id = ?"
+            params.append(project_id)
+        query += " ORDER BY t.due_ts, t.id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self._fetch_models(Task, query, params)
+    
+    def get_phases_active_between(self, start, end, project_id=None):
+        """
+        Get phases running at some time from day start to day end (inclusive)
+        
+        A phase runs from its start date to its end date; phases without an
+        end date are still running, phases without a start date are left out.
+        
+        Returns:
+            list: Phase models, earliest start first
+        """
+        query = "SELECT * FROM phases WHERE start_ts < ? AND (end_ts >= ? OR end_ts IS NULL)"
+        params = [_day_start(end) + DAY_SECONDS, _day_start(start)]
+        if project_id is not None:
+            query += " AND project_id = ?"
+            params.append(project_id)
+        query += " ORDER BY start_ts, id"
+        return self._fetch_models(Phase, query, params)
+    
     # Document methods
     def create_document(self, project_id, name, content, doc_type):
         """Create a new document"""
         conn = self._get_connection()
         cursor = conn.cursor()
         cursor.execute(
-            "INSERT INTO documents (project_id, name, content, doc_type) VALUES (?, ?, ?, ?)",
-            (project_id, name, content, doc_type)
+            "INSERT INTO documents (project_id, name, content, doc_type, revision, content_hash) VALUES (?, ?, ?, ?, 1, ?)",
+            (project_id, name, content, doc_type, content_hash(content))
         )
         doc_id = cursor.lastrowid
         conn.commit()
@@ -225,13 +431,237 @@ class DatabaseManager:
     
     def get_documents(self, project_id):
         """Get all documents for a project"""
+        return self._fetch_models(
+            Document, "SELECT * FROM documents WHERE project_id = ? ORDER BY created_at DESC", (project_id,)
+        )
+    
+    def get_document(self, document_id):
+        """Get a document by ID"""
+        return self._fetch_model(Document, "SELECT * FROM documents WHERE id = ?", (document_id,))
+    
+    def search_documents(self, query, limit=50, offset=0, project_id=None):
+        """Search documents by name or content, returning them without content"""
+        pattern = f"%{query}%"
+        sql = (
+            "SELECT id, project_id, name, doc_type, revision, created_at, updated_at FROM documents "
+            "WHERE (name LIKE ? OR content LIKE ?)"
+        )
+        params = [pattern, pattern]
+        if project_id is not None:
+            sql += " AND project_id = ?"
+            params.append(project_id)
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        return self._fetch_models(Document, sql, params)
+    
+    def get_latest_document(self, project_id, doc_type):
+        """Get the most recently updated document of a type for a project"""
+        return self._fetch_model(
+            Document,
+            "SELECT * FROM documents WHERE project_id = ? AND doc_type = ? ORDER BY updated_at DESC, id DESC LIMIT 1",
+            (project_id, doc_type)
+        )
+    
+    def save_document(self, project_id, name, content, doc_type):
+        """
+        Save a document, adding a revision if it already exists
+        
+        A document is identified by its project, name and type. Saving an
+        existing document stores the new content as its latest revision.
+        
+        Returns:
+            int: ID of the document
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id FROM documents WHERE project_id = ? AND doc_type = ? AND name = ? ORDER BY id DESC LIMIT 1",
+            (project_id, doc_type, name)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row is None:
+            return self.create_document(project_id, name, content, doc_type)
+        
+        self.add_document_revision(row[0], content)
+        return row[0]
+    
+    def add_document_revision(self, document_id, content):
+        """
+        Store new content as the latest revision of a document
+        
+        The latest revision stays in full in the documents table; the one it
+        replaces is moved to document_revisions as a delta against it.
+        
+        Returns:
+            int: The document's revision number after saving
+        """
         conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM documents WHERE project_id = ? ORDER BY created_at DESC", (project_id,))
-        documents = [dict(row) for row in cursor.fetchall()]
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            revision, changed = self._store_revision(cursor, document_id, content)
+            if changed:
+                conn.commit()
+            else:
+                conn.rollback()
+            return revision
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _store_revision(cursor, document_id, content):
+        """
+        Store new content as the latest revision of a document within the cursor's transaction
+        
+        Returns:
+            tuple: (revision number after saving, whether the content changed)
+        """
+        cursor.execute(
+            "SELECT content, revision, content_hash, updated_at FROM documents WHERE id = ?",
+            (document_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Document not found: {document_id}")
+        
+        old_content, revision, old_hash, old_updated_at = row
+        old_content = old_content or ""
+        revision = revision or 1
+        new_hash = content_hash(content)
+        
+        # Saving identical content does not create a revision
+        if new_hash == (old_hash or content_hash(old_content)):
+            return revision, False
+        
+        if revision % KEYFRAME_INTERVAL == 0:
+            delta, is_snapshot = compress_text(old_content), 1
+        else:
+            delta, is_snapshot = make_delta(content, old_content), 0
+        
+        cursor.execute(
+            "INSERT INTO document_revisions (document_id, revision, delta, is_snapshot, size, content_hash, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (document_id, revision, delta, is_snapshot, len(old_content), old_hash, old_updated_at)
+        )
+        cursor.execute(
+            "UPDATE documents SET content = ?, content_hash = ?, revision = ?, updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ?",
+            (content, new_hash, revision + 1, document_id)
+        )
+        return revision + 1, True
+    
+    def get_document_revisions(self, document_id):
+        """Get the revision history of a document, newest first"""
+        latest = self._fetch_model(
+            DocumentRevision,
+            "SELECT revision, LENGTH(content) AS size, updated_at AS created_at FROM documents WHERE id = ?",
+            (document_id,)
+        )
+        if latest is None:
+            return []
+        return [latest] + self._fetch_models(
+            DocumentRevision,
+            "SELECT revision, size, created_at FROM document_revisions WHERE document_id = ? ORDER BY revision DESC",
+            (document_id,)
+        )
+    
+    def get_document_revision(self, document_id, revision):
+        """
+        Get the content of a document as of a specific revision
+        
+        Returns:
+            str: The revision's content, or None if it does not exist
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT content, revision FROM documents WHERE id = ?", (document_id,))
+        row = cursor.fetchone()
+        if row is None or revision < 1 or revision > (row[1] or 1):
+            conn.close()
+            return None
+        
+        content, latest_revision = row[0] or "", row[1] or 1
+        if revision == latest_revision:
+            conn.close()
+            return content
+        
+        # Start from the nearest snapshot at or above the wanted revision, or
+        # from the latest content, and walk the deltas back down to it
+        cursor.execute(
+            "SELECT MIN(revision) FROM document_revisions WHERE document_id = ? AND is_snapshot = 1 AND revision >= ?",
+            (document_id, revision)
+        )
+        start = cursor.fetchone()[0] or latest_revision
+        cursor.execute(
+            "SELECT revision, delta, is_snapshot FROM document_revisions "
+            "WHERE document_id = ? AND revision >= ? AND revision <= ? ORDER BY revision DESC",
+            (document_id, revision, start)
+        )
+        for rev, delta, is_snapshot in cursor.fetchall():
+            content = decompress_text(delta) if is_snapshot else apply_delta(content, delta)
         conn.close()
-        return documents
+        return content
+    
+    def diff_document_revisions(self, document_id, from_revision, to_revision):
+        """Get a unified diff between two revisions of a document"""
+        old_content = self.get_document_revision(document_id, from_revision)
+        new_content = self.get_document_revision(document_id, to_revision)
+        if old_content is None or new_content is None:
+            return None
+        return unified_diff(old_content, new_content, f"revision {from_revision}", f"revision {to_revision}")
+    
+    def compare_document_revisions(self, document_id, from_revision, to_revision):
+        """
+        Compare two revisions of a document section by section, for side-by-side display
+        
+        Comparisons are cached by the content hashes of the two revisions, so
+        comparing a pair again does not rebuild or diff either of them.
+        
+        Returns:
+            dict: Comparison as returned by utils.text_diff.compare_documents,
+                or None if either revision does not exist
+        """
+        hashes = self._get_revision_hashes(document_id, (from_revision, to_revision))
+        if hashes is not None:
+            comparison = get_cached_comparison(hashes)
+            if comparison is not None:
+                return comparison
+        
+        old_content = self.get_document_revision(document_id, from_revision)
+        new_content = self.get_document_revision(document_id, to_revision)
+        if old_content is None or new_content is None:
+            return None
+        return compare_documents(old_content, new_content, hashes)
+    
+    def _get_revision_hashes(self, document_id, revisions):
+        """Get the stored content hashes of revisions of a document, or None if any is unknown"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT revision, content_hash FROM documents WHERE id = ?", (document_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            latest_revision, latest_hash = row[0] or 1, row[1]
+            hashes = []
+            for revision in revisions:
+                if revision == latest_revision:
+                    hashes.append(latest_hash)
+                    continue
+                cursor.execute(
+                    "SELECT content_hash FROM document_revisions WHERE document_id = ? AND revision = ?",
+                    (document_id, revision)
+                )
+                row = cursor.fetchone()
+                hashes.append(row[0] if row else None)
+            return None if None in hashes else tuple(hashes)
+        finally:
+            conn.close()
     
     # Test case methods
     def create_test_case(self, project_id, name, description, expected_result):
@@ -249,13 +679,11 @@ class DatabaseManager:
     
     def get_test_cases(self, project_id):
         """Get all test cases for a project"""
-        conn = self._get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM test_cases WHERE project_id = ? ORDER BY id", (project_id,))
-        test_cases = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return test_cases
+        return self._fetch_models(TestCase, "SELECT * FROM test_cases WHERE project_id = ? ORDER BY id", (project_id,))
+    
+    def get_test_case(self, test_id):
+        """Get a test case by ID"""
+        return self._fetch_model(TestCase, "SELECT * FROM test_cases WHERE id = ?", (test_id,))
     
     def update_test_case(self, test_id, actual_result=None, status=None):
         """Update a test case with results"""
@@ -281,4 +709,866 @@ class DatabaseManager:
             cursor.execute(query, params)
             conn.commit()
         
-        conn.close()
\ No newline at end of file
+        conn.close()
+    
+    # Crew lease methods
+    def acquire_crew_lease(self, lease_key, project_id, crew_type, fingerprint, owner, ttl,
+                           retention_hours=CREW_LEASE_RETENTION_HOURS):
+        """
+        Try to take the lease for a crew run
+        
+        The lease is free if nobody holds it, if its run has finished, or if
+        its holder stopped renewing it before it expired. Leases that
+        finished or expired more than retention_hours ago are deleted.
+        
+        Returns:
+            tuple: (True, lease) if the lease was taken, (False, lease) with
+            the current holder's lease otherwise
+        """
+        now = time.time()
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cutoff = now - retention_hours * 3600
+            cursor.execute(
+                "DELETE FROM crew_leases WHERE finished_at < ? OR (status = 'Running' AND expires_at < ?)",
+                (cutoff, cutoff)
+            )
+            cursor.execute("SELECT * FROM crew_leases WHERE lease_key = ?", (lease_key,))
+            lease = cursor.fetchone()
+            if lease and lease['status'] == 'Running' and lease['expires_at'] > now:
+                # Keep the purge of old leases
+                conn.commit()
+                return False, dict(lease)
+            
+            cursor.execute(
+                "INSERT INTO crew_leases "
+                "(lease_key, project_id, crew_type, fingerprint, owner, status, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, 'Running', ?, ?) "
+                "ON CONFLICT(lease_key) DO UPDATE SET project_id = excluded.project_id, "
+                "crew_type = excluded.crew_type, fingerprint = excluded.fingerprint, owner = excluded.owner, "
+                "status = excluded.status, document_id = NULL, revision = NULL, error = NULL, "
+                "created_at = excluded.created_at, expires_at = excluded.expires_at, finished_at = NULL",
+                (lease_key, project_id, crew_type, fingerprint, owner, now, now + ttl)
+            )
+            conn.commit()
+            cursor.execute("SELECT * FROM crew_leases WHERE lease_key = ?", (lease_key,))
+            return True, dict(cursor.fetchone())
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def renew_crew_lease(self, lease_key, owner, ttl):
+        """Extend a running lease held by owner; returns False if it was lost"""
+        # Heartbeats of every running crew share the write queue's commits
+        renewed = self.write_queue.submit(
+            "UPDATE crew_leases SET expires_at = ? WHERE lease_key = ? AND owner = ? AND status = 'Running'",
+            (time.time() + ttl, lease_key, owner)
+        )
+        return renewed == 1
+    
+    def finish_crew_lease(self, lease_key, owner, status, document_id=None, revision=None, error=None):
+        """Record the outcome of a crew run on its lease"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE crew_leases SET status = ?, document_id = ?, revision = ?, error = ?, finished_at = ? "
+            "WHERE lease_key = ? AND owner = ?",
+            (status, document_id, revision, error, time.time(), lease_key, owner)
+        )
+        conn.commit()
+        conn.close()
+    
+    def get_crew_lease(self, lease_key):
+        """Get a crew lease by key"""
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM crew_leases WHERE lease_key = ?", (lease_key,))
+        lease = cursor.fetchone()
+        conn.close()
+        return dict(lease) if lease else None
+    
+    # LLM route metric methods
+    def record_llm_route_metric(self, route, tier, model, latency_ms, passed, output_chars, durability=BUFFERED):
+        """
+        Record one LLM task attempt made through the model router
+        
+        Args:
+            durability (str): BUFFERED (the default) returns before the metric is
+                committed; COMMITTED waits for the commit
+        """
+        self.write_queue.submit(
+            "INSERT INTO llm_route_metrics (route, tier, model, latency_ms, passed, output_chars) VALUES (?, ?, ?, ?, ?, ?)",
+            (route, tier, model, latency_ms, 1 if passed else 0, output_chars),
+            durability
+        )
+    
+    def get_llm_route_stats(self):
+        """Get attempt counts, latency and validation pass rate per route and model"""
+        # Include metrics still waiting in this process's write queue
+        self.write_queue.flush()
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT route, tier, model,
+                   COUNT(*) AS attempts,
+                   AVG(latency_ms) AS avg_latency_ms,
+                   MAX(latency_ms) AS max_latency_ms,
+                   AVG(passed) AS pass_rate,
+                   AVG(output_chars) AS avg_output_chars
+            FROM llm_route_metrics
+            GROUP BY route, tier, model
+            ORDER BY route, tier
+        ''')
+        stats = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return stats
+
+    # Crew batch methods
+    def add_crew_batch_runs(self, batch_id, project_ids, crew_types):
+        """Add the runs of a batch, keeping runs the batch already has"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO crew_batch_runs (batch_id, project_id, crew_type) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+            [(batch_id, project_id, crew_type) for project_id in project_ids for crew_type in crew_types]
+        )
+        conn.commit()
+        conn.close()
+
+    def get_crew_batch_runs(self, batch_id, status=None):
+        """Get the runs of a batch, optionally only those with a status"""
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        if status:
+            cursor.execute(
+                "SELECT * FROM crew_batch_runs WHERE batch_id = ? AND status = ? ORDER BY id",
+                (batch_id, status)
+            )
+        else:
+            cursor.execute("SELECT * FROM crew_batch_runs WHERE batch_id = ? ORDER BY id", (batch_id,))
+
+        runs = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return runs
+
+    def update_crew_batch_run(self, run_id, status, document_id=None, revision=None, duration=None, error=None,
+                              attempted=False):
+        """Record the status of a batch run, counting an attempt if attempted is set"""
+        self.write_queue.submit(
+            "UPDATE crew_batch_runs SET status = ?, document_id = COALESCE(?, document_id), "
+            "revision = COALESCE(?, revision), duration = COALESCE(?, duration), error = ?, "
+            "attempts = attempts + ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, document_id, revision, duration, error, 1 if attempted else 0, run_id),
+            COMMITTED
+        )
+
+    def get_crew_batches(self):
+        """Get a summary of every batch, newest first"""
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT batch_id,
+                   COUNT(*) AS runs,
+                   SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) AS completed,
+                   SUM(CASE WHEN status = 'Failed' THEN 1 ELSE 0 END) AS failed,
+                   MIN(created_at) AS created_at,
+                   MAX(updated_at) AS updated_at
+            FROM crew_batch_runs
+            GROUP BY batch_id
+            ORDER BY MIN(id) DESC
+        ''')
+        batches = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return batches
+
+    # Change feed methods
+    def latest_change_seq(self):
+        """Get the sequence number of the latest change; a new consumer starts reading after it"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(seq) FROM changes")
+        latest = cursor.fetchone()[0]
+        cursor.execute("SELECT trimmed_seq FROM change_log_state")
+        trimmed = cursor.fetchone()[0]
+        conn.close()
+        return max(latest or 0, trimmed)
+
+    def changes_since(self, seq, limit=1000, tables=None):
+        """
+        Get the changes made to projects, phases, tasks, documents and test cases after a sequence number
+        
+        Every insert, update and delete is logged by triggers, so changes
+        made by any process or connection show up. A change says which row
+        changed, not how: consumers read the row again (or drop it, for a
+        delete). Compaction may leave only the latest change of each row.
+        
+        Args:
+            seq (int): Sequence number the consumer has read up to, 0 for everything
+            limit (int): Maximum number of changes returned
+            tables (list, optional): Only return changes to these tables
+        
+        Returns:
+            dict: 'changes' (dicts with seq, table_name, row_id, op, project_id
+                and changed_at, in order), 'last_seq' (the seq to pass next time)
+                and 'reset' (True if changes after seq were trimmed away, so the
+                consumer must reload everything)
+        """
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT trimmed_seq FROM change_log_state")
+        trimmed = cursor.fetchone()[0]
+        # Read up to the current head only, so the changes returned and
+        # last_seq agree even while other connections keep writing
+        cursor.execute("SELECT MAX(seq) FROM changes")
+        head = max(cursor.fetchone()[0] or 0, trimmed)
+        if seq < trimmed:
+            conn.close()
+            return {'changes': [], 'last_seq': head, 'reset': True}
+        
+        query = "SELECT seq, table_name, row_id, op, project_id, changed_at FROM changes WHERE seq > ? AND seq <= ?"
+        params = [seq, head]
+        if tables:
+            query += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+            params.extend(tables)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        changes = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        last_seq = changes[-1]['seq'] if len(changes) >= limit else max(seq, head)
+        return {'changes': changes, 'last_seq': last_seq, 'reset': False}
+
+    def compact_changes(self, retention_days=CHANGES_RETENTION_DAYS):
+        """
+        Shrink the change log
+        
+        Changes superseded by a later change of the same row are removed,
+        which consumers never notice since they read the latest state of a
+        row anyway. Changes older than retention_days are then trimmed;
+        consumers that had not read them get a reset from changes_since.
+        
+        Returns:
+            dict: Number of changes 'collapsed' and 'trimmed'
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                "DELETE FROM changes WHERE seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY table_name, row_id)"
+            )
+            collapsed = cursor.rowcount
+            cursor.execute("SELECT MAX(seq) FROM changes WHERE changed_at <= ?", (cutoff,))
+            trim_upto = cursor.fetchone()[0]
+            trimmed = 0
+            if trim_upto is not None:
+                cursor.execute("DELETE FROM changes WHERE seq <= ?", (trim_upto,))
+                trimmed = cursor.rowcount
+                cursor.execute(
+                    "UPDATE change_log_state SET trimmed_seq = ? WHERE trimmed_seq < ?",
+                    (trim_upto, trim_upto)
+                )
+            conn.commit()
+            return {'collapsed': collapsed, 'trimmed': trimmed}
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # Flag methods
+    def sweep_flags(self, now=None, stalled_days=STALLED_PHASE_DAYS, full=False):
+        """
+        Bring the overdue task and stalled phase flags up to date
+        
+        Each kind of flag keeps two watermarks: the cutoff it was last swept
+        to and the change feed sequence number it has read up to. A sweep
+        flags the items whose due date or stall clock passed the cutoff since
+        the last sweep and rechecks only the rows changed since, so it reads
+        a few index ranges instead of every task and phase. The flags are
+        rebuilt from scratch the first time, when asked to, when the change
+        feed was trimmed past the watermark or when the cutoff moved back.
+        
+        Args:
+            now (float, optional): Epoch seconds to sweep at; defaults to the current time
+            stalled_days (float): Days a phase may stay In Progress without a status change
+            full (bool): Rebuild the flags from scratch
+        
+        Returns:
+            dict: Per kind, the number of items 'flagged', the number of changed
+                rows 'rechecked' and whether it was rebuilt ('full'); and the 'duration'
+        """
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        cutoffs = {
+            # Tasks are overdue from the day after their due date
+            OVERDUE_TASK: _day_start(date.fromtimestamp(now)),
+            STALLED_PHASE: int(now - stalled_days * DAY_SECONDS),
+        }
+        result = {}
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT trimmed_seq FROM change_log_state")
+            trimmed = cursor.fetchone()[0]
+            cursor.execute("SELECT MAX(seq) FROM changes")
+            head = max(cursor.fetchone()[0] or 0, trimmed)
+            
+            for kind, spec in FLAG_KINDS.items():
+                cursor.execute("SELECT swept_to, change_seq FROM flag_sweeps WHERE kind = ?", (kind,))
+                swept_to, change_seq = cursor.fetchone()
+                cutoff = cutoffs[kind]
+                rebuild = full or swept_to is None or change_seq < trimmed or cutoff < swept_to
+                rechecked = 0
+                if rebuild:
+                    cursor.execute("DELETE FROM item_flags WHERE kind = ?", (kind,))
+                    cursor.execute(flag_insert_sql(kind, f"{spec['since']} < ?"), (cutoff,))
+                else:
+                    # Changed rows may have been finished, reopened or rescheduled
+                    cursor.execute(
+                        "SELECT DISTINCT row_id FROM changes WHERE table_name = ? AND seq > ? AND seq <= ?",
+                        (spec['table'], change_seq, head)
+                    )
+                    changed = [row[0] for row in cursor.fetchall()]
+                    rechecked = len(changed)
+                    for start in range(0, len(changed), FLAG_RECHECK_CHUNK):
+                        ids = changed[start:start + FLAG_RECHECK_CHUNK]
+                        marks = ', '.join('?' for _ in ids)
+                        cursor.execute(f"DELETE FROM item_flags WHERE kind = ? AND item_id IN ({marks})", [kind] + ids)
+                        # Items now past the old cutoff; those past the new one are flagged below
+                        cursor.execute(
+                            flag_insert_sql(kind, f"{spec['id']} IN ({marks}) AND {spec['since']} < ?"),
+                            ids + [swept_to]
+                        )
+                    # Items whose due date or stall clock passed the cutoff since the last sweep
+                    cursor.execute(
+                        flag_insert_sql(kind, f"{spec['since']} >= ? AND {spec['since']} < ?"), (swept_to, cutoff)
+                    )
+                
+                cursor.execute("SELECT COUNT(*) FROM item_flags WHERE kind = ?", (kind,))
+                flagged = cursor.fetchone()[0]
+                cursor.execute(
+                    "UPDATE flag_sweeps SET swept_to = ?, change_seq = ?, flagged = ?, swept_at = CURRENT_TIMESTAMP "
+                    "WHERE kind = ?",
+                    (cutoff, head, flagged, kind)
+                )
+                result[kind] = {'flagged': flagged, 'rechecked': rechecked, 'full': rebuild}
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        result['duration'] = time.perf_counter() - started
+        return result
+    
+    def get_flag_counts(self):
+        """
+        Get the number of overdue tasks and stalled phases found by the last sweep
+        
+        Returns:
+            dict: Per kind, the number 'flagged' and when the kind was 'swept_at' (None if never)
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT kind, flagged, swept_at FROM flag_sweeps")
+            return {kind: {'flagged': flagged, 'swept_at': swept_at} for kind, flagged, swept_at in cursor.fetchall()}
+        finally:
+            conn.close()
+    
+    def get_flagged_overdue_tasks(self, limit=20, project_id=None):
+        """
+        Get the tasks flagged overdue by the last sweep, most overdue first
+        
+        Returns:
+            list: Task models, with the project_id, phase_name and project_name of their phase
+        """
+        query = (
+            "SELECT t.*, p.project_id, p.name AS phase_name, pr.name AS project_name FROM item_flags f "
+            "JOIN tasks t ON t.id = f.item_id JOIN phases p ON p.id = t.phase_id "
+            "JOIN projects pr ON pr.id = p.project_id WHERE f.kind = ?"
+        )
+        return self._fetch_flagged(Task, query, OVERDUE_TASK, limit, project_id)
+    
+    def get_flagged_stalled_phases(self, limit=20, project_id=None):
+        """
+        Get the phases flagged stalled by the last sweep, longest stalled first
+        
+        Returns:
+            list: Phase models, with the stalled_since (epoch seconds) and project_name of each phase
+        """
+        query = (
+            "SELECT p.*, f.since_ts AS stalled_since, pr.name AS project_name FROM item_flags f "
+            "JOIN phases p ON p.id = f.item_id JOIN projects pr ON pr.id = p.project_id WHERE f.kind = ?"
+        )
+        return self._fetch_flagged(Phase, query, STALLED_PHASE, limit, project_id)
+    
+    def _fetch_flagged(self, model, query, kind, limit, project_id):
+        """Get the items of a kind of flag in flag order, optionally of one project"""
+        params = [kind]
+        if project_id is not None:
+            query += " AND f.project_id = ?"
+            params.append(project_id)
+        query += " ORDER BY f.since_ts, f.item_id LIMIT ?"
+        params.append(limit)
+        return self._fetch_models(model, query, params)
+    
+    # Query statistics methods
+    def get_query_stats(self):
+        """Get the recorded statistics per statement, most total time first"""
+        query_stats.flush()
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT fingerprint, statement, calls, total_ms, total_ms / calls AS avg_ms, max_ms,
+                   rows, rows * 1.0 / calls AS avg_rows, last_caller, updated_at
+            FROM query_stats
+            ORDER BY total_ms DESC
+        ''')
+        stats = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return stats
+
+    def get_slow_queries(self, limit=100):
+        """Get the most recent slow queries with their query plans"""
+        query_stats.flush()
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM slow_queries ORDER BY id DESC LIMIT ?", (limit,))
+        queries = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return queries
+
+    def reset_query_stats(self):
+        """Delete all recorded query statistics and slow queries"""
+        query_stats.flush()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM query_stats")
+        cursor.execute("DELETE FROM slow_queries")
+        conn.commit()
+        conn.close()
+
+    # Streaming methods
+    def _iter_query(self, model, query, params=(), chunk_size=500):
+        """Yield rows of a query as models, fetching them from the cursor in chunks"""
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            hydrate = hydrator(model, tuple(column[0] for column in cursor.description))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield hydrate(row)
+        finally:
+            conn.close()
+    
+    def iter_projects(self, status=None, chunk_size=500):
+        """Iterate over all projects, newest first, optionally only those with a status"""
+        if status:
+            return self._iter_query(
+                Project, "SELECT * FROM projects WHERE status = ? ORDER BY created_at DESC, id DESC",
+                (status,), chunk_size
+            )
+        return self._iter_query(Project, "SELECT * FROM projects ORDER BY created_at DESC, id DESC", (), chunk_size)
+    
+    def iter_project_tasks(self, project_id, chunk_size=500):
+        """Iterate over all tasks of a project, phase by phase"""
+        return self._iter_query(
+            Task,
+            "SELECT tasks.* FROM tasks JOIN phases ON tasks.phase_id = phases.id "
+            "WHERE phases.project_id = ? ORDER BY tasks.phase_id, tasks.id",
+            (project_id,), chunk_size
+        )
+    
+    def iter_documents(self, project_id, chunk_size=50, with_content=True):
+        """Iterate over all documents of a project, optionally without their content"""
+        columns = "*" if with_content else "id, project_id, name, doc_type, revision, content_hash, created_at, updated_at"
+        return self._iter_query(
+            Document,
+            f"SELECT {columns} FROM documents WHERE project_id = ? ORDER BY id",
+            (project_id,), chunk_size
+        )
+    
+    def iter_test_cases(self, project_id, chunk_size=500):
+        """Iterate over all test cases of a project"""
+        return self._iter_query(
+            TestCase,
+            "SELECT * FROM test_cases WHERE project_id = ? ORDER BY id",
+            (project_id,), chunk_size
+        )
+    
+    # Bulk import/export methods
+    def export_jsonl(self, fileobj, project_ids=None, chunk_size=500, progress=None):
+        """
+        Export projects as JSON Lines, one project per line
+        
+        Each line holds a project with its phases (and their tasks), documents
+        and test cases nested inside it. Every item carries an external_id so
+        the file can be imported again idempotently with import_jsonl; rows
+        without one are given one, stored so that it matches them on import.
+        
+        Args:
+            fileobj: Text file object to write to
+            project_ids (list, optional): IDs of the projects to export, all if omitted
+            chunk_size (int): Number of projects read from the database at a time
+            progress (callable, optional): Called with the number of projects exported so far
+        
+        Returns:
+            int: Number of exported projects
+        """
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        exported = 0
+        try:
+            for projects in self._project_chunks(conn, project_ids, chunk_size):
+                ids = [p['id'] for p in projects]
+                phases = self._rows_by(conn, "phases", "project_id", ids)
+                tasks = self._rows_by(conn, "tasks", "phase_id", [ph['id'] for group in phases.values() for ph in group])
+                documents = self._rows_by(conn, "documents", "project_id", ids)
+                test_cases = self._rows_by(conn, "test_cases", "project_id", ids)
+                
+                # Items exported without an external_id could not be matched
+                # when the file is imported back, so they are given one first
+                with conn:
+                    for table, prefix, rows in (
+                        ("projects", "project", projects),
+                        ("phases", "phase", [row for group in phases.values() for row in group]),
+                        ("tasks", "task", [row for group in tasks.values() for row in group]),
+                        ("documents", "document", [row for group in documents.values() for row in group]),
+                        ("test_cases", "test-case", [row for group in test_cases.values() for row in group]),
+                    ):
+                        self._assign_external_ids(conn.cursor(), table, prefix, rows)
+                
+                for project in projects:
+                    record = self._export_item(project, "project", BULK_COLUMNS['projects'])
+                    record['phases'] = []
+                    for phase in phases.get(project['id'], []):
+                        phase_record = self._export_item(phase, "phase", BULK_COLUMNS['phases'])
+                        phase_record['tasks'] = [
+                            self._export_item(task, "task", BULK_COLUMNS['tasks'])
+                            for task in tasks.get(phase['id'], [])
+                        ]
+                        record['phases'].append(phase_record)
+                    record['documents'] = [
+                        self._export_item(doc, "document", BULK_COLUMNS['documents'])
+                        for doc in documents.get(project['id'], [])
+                    ]
+                    record['test_cases'] = [
+                        self._export_item(test, "test-case", BULK_COLUMNS['test_cases'])
+                        for test in test_cases.get(project['id'], [])
+                    ]
+                    fileobj.write(json.dumps(record, default=str))
+                    fileobj.write("\n")
+                
+                exported += len(projects)
+                if progress:
+                    progress(exported)
+        finally:
+            conn.close()
+        return exported
+    
+    def import_jsonl(self, fileobj, chunk_size=1000, progress=None):
+        """
+        Import projects from JSON Lines written by export_jsonl
+        
+        See import_records for how items are matched and written.
+        
+        Returns:
+            int: Number of imported projects
+        """
+        def records():
+            for line_number, line in enumerate(fileobj, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number}: {str(e)}")
+        
+        return self.import_records(records(), chunk_size=chunk_size, progress=progress)
+    
+    def import_records(self, records, chunk_size=1000, progress=None):
+        """
+        Upsert nested project records in chunked transactions
+        
+        Items are matched on external_id, so importing the same records twice
+        updates rows instead of duplicating them, and rows that did not change
+        are not written at all. Projects without an external_id are added as
+        new projects; child items without one get one derived from their
+        parent and position. Changed content of an existing document is
+        stored as a new revision of it.
+        
+        Args:
+            records (iterable): Project dicts in the export_jsonl format
+            chunk_size (int): Number of projects written per transaction
+            progress (callable, optional): Called with the number of projects imported so far
+        
+        Returns:
+            int: Number of imported projects
+        """
+        conn = self._get_connection()
+        previous_pragmas = self._set_bulk_pragmas(conn)
+        imported = 0
+        try:
+            chunk = []
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    self._import_chunk(conn, chunk, imported)
+                    imported += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress(imported)
+            if chunk:
+                self._import_chunk(conn, chunk, imported)
+                imported += len(chunk)
+                if progress:
+                    progress(imported)
+        finally:
+            self._restore_pragmas(conn, previous_pragmas)
+            conn.close()
+        return imported
+    
+    def _set_bulk_pragmas(self, conn):
+        """
+        Switch an SQLite connection to WAL journaling and NORMAL synchronous for bulk writes
+        
+        Returns:
+            dict: The previous value of each changed PRAGMA, for _restore_pragmas
+        """
+        if self.backend.name != 'sqlite':
+            return {}
+        previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ('journal_mode', 'synchronous')}
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return previous
+    
+    @staticmethod
+    def _restore_pragmas(conn, previous):
+        """Put back PRAGMAs changed by _set_bulk_pragmas"""
+        for name, value in previous.items():
+            try:
+                conn.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.OperationalError as e:
+                # Leaving WAL mode needs the database to itself
+                print(f"Warning: could not restore PRAGMA {name} = {value}: {str(e)}")
+    
+    def _import_chunk(self, conn, records, offset):
+        """Write one chunk of project records in a single transaction"""
+        # UTC, like the CURRENT_TIMESTAMP defaults
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        projects, phases, tasks, documents, test_cases = [], [], [], [], []
+        
+        for index, record in enumerate(records, start=offset + 1):
+            if not record.get('name'):
+                raise ValueError(f"Project record {index} has no name")
+            # Projects without an external_id cannot be matched to a stored
+            # one (names are not unique), so they are added as new projects
+            project_key = str(record.get('external_id') or f"import-{uuid.uuid4().hex}")
+            project_row = self._import_row(record, project_key, None, 'projects', now)
+            projects.append(project_row[:1] + project_row[2:])
+            
+            for position, phase in enumerate(record.get('phases') or []):
+                phase_key = str(phase.get('external_id') or f"{project_key}/phases/{position}")
+                phases.append(self._import_row(phase, phase_key, project_key, 'phases', now))
+                for task_position, task in enumerate(phase.get('tasks') or []):
+                    task_key = str(task.get('external_id') or f"{phase_key}/tasks/{task_position}")
+                    tasks.append(self._import_row(task, task_key, phase_key, 'tasks', now))
+            
+            for position, doc in enumerate(record.get('documents') or []):
+                doc_key = str(doc.get('external_id') or f"{project_key}/documents/{position}")
+                documents.append(
+                    self._import_row(doc, doc_key, project_key, 'documents', now)
+                    + (content_hash(doc.get('content') or ""),)
+                )
+            
+            for position, test in enumerate(record.get('test_cases') or []):
+                test_key = str(test.get('external_id') or f"{project_key}/test-cases/{position}")
+                test_cases.append(self._import_row(test, test_key, project_key, 'test_cases', now))
+        
+        with conn:
+            cursor = conn.cursor()
+            cursor.executemany(self._upsert_sql("projects", None, BULK_COLUMNS['projects']), projects)
+            project_ids = self._ids_by_external_id(cursor, "projects", [row[0] for row in projects])
+            
+            cursor.executemany(
+                self._upsert_sql("phases", "project_id", BULK_COLUMNS['phases']),
+                [(row[0], project_ids[row[1]]) + row[2:] for row in phases]
+            )
+            phase_ids = self._ids_by_external_id(cursor, "phases", [row[0] for row in phases])
+            
+            cursor.executemany(
+                self._upsert_sql("tasks", "phase_id", BULK_COLUMNS['tasks']),
+                [(row[0], phase_ids[row[1]]) + row[2:] for row in tasks]
+            )
+            
+            # Changed content of existing documents is stored as a new revision
+            # first, so their earlier revisions can still be rebuilt from it
+            content_position = BULK_COLUMNS['documents'].index('content') + 2
+            stored_hashes = self._document_hashes(cursor, [row[0] for row in documents])
+            for row in documents:
+                stored = stored_hashes.get(row[0])
+                if stored is not None and stored[1] != row[-1]:
+                    self._store_revision(cursor, stored[0], row[content_position] or "")
+            
+            document_columns = BULK_COLUMNS['documents'] + ['content_hash']
+            cursor.executemany(
+                self._upsert_sql("documents", "project_id", document_columns),
+                [(row[0], project_ids[row[1]]) + row[2:] for row in documents]
+            )
+            
+            cursor.executemany(
+                self._upsert_sql("test_cases", "project_id", BULK_COLUMNS['test_cases']),
+                [(row[0], project_ids[row[1]]) + row[2:] for row in test_cases]
+            )
+    
+    @staticmethod
+    def _import_row(item, external_id, parent_key, table, now):
+        """Build the parameter tuple (external_id, parent key, columns...) of one imported item"""
+        values = [external_id, parent_key]
+        values.extend(map(item.get, BULK_COLUMNS[table]))
+        for column, default in BULK_DEFAULTS[table].items():
+            position = BULK_COLUMNS[table].index(column) + 2
+            if values[position] is None:
+                values[position] = now if default == 'now' else default
+        return tuple(values)
+    
+    @staticmethod
+    def _upsert_sql(table, parent_column, columns):
+        """
+        Build an INSERT statement that updates rows with the same external_id
+        
+        Rows whose values are all unchanged are left alone, so re-importing
+        a file writes nothing and logs no changes. Timestamps filled in for
+        items that had none do not count as a change.
+        """
+        all_columns = ['external_id'] + ([parent_column] if parent_column else []) + columns
+        placeholders = ', '.join('?' for _ in all_columns)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in all_columns[1:])
+        filled = {column for column, default in BULK_DEFAULTS.get(table, {}).items() if default == 'now'}
+        changed = ' OR '.join(
+            f"{table}.{column} IS NOT excluded.{column}" for column in all_columns[1:] if column not in filled
+        )
+        return (
+            f"INSERT INTO {table} ({', '.join(all_columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(external_id) DO UPDATE SET {updates} WHERE {changed}"
+        )
+    
+    @staticmethod
+    def _ids_by_external_id(cursor, table, external_ids, batch_size=900):
+        """Map external IDs to row IDs"""
+        ids = {}
+        for start in range(0, len(external_ids), batch_size):
+            batch = external_ids[start:start + batch_size]
+            cursor.execute(
+                f"SELECT external_id, id FROM {table} WHERE external_id IN ({', '.join('?' for _ in batch)})",
+                batch
+            )
+            ids.update(cursor.fetchall())
+        return ids
+    
+    @staticmethod
+    def _document_hashes(cursor, external_ids, batch_size=900):
+        """Map the external IDs of existing documents to their (row ID, content hash)"""
+        hashes = {}
+        for start in range(0, len(external_ids), batch_size):
+            batch = external_ids[start:start + batch_size]
+            cursor.execute(
+                f"SELECT external_id, id, content_hash FROM documents WHERE external_id IN ({', '.join('?' for _ in batch)})",
+                batch
+            )
+            hashes.update((external_id, (doc_id, doc_hash)) for external_id, doc_id, doc_hash in cursor.fetchall())
+        return hashes
+    
+    @staticmethod
+    def _project_chunks(conn, project_ids, chunk_size):
+        """Yield lists of project rows, chunk by chunk"""
+        cursor = conn.cursor()
+        if project_ids is not None:
+            for start in range(0, len(project_ids), chunk_size):
+                batch = project_ids[start:start + chunk_size]
+                cursor.execute(
+                    f"SELECT * FROM projects WHERE id IN ({', '.join('?' for _ in batch)}) ORDER BY id",
+                    batch
+                )
+                rows = [dict(row) for row in cursor.fetchall()]
+                if rows:
+                    yield rows
+            return
+        
+        last_id = 0
+        while True:
+            cursor.execute("SELECT * FROM projects WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size))
+            rows = [dict(row) for row in cursor.fetchall()]
+            if not rows:
+                break
+            yield rows
+            last_id = rows[-1]['id']
+    
+    @staticmethod
+    def _rows_by(conn, table, column, values, batch_size=900):
+        """Get rows of a table grouped by the value of a column"""
+        grouped = {}
+        cursor = conn.cursor()
+        for start in range(0, len(values), batch_size):
+            batch = values[start:start + batch_size]
+            cursor.execute(
+                f"SELECT * FROM {table} WHERE {column} IN ({', '.join('?' for _ in batch)}) ORDER BY id",
+                batch
+            )
+            for row in cursor.fetchall():
+                grouped.setdefault(row[column], []).append(dict(row))
+        return grouped
+    
+    @classmethod
+    def _assign_external_ids(cls, cursor, table, prefix, rows):
+        """Store an external_id of the form <prefix>-<id> for rows that have none, updating the row dicts"""
+        missing = [row for row in rows if not row.get('external_id')]
+        if not missing:
+            return
+        # An imported row may already carry the ID another database gave one of its own rows
+        taken = cls._ids_by_external_id(cursor, table, [f"{prefix}-{row['id']}" for row in missing])
+        for row in missing:
+            external_id = f"{prefix}-{row['id']}"
+            row['external_id'] = external_id if external_id not in taken else f"{prefix}-{uuid.uuid4().hex}"
+        cursor.executemany(
+            f"UPDATE {table} SET external_id = ? WHERE id = ? AND external_id IS NULL",
+            [(row['external_id'], row['id']) for row in missing]
+        )
+    
+    @staticmethod
+    def _export_item(row, prefix, columns):
+        """Build the export record of one row"""
+        item = {'external_id': row['external_id']}
+        for column in columns:
+            item[column] = row.get(column)
+        return item
+
+# Record a tracing span for every public method when tracing is enabled
+instrument_class(DatabaseManager, "db")
+
+# Time every public method in the DB call metrics when metrics are enabled
+time_db_methods(DatabaseManager)
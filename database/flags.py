@@ -0,0 +1,86 @@
+import threading
+
+from config.settings import STALLED_PHASE_DAYS
+
+# Kinds of flag kept in the item_flags table
+OVERDUE_TASK = 'overdue_task'
+STALLED_PHASE = 'stalled_phase'
+
+# Where the items of each kind of flag come from. 'open' selects the items
+# that can be flagged, 'since' is the epoch seconds an item's flag counts
+# from (a task's due date, the start of a phase's stall clock) and 'table' is
+# the change feed table whose changes make the sweep recheck an item. Both
+# 'open' and 'since' match a partial index, so sweeps are index range scans.
+FLAG_KINDS = {
+    OVERDUE_TASK: {
+        'table': 'tasks',
+        'source': "tasks t JOIN phases p ON p.id = t.phase_id",
+        'columns': "t.id, p.project_id, t.due_ts",
+        'open': "t.status != 'Completed'",
+        'id': "t.id",
+        'since': "t.due_ts",
+    },
+    STALLED_PHASE: {
+        'table': 'phases',
+        'source': "phases",
+        'columns': "id, project_id, COALESCE(status_ts, start_ts)",
+        'open': "status = 'In Progress'",
+        'id': "id",
+        'since': "COALESCE(status_ts, start_ts)",
+    },
+}
+
+# Changed items rechecked per statement
+FLAG_RECHECK_CHUNK = 500
+
+def flag_insert_sql(kind, condition):
+    """Get the statement flagging the open items of a kind that match a condition"""
+    spec = FLAG_KINDS[kind]
+    return (
+        f"INSERT INTO item_flags (kind, item_id, project_id, since_ts) "
+        f"SELECT '{kind}', {spec['columns']} FROM {spec['source']} WHERE {spec['open']} AND {condition}"
+    )
+
+class FlagScheduler:
+    """Sweeps the overdue task and stalled phase flags every interval seconds on a background thread"""
+
+    def __init__(self, db, interval=300, stalled_days=STALLED_PHASE_DAYS, report=print):
+        self.db = db
+        self.interval = interval
+        self.stalled_days = stalled_days
+        self.report = report
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, full=False):
+        """Sweep the flags once, reporting instead of raising errors"""
+        try:
+            result = self.db.sweep_flags(stalled_days=self.stalled_days, full=full)
+            self.report(f"Flags swept in {result['duration'] * 1000:.0f} ms: "
+                        f"{result[OVERDUE_TASK]['flagged']} overdue tasks, "
+                        f"{result[STALLED_PHASE]['flagged']} stalled phases")
+            return result
+        except Exception as e:
+            self.report(f"Flag sweep failed: {str(e)}")
+            return None
+
+    def run(self):
+        """Sweep the flags until stopped"""
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start sweeping on a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="flag-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sweeping"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
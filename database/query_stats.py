@@ -0,0 +1,287 @@
+import atexit
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+
+from config.settings import QUERY_SLOW_MS, QUERY_STATS_FLUSH_SECONDS
+
+# Slow queries kept per database; older entries are deleted
+SLOW_QUERY_LOG_SIZE = 1000
+
+# Statements that are looked up with EXPLAIN QUERY PLAN when slow
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Pending statistics per database path: {fingerprint: stats}
+_pending = {}
+# Slow queries waiting to be explained and logged
+_pending_slow = []
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_this_file = os.path.abspath(__file__)
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape: literals become ? and whitespace is collapsed"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _PLACEHOLDER_LIST.sub('(?+)', sql)
+
+def fingerprint_sql(normalized):
+    """Get a short stable ID for a normalized statement"""
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+# Modules whose functions wrap DatabaseManager methods
+_WRAPPER_FILES = ('tracing.py', 'metrics.py')
+
+def _find_caller():
+    """
+    Describe where a query came from
+
+    Returns:
+        str: The DatabaseManager method and the first frame outside the
+        database package, e.g. "get_project <- app/pages/project_details.py:112"
+    """
+    frame = sys._getframe(2)
+    method = None
+    database_dir = os.path.dirname(_this_file)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if path != _this_file and os.path.basename(path) not in _WRAPPER_FILES:
+            if os.path.dirname(path) == database_dir:
+                # Prefer the public method over the private helpers it calls
+                name = frame.f_code.co_name
+                if method is None or (method.startswith('_') and not name.startswith('_')):
+                    method = name
+            else:
+                location = f"{os.path.relpath(path)}:{frame.f_lineno}"
+                return f"{method} <- {location}" if method else location
+        frame = frame.f_back
+    return method or "unknown"
+
+class QueryRecord:
+    """One execution of a statement, finished once its rows have been fetched"""
+
+    __slots__ = ('sql', 'params', 'caller', 'duration', 'rows')
+
+    def __init__(self, sql, params, caller, duration, rows):
+        self.sql = sql
+        self.params = params
+        self.caller = caller
+        self.duration = duration
+        self.rows = rows
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times its statements, including the time spent fetching rows"""
+
+    _record = None
+    # Set by InstrumentedConnection.cursor
+    _db_path = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        caller = _find_caller()
+        started = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._record = QueryRecord(sql, parameters, caller, time.perf_counter() - started, 0)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        caller = _find_caller()
+        started = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._record = QueryRecord(sql, None, caller, time.perf_counter() - started, 0)
+        return result
+
+    def _fetch(self, fetch, *args):
+        started = time.perf_counter()
+        rows = fetch(*args)
+        if self._record is not None:
+            self._record.duration += time.perf_counter() - started
+            self._record.rows += len(rows) if isinstance(rows, list) else (rows is not None)
+        return rows
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Cursors dropped without being closed, like those of Connection.execute
+        self._finish()
+
+    def _finish(self):
+        """Record the previous statement of this cursor"""
+        record, self._record = self._record, None
+        if record is None:
+            return
+        if record.rows == 0 and self.rowcount > 0:
+            # Rows changed by INSERT/UPDATE/DELETE
+            record.rows = self.rowcount
+        _record_query(self._db_path, record)
+
+class InstrumentedConnection:
+    """
+    Wraps a connection opened by the database backend so its cursors record
+    query statistics
+
+    Anything not instrumented here is passed through to the wrapped
+    connection.
+    """
+
+    def __init__(self, conn, db_path):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, 'db_path', db_path)
+        # Weak, so that dropped cursors are freed and their statements reset
+        object.__setattr__(self, '_cursors', weakref.WeakSet())
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        # row_factory, isolation_level and the like belong to the wrapped connection
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = self._conn.cursor(factory)
+        cursor._db_path = self.db_path
+        self._cursors.add(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        for cursor in list(self._cursors):
+            cursor._finish()
+        self._cursors.clear()
+        self._conn.close()
+        # Saved only after closing, so that writing the statistics never
+        # waits on a transaction of this connection
+        if _pending_slow or time.monotonic() - _last_flush >= QUERY_STATS_FLUSH_SECONDS:
+            flush()
+
+def wrap(conn, db_path):
+    """Record the query statistics of an sqlite3 connection opened on db_path"""
+    return InstrumentedConnection(conn, db_path)
+
+def _record_query(db_path, record):
+    """Add one execution to the pending statistics, logging it if it was slow"""
+    duration_ms = record.duration * 1000
+    normalized = normalize_sql(record.sql)
+    fingerprint = fingerprint_sql(normalized)
+
+    with _pending_lock:
+        stats = _pending.setdefault(db_path, {}).setdefault(fingerprint, {
+            'statement': normalized, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'last_caller': None
+        })
+        stats['calls'] += 1
+        stats['total_ms'] += duration_ms
+        stats['max_ms'] = max(stats['max_ms'], duration_ms)
+        stats['rows'] += record.rows
+        stats['last_caller'] = record.caller
+
+        if duration_ms >= QUERY_SLOW_MS:
+            _pending_slow.append((db_path, fingerprint, record, duration_ms))
+
+def explain(db_path, sql, params=()):
+    """Get the EXPLAIN QUERY PLAN of a statement as text, one step per line"""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return ""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    except sqlite3.Error as e:
+        return f"(plan unavailable: {str(e)})"
+    finally:
+        conn.close()
+
+def _log_slow_query(db_path, fingerprint, record, duration_ms):
+    """Print a slow query with its plan and keep it in the slow query log"""
+    plan = explain(db_path, record.sql, record.params)
+    statement = _WHITESPACE.sub(' ', record.sql).strip()
+    print(f"Slow query ({duration_ms:.1f} ms, {record.rows} rows) from {record.caller}: {statement}")
+    if plan:
+        print("  Plan: " + plan.replace("\n", "; "))
+
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        conn.execute(
+            "INSERT INTO slow_queries (fingerprint, statement, params, duration_ms, rows, caller, plan) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (fingerprint, statement, repr(record.params)[:500] if record.params else None,
+             duration_ms, record.rows, record.caller, plan)
+        )
+        conn.execute(
+            "DELETE FROM slow_queries WHERE id <= (SELECT MAX(id) FROM slow_queries) - ?",
+            (SLOW_QUERY_LOG_SIZE,)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Warning: could not log slow query: {str(e)}")
+    finally:
+        conn.close()
+
+def flush():
+    """Log pending slow queries and add the pending statistics to the query_stats table of each database"""
+    global _last_flush
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        slow = list(_pending_slow)
+        _pending_slow.clear()
+        _last_flush = time.monotonic()
+
+    for db_path, fingerprint, record, duration_ms in slow:
+        _log_slow_query(db_path, fingerprint, record, duration_ms)
+
+    for db_path, statements in pending.items():
+        conn = sqlite3.connect(db_path, timeout=5)
+        try:
+            conn.executemany('''
+                INSERT INTO query_stats (fingerprint, statement, calls, total_ms, max_ms, rows, last_caller, updated_at)
+                VALUES (:fingerprint, :statement, :calls, :total_ms, :max_ms, :rows, :last_caller, CURRENT_TIMESTAMP)
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    total_ms = total_ms + excluded.total_ms,
+                    max_ms = MAX(max_ms, excluded.max_ms),
+                    rows = rows + excluded.rows,
+                    last_caller = excluded.last_caller,
+                    updated_at = excluded.updated_at
+            ''', [dict(stats, fingerprint=fingerprint) for fingerprint, stats in statements.items()])
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: could not save query statistics: {str(e)}")
+        finally:
+            conn.close()
+
+atexit.register(flush)
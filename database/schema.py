@@ -0,0 +1,488 @@
+import sqlite3
+import time
+
+from utils.text_delta import compress_text, content_hash, make_delta
+
+# Base tables, as originally created by setup.py
+BASE_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS projects (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'Not Started'
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS phases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER,
+        name TEXT NOT NULL,
+        description TEXT,
+        status TEXT DEFAULT 'Not Started',
+        start_date TIMESTAMP,
+        end_date TIMESTAMP,
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        phase_id INTEGER,
+        name TEXT NOT NULL,
+        description TEXT,
+        status TEXT DEFAULT 'Not Started',
+        assigned_to TEXT,
+        due_date TIMESTAMP,
+        FOREIGN KEY (phase_id) REFERENCES phases (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER,
+        name TEXT NOT NULL,
+        content TEXT,
+        doc_type TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS test_cases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER,
+        name TEXT NOT NULL,
+        description TEXT,
+        expected_result TEXT,
+        actual_result TEXT,
+        status TEXT DEFAULT 'Not Run',
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+    ''',
+]
+
+# Every KEYFRAME_INTERVAL revisions the full text is stored instead of a delta,
+# so rebuilding an old revision never walks more than that many deltas.
+KEYFRAME_INTERVAL = 20
+
+
+def _fold_duplicate_documents(conn):
+    """
+    Turn repeated (project, name, type) documents into revisions of one document
+
+    Every duplicate group is folded, whether crews or people created it,
+    since save_document now treats any such repeat as a new revision. As in
+    DatabaseManager._store_revision, every KEYFRAME_INTERVAL-th revision is
+    stored in full.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT project_id, name, doc_type FROM documents
+        GROUP BY project_id, name, doc_type HAVING COUNT(*) > 1
+    ''')
+    for project_id, name, doc_type in cursor.fetchall():
+        rows = conn.execute(
+            "SELECT id, content, created_at FROM documents "
+            "WHERE project_id IS ? AND name = ? AND doc_type IS ? ORDER BY created_at, id",
+            (project_id, name, doc_type)
+        ).fetchall()
+        latest_id = rows[-1][0]
+        for revision, (row, newer) in enumerate(zip(rows, rows[1:]), start=1):
+            old_content = row[1] or ""
+            if revision % KEYFRAME_INTERVAL == 0:
+                delta, is_snapshot = compress_text(old_content), 1
+            else:
+                delta, is_snapshot = make_delta(newer[1] or "", old_content), 0
+            conn.execute(
+                "INSERT INTO document_revisions (document_id, revision, delta, is_snapshot, size, content_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (latest_id, revision, delta, is_snapshot, len(old_content), content_hash(old_content), row[2])
+            )
+        conn.execute(
+            "UPDATE documents SET revision = ?, created_at = ? WHERE id = ?",
+            (len(rows), rows[0][2], latest_id)
+        )
+        conn.executemany("DELETE FROM documents WHERE id = ?", [(row[0],) for row in rows[:-1]])
+
+
+# Tables whose changes are logged in the changes table, with the expression
+# giving the project a row belongs to (row is NEW or OLD)
+CHANGE_TABLES = {
+    'projects': "{row}.id",
+    'phases': "{row}.project_id",
+    'tasks': "(SELECT project_id FROM phases WHERE id = {row}.phase_id)",
+    'documents': "{row}.project_id",
+    'test_cases': "{row}.project_id",
+}
+
+
+def _create_change_triggers(conn):
+    """Create the triggers that log inserts, updates and deletes in the changes table"""
+    if getattr(conn, 'dialect', 'sqlite') == 'postgresql':
+        _create_postgres_change_triggers(conn)
+        return
+    for table, project in CHANGE_TABLES.items():
+        for op, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            _create_sqlite_change_trigger(conn, table, op, row)
+
+
+def _create_sqlite_change_trigger(conn, table, op, row, when=None):
+    """Create the SQLite trigger logging one kind of change to a table, skipped when ``when`` is false"""
+    project = CHANGE_TABLES[table]
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_log_{op} AFTER {op.upper()} ON {table}
+        {f"WHEN {when}" if when else ""}
+        BEGIN
+            INSERT INTO changes (table_name, row_id, op, project_id)
+            VALUES ('{table}', {row}.id, '{op}', {project.format(row=row)});
+        END
+    ''')
+
+
+def _create_postgres_change_triggers(conn):
+    """Create the change triggers of a PostgreSQL database"""
+    from database.backends import WRITE_LOCK_KEY
+    for table, project in CHANGE_TABLES.items():
+        # Taking the write lock makes sequence numbers commit in order, as
+        # they do with SQLite's single writer, so a reader that has seen a
+        # sequence number has seen every lower one
+        conn.execute(f'''
+            CREATE OR REPLACE FUNCTION {table}_log_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_advisory_xact_lock({WRITE_LOCK_KEY});
+                IF TG_OP = 'DELETE' THEN
+                    INSERT INTO changes (table_name, row_id, op, project_id)
+                    VALUES ('{table}', OLD.id, 'delete', {project.format(row='OLD')});
+                    RETURN OLD;
+                END IF;
+                INSERT INTO changes (table_name, row_id, op, project_id)
+                VALUES ('{table}', NEW.id, lower(TG_OP), {project.format(row='NEW')});
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_log_change ON {table}")
+        conn.execute(
+            f"CREATE TRIGGER {table}_log_change AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_log_change()"
+        )
+
+
+# Epoch-second columns kept in step with date columns, (table, column): date column.
+# Dates are entered as 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' text without a
+# time zone and read as UTC; anything else gives NULL.
+DATE_COLUMNS = {
+    ('phases', 'start_ts'): 'start_date',
+    ('phases', 'end_ts'): 'end_date',
+    ('tasks', 'due_ts'): 'due_date',
+}
+
+
+def _add_date_columns(conn):
+    """Add the epoch-second columns of DATE_COLUMNS as generated columns"""
+    postgres = getattr(conn, 'dialect', 'sqlite') == 'postgresql'
+    if postgres:
+        # Generated columns need an immutable expression; casting text that
+        # is not a date would raise, so it is done in a function returning NULL instead
+        conn.execute(r'''
+            CREATE OR REPLACE FUNCTION date_text_epoch(value TEXT) RETURNS BIGINT AS $$
+            BEGIN
+                IF value IS NULL OR value !~ '^\d{4}-\d{2}-\d{2}' THEN
+                    RETURN NULL;
+                END IF;
+                RETURN EXTRACT(EPOCH FROM value::timestamp)::bigint;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql IMMUTABLE
+        ''')
+    for (table, column), source in DATE_COLUMNS.items():
+        if postgres:
+            definition = f"BIGINT GENERATED ALWAYS AS (date_text_epoch({source})) STORED"
+        else:
+            # strftime() refuses 'now' in a generated column, so only text
+            # starting with a date is passed to it
+            definition = (
+                f"INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', CASE WHEN {source} GLOB "
+                f"'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' THEN {source} END) AS INTEGER)) VIRTUAL"
+            )
+        try:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError as e:
+            if 'duplicate column name' not in str(e):
+                raise
+
+
+def _create_status_ts_triggers(conn):
+    """Create the triggers that set a phase's status_ts whenever its status changes"""
+    if getattr(conn, 'dialect', 'sqlite') == 'postgresql':
+        conn.execute('''
+            CREATE OR REPLACE FUNCTION phases_status_ts() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.status IS DISTINCT FROM OLD.status THEN
+                    NEW.status_ts := floor(EXTRACT(EPOCH FROM now()))::bigint;
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        conn.execute("DROP TRIGGER IF EXISTS phases_status_ts ON phases")
+        conn.execute(
+            "CREATE TRIGGER phases_status_ts BEFORE UPDATE ON phases FOR EACH ROW EXECUTE FUNCTION phases_status_ts()"
+        )
+        return
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS phases_status_ts AFTER UPDATE OF status ON phases
+        WHEN NEW.status IS NOT OLD.status
+        BEGIN
+            UPDATE phases SET status_ts = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = NEW.id;
+        END
+    ''')
+
+
+def _skip_status_ts_changes(conn):
+    """
+    Stop logging the second update the phases_status_ts trigger makes
+
+    SQLite sets status_ts in an UPDATE of its own after the status change,
+    which was already logged; updates that change status_ts but not the
+    status are left out of the change feed. PostgreSQL sets status_ts in
+    the same statement and needs nothing.
+    """
+    if getattr(conn, 'dialect', 'sqlite') == 'postgresql':
+        return
+    conn.execute("DROP TRIGGER IF EXISTS phases_log_update")
+    _create_sqlite_change_trigger(
+        conn, 'phases', 'update', 'NEW', when="NOT (NEW.status_ts IS NOT OLD.status_ts AND NEW.status IS OLD.status)"
+    )
+
+
+def _backfill_status_ts(conn):
+    """Start the stall clock of phases already In Progress without a start date now"""
+    conn.execute(
+        "UPDATE phases SET status_ts = ? WHERE status = 'In Progress' AND status_ts IS NULL AND start_ts IS NULL",
+        (int(time.time()),)
+    )
+
+
+def _backfill_document_hashes(conn):
+    """Fill content_hash for documents created before revisions existed"""
+    rows = conn.execute("SELECT id, content FROM documents WHERE content_hash IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE documents SET content_hash = ? WHERE id = ?",
+        [(content_hash(content or ""), doc_id) for doc_id, content in rows]
+    )
+
+
+# Ordered list of migrations. Each entry is a list of SQL statements or a
+# callable taking the connection. The database's PRAGMA user_version records
+# how many of them have been applied.
+MIGRATIONS = [
+    BASE_TABLES,
+    [
+        "ALTER TABLE documents ADD COLUMN revision INTEGER DEFAULT 1",
+        "ALTER TABLE documents ADD COLUMN content_hash TEXT",
+        '''
+        CREATE TABLE IF NOT EXISTS document_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            document_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            delta BLOB,
+            is_snapshot INTEGER DEFAULT 0,
+            size INTEGER,
+            content_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (document_id, revision),
+            FOREIGN KEY (document_id) REFERENCES documents (id)
+        )
+        ''',
+        _fold_duplicate_documents,
+        _backfill_document_hashes,
+        "CREATE INDEX IF NOT EXISTS idx_documents_identity ON documents (project_id, doc_type, name)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_latest ON documents (project_id, doc_type, updated_at)",
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS idx_phases_project ON phases (project_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_phase ON tasks (phase_id)",
+        "CREATE INDEX IF NOT EXISTS idx_test_cases_project ON test_cases (project_id)",
+    ],
+    [
+        "ALTER TABLE projects ADD COLUMN external_id TEXT",
+        "ALTER TABLE phases ADD COLUMN external_id TEXT",
+        "ALTER TABLE tasks ADD COLUMN external_id TEXT",
+        "ALTER TABLE documents ADD COLUMN external_id TEXT",
+        "ALTER TABLE test_cases ADD COLUMN external_id TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_projects_external_id ON projects (external_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_phases_external_id ON phases (external_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_external_id ON tasks (external_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_external_id ON documents (external_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_test_cases_external_id ON test_cases (external_id)",
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS crew_leases (
+            lease_key TEXT PRIMARY KEY,
+            project_id INTEGER,
+            crew_type TEXT,
+            fingerprint TEXT,
+            owner TEXT,
+            status TEXT,
+            document_id INTEGER,
+            revision INTEGER,
+            error TEXT,
+            created_at REAL,
+            expires_at REAL,
+            finished_at REAL
+        )
+        ''',
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS llm_route_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            route TEXT NOT NULL,
+            tier TEXT,
+            model TEXT,
+            latency_ms REAL,
+            passed INTEGER,
+            output_chars INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_llm_route_metrics_route ON llm_route_metrics (route, model)",
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS crew_batch_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL,
+            project_id INTEGER NOT NULL,
+            crew_type TEXT NOT NULL,
+            status TEXT DEFAULT 'Pending',
+            attempts INTEGER DEFAULT 0,
+            document_id INTEGER,
+            revision INTEGER,
+            duration REAL,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (batch_id, project_id, crew_type)
+        )
+        ''',
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS query_stats (
+            fingerprint TEXT PRIMARY KEY,
+            statement TEXT NOT NULL,
+            calls INTEGER DEFAULT 0,
+            total_ms REAL DEFAULT 0,
+            max_ms REAL DEFAULT 0,
+            rows INTEGER DEFAULT 0,
+            last_caller TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS slow_queries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fingerprint TEXT NOT NULL,
+            statement TEXT NOT NULL,
+            params TEXT,
+            duration_ms REAL,
+            rows INTEGER,
+            caller TEXT,
+            plan TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ],
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            project_id INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # Highest sequence number removed from the changes table by trimming
+        "CREATE TABLE IF NOT EXISTS change_log_state (trimmed_seq INTEGER NOT NULL)",
+        "INSERT INTO change_log_state (trimmed_seq) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM change_log_state)",
+        _create_change_triggers,
+    ],
+    [
+        _add_date_columns,
+        # Only unfinished tasks are indexed by due date: overdue and upcoming
+        # task queries never have to step over completed ones
+        "CREATE INDEX IF NOT EXISTS idx_tasks_open_due_ts ON tasks (due_ts) WHERE status != 'Completed'",
+        "CREATE INDEX IF NOT EXISTS idx_phases_start_ts ON phases (start_ts)",
+    ],
+    [
+        # Epoch seconds of the phase's last status change; NULL until it first changes
+        "ALTER TABLE phases ADD COLUMN status_ts INTEGER",
+        _create_status_ts_triggers,
+        _backfill_status_ts,
+        # Stall clock of phases In Progress, as used by the stalled phase sweep
+        "CREATE INDEX IF NOT EXISTS idx_phases_in_progress_since ON phases ((COALESCE(status_ts, start_ts))) "
+        "WHERE status = 'In Progress'",
+        # Overdue and stalled flags kept by sweep_flags; since_ts is the due date
+        # or start of the stall clock
+        '''
+        CREATE TABLE IF NOT EXISTS item_flags (
+            kind TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            project_id INTEGER,
+            since_ts INTEGER,
+            PRIMARY KEY (kind, item_id)
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_item_flags_since ON item_flags (kind, since_ts, item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_item_flags_project ON item_flags (project_id, kind)",
+        # Watermarks and flag count of each kind; swept_to NULL means never swept
+        '''
+        CREATE TABLE IF NOT EXISTS flag_sweeps (
+            kind TEXT PRIMARY KEY,
+            swept_to INTEGER,
+            change_seq INTEGER,
+            flagged INTEGER DEFAULT 0,
+            swept_at TIMESTAMP
+        )
+        ''',
+        "INSERT INTO flag_sweeps (kind) SELECT 'overdue_task' WHERE NOT EXISTS "
+        "(SELECT 1 FROM flag_sweeps WHERE kind = 'overdue_task')",
+        "INSERT INTO flag_sweeps (kind) SELECT 'stalled_phase' WHERE NOT EXISTS "
+        "(SELECT 1 FROM flag_sweeps WHERE kind = 'stalled_phase')",
+    ],
+    _skip_status_ts_changes,
+]
+
+
+def apply_migrations(conn):
+    """Bring the database schema up to date and return the schema version"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            steps = [migration] if callable(migration) else migration
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    try:
+                        conn.execute(step)
+                    except sqlite3.OperationalError as e:
+                        # Columns may already exist on databases patched by hand
+                        if 'duplicate column name' not in str(e):
+                            raise
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(MIGRATIONS)
@@ -0,0 +1,206 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from config.settings import (
+    WRITE_QUEUE_MAX_BATCH, WRITE_QUEUE_MAX_PENDING, WRITE_QUEUE_PUT_TIMEOUT, WRITE_QUEUE_WINDOW_MS
+)
+from utils.metrics import METRICS_ENABLED, DB_WRITE_BATCH_SIZE, DB_WRITE_QUEUE_DEPTH
+
+# Durability levels of a queued write
+# The write returns at once and is committed with the next batch; errors are only printed
+BUFFERED = 'buffered'
+# The write returns once the batch holding it has been committed, raising its error if it failed
+COMMITTED = 'committed'
+
+class WriteQueueFull(RuntimeError):
+    """Raised when a write could not be queued because the queue stayed full"""
+
+class _Write:
+    """One queued statement, or a flush marker when sql is None"""
+
+    __slots__ = ('sql', 'params', 'many', 'future')
+
+    def __init__(self, sql, params, many, future):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.future = future
+
+    def done(self, result):
+        if self.future is not None:
+            self.future.set_result(result)
+
+    def fail(self, error):
+        if self.future is not None:
+            self.future.set_exception(error)
+        else:
+            print(f"Warning: queued write failed: {str(error)}")
+
+_STOP = object()
+
+class WriteQueue:
+    """
+    Single writer thread that group-commits writes from all threads
+
+    Writes are put on a bounded queue. The writer takes the first waiting
+    write, gathers whatever else arrives within window seconds (up to
+    max_batch writes) and runs them all in one transaction, so many small
+    writes share one connection, one lock acquisition and one commit
+    instead of paying for their own. Each write runs in a savepoint: a
+    failing write is rolled back and reported to its caller without
+    affecting the others in its batch.
+
+    When max_pending writes are waiting, submitting blocks for up to
+    put_timeout seconds and then raises WriteQueueFull.
+    """
+
+    def __init__(self, connect, window=WRITE_QUEUE_WINDOW_MS / 1000, max_batch=WRITE_QUEUE_MAX_BATCH,
+                 max_pending=WRITE_QUEUE_MAX_PENDING, put_timeout=WRITE_QUEUE_PUT_TIMEOUT, name="db"):
+        self.connect = connect
+        self.window = window
+        self.max_batch = max_batch
+        self.put_timeout = put_timeout
+        self.name = name
+        self._queue = queue.Queue(max_pending)
+        self._conn = None
+        self._thread = threading.Thread(target=self._run, name=f"write-queue-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params=(), durability=COMMITTED, many=False):
+        """
+        Queue a write
+
+        Args:
+            sql (str): Statement to run
+            params (tuple): Its parameters, or a list of parameter tuples if many is set
+            durability (str): BUFFERED to return at once, COMMITTED to wait for the commit
+            many (bool): Run the statement once per parameter tuple
+
+        Returns:
+            int: Number of rows changed for COMMITTED writes, None for BUFFERED ones
+        """
+        future = Future() if durability == COMMITTED else None
+        self._put(_Write(sql, params, many, future))
+        return future.result() if future is not None else None
+
+    def flush(self):
+        """Wait until every write queued so far has been committed"""
+        future = Future()
+        self._put(_Write(None, None, False, future))
+        future.result()
+
+    def close(self):
+        """Commit the queued writes and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def pending(self):
+        """Get the number of writes waiting to be committed"""
+        return self._queue.qsize()
+
+    def _put(self, write):
+        if not self._thread.is_alive():
+            raise RuntimeError("The write queue is closed")
+        try:
+            self._queue.put(write, timeout=self.put_timeout)
+        except queue.Full:
+            raise WriteQueueFull(
+                f"Write queue full ({self._queue.maxsize} writes waiting for {self.put_timeout:g}s)"
+            )
+
+    def _run(self):
+        """Take batches of writes off the queue and commit them until stopped"""
+        stop = False
+        while not stop:
+            write = self._queue.get()
+            if write is _STOP:
+                break
+            batch = [write]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    write = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if write is _STOP:
+                    stop = True
+                    break
+                batch.append(write)
+            self._commit(batch)
+            if METRICS_ENABLED:
+                DB_WRITE_BATCH_SIZE.labels(self.name).observe(len(batch))
+                DB_WRITE_QUEUE_DEPTH.labels(self.name).set(self._queue.qsize())
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _commit(self, batch):
+        """Run a batch of writes in one transaction"""
+        results = []
+        try:
+            if self._conn is None:
+                self._conn = self.connect()
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                if write.sql is None:
+                    results.append(None)
+                    continue
+                cursor.execute("SAVEPOINT queued_write")
+                try:
+                    if write.many:
+                        cursor.executemany(write.sql, write.params)
+                    else:
+                        cursor.execute(write.sql, write.params)
+                    results.append(cursor.rowcount)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT queued_write")
+                    results.append(e)
+                cursor.execute("RELEASE SAVEPOINT queued_write")
+            self._conn.commit()
+        except Exception as e:
+            # The connection may be broken; open a new one for the next batch
+            if self._conn is not None:
+                try:
+                    self._conn.rollback()
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+            for write in batch:
+                write.fail(e)
+            return
+
+        for write, result in zip(batch, results):
+            if isinstance(result, Exception):
+                write.fail(result)
+            else:
+                write.done(result)
+
+# Write queue of each database URL in this process
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_write_queue(backend):
+    """Get the write queue of a database backend, starting it on first use"""
+    key = (backend.url, os.getpid())
+    write_queue = _queues.get(key)
+    if write_queue is None:
+        with _queues_lock:
+            write_queue = _queues.get(key)
+            if write_queue is None:
+                write_queue = _queues[key] = WriteQueue(backend.connect, name=backend.name)
+    return write_queue
+
+def close_write_queues():
+    """Commit the queued writes of every database and stop the writers"""
+    for (url, pid), write_queue in list(_queues.items()):
+        if pid == os.getpid():
+            write_queue.close()
+
+atexit.register(close_write_queues)
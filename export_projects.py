@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+import time
+
+from database.db_manager import DatabaseManager
+from utils.project_export import bundle_file_name, export_project_bundle
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Export projects as zip bundles of documents, test cases and metadata")
+    parser.add_argument("project_ids", nargs="*", type=int, help="IDs of the projects to export")
+    parser.add_argument("--all", action="store_true", help="Export all projects")
+    parser.add_argument("--status", help="Export all projects with this status")
+    parser.add_argument("--output-dir", default="exports", help="Directory to write the bundles to")
+    parser.add_argument("--db-path", help="SQLite database path or database URL (default: DATABASE_URL)")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Rows fetched from the database at a time")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    db = DatabaseManager(args.db_path)
+
+    if args.all or args.status:
+        projects = list(db.iter_projects(args.status))
+    else:
+        projects = [p for p in (db.get_project(project_id) for project_id in args.project_ids) if p]
+        missing = set(args.project_ids) - {p['id'] for p in projects}
+        for project_id in sorted(missing):
+            print(f"Warning: project {project_id} not found, skipping.")
+
+    if not projects:
+        print("No projects to export.")
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    started = time.time()
+    failed = 0
+
+    for number, project in enumerate(projects, start=1):
+        output_path = os.path.join(args.output_dir, bundle_file_name(project))
+        try:
+            counts = export_project_bundle(db, project['id'], output_path, chunk_size=args.chunk_size)
+            print(f"[{number}/{len(projects)}] {project['name']} -> {output_path} "
+                  f"({counts['documents']} documents, {counts['test_cases']} test cases, "
+                  f"{counts['phases']} phases, {counts['tasks']} tasks)")
+        except Exception as e:
+            failed += 1
+            print(f"[{number}/{len(projects)}] Error exporting {project['name']}: {str(e)}")
+
+    print(f"Exported {len(projects) - failed} of {len(projects)} projects in {time.time() - started:.1f}s.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
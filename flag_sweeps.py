@@ -0,0 +1,65 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from config.settings import FLAG_SWEEP_INTERVAL_MINUTES, STALLED_PHASE_DAYS
+from database.db_manager import DatabaseManager
+from database.flags import FlagScheduler, OVERDUE_TASK, STALLED_PHASE
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Flag overdue tasks and stalled phases")
+    parser.add_argument("--db-path", help="SQLite database path or database URL (default: DATABASE_URL)")
+    parser.add_argument("--stalled-days", type=float, default=STALLED_PHASE_DAYS,
+                        help="Days a phase may stay In Progress without a status change")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sweep_parser = subparsers.add_parser("sweep", help="Bring the flags up to date")
+    sweep_parser.add_argument("--full", action="store_true", help="Rebuild the flags from scratch")
+
+    schedule_parser = subparsers.add_parser("schedule", help="Sweep the flags at a regular interval")
+    schedule_parser.add_argument("--every", type=float, default=FLAG_SWEEP_INTERVAL_MINUTES or 5,
+                                 help="Minutes between sweeps")
+
+    list_parser = subparsers.add_parser("list", help="Print the flagged tasks and phases")
+    list_parser.add_argument("--limit", type=int, default=20, help="Maximum items printed per kind")
+    list_parser.add_argument("--project-id", type=int, help="Only print the items of this project")
+
+    return parser.parse_args()
+
+def print_flags(db, limit, project_id):
+    """Print the flag counts and the most overdue tasks and longest stalled phases"""
+    counts = db.get_flag_counts()
+    for kind, label in ((OVERDUE_TASK, "overdue tasks"), (STALLED_PHASE, "stalled phases")):
+        swept_at = counts[kind]['swept_at'] or "never"
+        print(f"{counts[kind]['flagged']} {label} (swept {swept_at})")
+
+    print("\nOverdue tasks")
+    for task in db.get_flagged_overdue_tasks(limit, project_id):
+        print(f"  due {task['due_date']}  {task['project_name']} / {task['phase_name']} / {task['name']} ({task['status']})")
+    print("\nStalled phases")
+    for phase in db.get_flagged_stalled_phases(limit, project_id):
+        since = datetime.fromtimestamp(phase['stalled_since'], timezone.utc).strftime('%Y-%m-%d')
+        print(f"  in progress since {since}  {phase['project_name']} / {phase['name']}")
+    return 0
+
+def main():
+    args = parse_args()
+    db = DatabaseManager(args.db_path)
+    if args.command == "list":
+        return print_flags(db, args.limit, args.project_id)
+
+    if args.command == "sweep":
+        scheduler = FlagScheduler(db, stalled_days=args.stalled_days)
+        return 0 if scheduler.run_once(full=args.full) else 1
+
+    scheduler = FlagScheduler(db, args.every * 60, args.stalled_days)
+    print(f"Sweeping overdue and stalled flags every {args.every:g} minutes. Press Ctrl+C to stop.")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
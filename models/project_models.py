@@ -1,68 +1,149 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
-
-@dataclass
-class Task:
-    id: Optional[int] = None
-    phase_id: int = None
-    name: str = ""
-    description: str = ""
-    status: str = "Not Started"
-    assigned_to: Optional[str] = None
-    due_date: Optional[str] = None
-
-@dataclass
-class Phase:
-    id: Optional[int] = None
-    project_id: int = None
-    name: str = ""
-    description: str = ""
-    status: str = "Not Started"
-    start_date: Optional[str] = None
-    end_date: Optional[str] = None
-    tasks: List[Task] = None
-    
-    def __post_init__(self):
-        if self.tasks is None:
-            self.tasks = []
-
-@dataclass
-class Document:
-    id: Optional[int] = None
-    project_id: int = None
-    name: str = ""
-    content: str = ""
-    doc_type: str = ""
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
-
-@dataclass
-class TestCase:
-    id: Optional[int] = None
-    project_id: int = None
-    name: str = ""
-    description: str = ""
-    expected_result: str = ""
-    actual_result: Optional[str] = None
-    status: str = "Not Run"
-
-@dataclass
-class Project:
-    id: Optional[int] = None
-    name: str = ""
-    description: str = ""
-    status: str = "Not Started"
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
-    phases: List[Phase] = None
-    documents: List[Document] = None
-    test_cases: List[TestCase] = None
-    
-    def __post_init__(self):
-        if self.phases is None:
-            self.phases = []
-        if self.documents is None:
-            self.documents = []
-        if self.test_cases is None:
-            self.test_cases = []
\ No newline at end of file
+import threading
+from collections.abc import Mapping
+
+class Model(Mapping):
+    """
+    Base class of the row models returned by DatabaseManager
+
+    Columns are stored in __slots__, so a model takes a fraction of the
+    memory of a dict. Models read like the dicts the database layer used to
+    return: model['name'], model.get('name'), dict(model) and iteration over
+    the column names all work, as does attribute access (model.name). Columns
+    a query did not select are missing keys; columns the model does not
+    declare (e.g. added by a newer migration) are kept in _extra.
+
+    Subclasses declared with frozen=True cannot be changed once created.
+    """
+    __slots__ = ('_columns', '_extra')
+    _fields = ()
+    _field_set = frozenset()
+
+    def __init_subclass__(cls, frozen=False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = tuple(cls.__slots__)
+        cls._field_set = frozenset(cls._fields)
+        if frozen:
+            cls.__setattr__ = _frozen_setattr
+            cls.__delattr__ = _frozen_setattr
+
+    def __init__(self, **values):
+        model = type(self)
+        for field in self._fields:
+            if field in values:
+                getattr(model, field).__set__(self, values[field])
+        extra = {key: value for key, value in values.items() if key not in self._field_set}
+        Model._columns.__set__(self, tuple(field for field in self._fields if field in values) + tuple(extra))
+        Model._extra.__set__(self, extra or None)
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            if key in self._columns:
+                return getattr(self, key)
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        values = ", ".join(f"{key}={value!r}" for key, value in self.items())
+        return f"{type(self).__name__}({values})"
+
+    def __reduce__(self):
+        return (_rebuild, (type(self), self._columns, tuple(self[column] for column in self._columns)))
+
+    def to_dict(self):
+        """Get the columns of the model as a dict"""
+        return {column: self[column] for column in self._columns}
+
+def _frozen_setattr(self, *args):
+    raise AttributeError(f"{type(self).__name__} objects are read-only")
+
+def _rebuild(model, columns, values):
+    """Recreate a pickled model"""
+    return hydrator(model, columns)(values)
+
+def json_default(value):
+    """Serialize models (and anything else json cannot) for json.dumps(..., default=json_default)"""
+    if isinstance(value, Model):
+        return value.to_dict()
+    return str(value)
+
+# Hydrators generated so far, per model and column names
+_hydrators = {}
+_hydrators_lock = threading.Lock()
+
+def hydrator(model, columns):
+    """
+    Get a function that turns row tuples of a query shape into models
+
+    The function is generated once per model and tuple of column names and
+    assigns each value straight to its slot, so hydrating a row costs about
+    as much as building a tuple.
+
+    Args:
+        model (type): Model class to create
+        columns (tuple): Column names of the rows, e.g. from cursor.description
+
+    Returns:
+        callable: Function taking a row tuple and returning a model
+    """
+    key = (model, columns)
+    hydrate = _hydrators.get(key)
+    if hydrate is None:
+        with _hydrators_lock:
+            hydrate = _hydrators.get(key)
+            if hydrate is None:
+                hydrate = _hydrators[key] = _generate_hydrator(model, columns)
+    return hydrate
+
+def _generate_hydrator(model, columns):
+    """Generate the hydrator function of a model and tuple of columns"""
+    namespace = {
+        'new': object.__new__,
+        'model': model,
+        'columns': columns,
+        'set_columns': Model._columns.__set__,
+        'set_extra': Model._extra.__set__,
+    }
+    lines = ["def hydrate(row):", "    obj = new(model)", "    set_columns(obj, columns)"]
+    extra = []
+    for index, column in enumerate(columns):
+        if column in model._field_set:
+            namespace[f'set_{index}'] = getattr(model, column).__set__
+            lines.append(f"    set_{index}(obj, row[{index}])")
+        else:
+            extra.append(f"{column!r}: row[{index}]")
+    lines.append(f"    set_extra(obj, {{{', '.join(extra)}}})" if extra else "    set_extra(obj, None)")
+    lines.append("    return obj")
+    exec("\n".join(lines), namespace)
+    return namespace['hydrate']
+
+class Project(Model):
+    __slots__ = ('id', 'name', 'description', 'status', 'created_at', 'updated_at', 'external_id')
+
+class Phase(Model):
+    __slots__ = ('id', 'project_id', 'name', 'description', 'status', 'start_date', 'end_date', 'external_id',
+                 'start_ts', 'end_ts', 'status_ts')
+
+class Task(Model):
+    __slots__ = ('id', 'phase_id', 'name', 'description', 'status', 'assigned_to', 'due_date', 'external_id',
+                 'due_ts')
+
+class Document(Model):
+    __slots__ = ('id', 'project_id', 'name', 'content', 'doc_type', 'revision', 'content_hash',
+                 'created_at', 'updated_at', 'external_id')
+
+class DocumentRevision(Model, frozen=True):
+    __slots__ = ('revision', 'size', 'created_at')
+
+class TestCase(Model):
+    __slots__ = ('id', 'project_id', 'name', 'description', 'expected_result', 'actual_result', 'status',
+                 'external_id')
@@ -0,0 +1,56 @@
+import argparse
+import sys
+import time
+
+from database.db_manager import DatabaseManager
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Bulk import and export of projects as JSON Lines")
+    parser.add_argument("--db-path", help="SQLite database path or database URL (default: DATABASE_URL)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export projects to a JSONL file")
+    export_parser.add_argument("path", help="File to write, or - for standard output")
+    export_parser.add_argument("--project-ids", type=int, nargs="*", help="IDs of the projects to export")
+    export_parser.add_argument("--chunk-size", type=int, default=500, help="Projects read at a time")
+
+    import_parser = subparsers.add_parser("import", help="Import projects from a JSONL file")
+    import_parser.add_argument("path", help="File to read, or - for standard input")
+    import_parser.add_argument("--chunk-size", type=int, default=1000, help="Projects written per transaction")
+
+    return parser.parse_args()
+
+def make_progress(label, started):
+    """Create a progress callback that prints throughput"""
+    def progress(count):
+        elapsed = time.time() - started
+        rate = count / elapsed if elapsed else 0
+        print(f"{label} {count} projects ({rate:,.0f}/s)", file=sys.stderr)
+    return progress
+
+def main():
+    args = parse_args()
+    db = DatabaseManager(args.db_path)
+    started = time.time()
+
+    if args.command == "export":
+        progress = make_progress("Exported", started)
+        if args.path == "-":
+            count = db.export_jsonl(sys.stdout, args.project_ids, args.chunk_size, progress)
+        else:
+            with open(args.path, 'w', encoding='utf-8') as fileobj:
+                count = db.export_jsonl(fileobj, args.project_ids, args.chunk_size, progress)
+        print(f"Exported {count} projects in {time.time() - started:.1f}s.", file=sys.stderr)
+    else:
+        progress = make_progress("Imported", started)
+        if args.path == "-":
+            count = db.import_jsonl(sys.stdin, args.chunk_size, progress)
+        else:
+            with open(args.path, 'r', encoding='utf-8') as fileobj:
+                count = db.import_jsonl(fileobj, args.chunk_size, progress)
+        print(f"Imported {count} projects in {time.time() - started:.1f}s.", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
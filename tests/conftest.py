@@ -0,0 +1,8 @@
+import pytest
+
+from database.db_manager import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    """An empty SQLite database in a temporary directory"""
+    return DatabaseManager(str(tmp_path / "projects.db"))
@@ -0,0 +1,91 @@
+import io
+import json
+import sqlite3
+
+from database.db_manager import DatabaseManager
+
+TABLES = ('projects', 'phases', 'tasks', 'documents', 'test_cases')
+
+def _seed(db, projects=7):
+    for n in range(projects):
+        project_id = db.create_project(f"Project {n}", f"Description {n}")
+        for p in range(n % 3 + 1):
+            phase_id = db.create_phase(project_id, f"Phase {p}", "")
+            for t in range(p + 1):
+                db.create_task(phase_id, f"Task {t}", "", due_date="2025-01-31")
+        db.create_document(project_id, "Requirements", f"# Requirements {n}\n", "Requirements")
+        db.create_test_case(project_id, f"Test {n}", "", "It works")
+
+def _row_counts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+    finally:
+        conn.close()
+
+def _export(db, **kwargs):
+    exported = io.StringIO()
+    db.export_jsonl(exported, **kwargs)
+    return exported.getvalue()
+
+def test_export_imports_into_a_new_database_with_the_same_rows(db, tmp_path):
+    _seed(db)
+    exported = _export(db, chunk_size=3)
+    assert len(exported.splitlines()) == 7
+
+    copy_path = str(tmp_path / "copy.db")
+    copy = DatabaseManager(copy_path)
+    assert copy.import_jsonl(io.StringIO(exported), chunk_size=2) == 7
+    assert _row_counts(copy_path) == _row_counts(str(tmp_path / "projects.db"))
+
+    # Rows keep their external IDs, so the copy exports the same records
+    assert sorted(_export(copy).splitlines()) == sorted(exported.splitlines())
+
+def test_reimporting_an_export_adds_no_rows(db, tmp_path):
+    _seed(db)
+    path = str(tmp_path / "projects.db")
+    counts = _row_counts(path)
+    exported = _export(db)
+    db.import_jsonl(io.StringIO(exported))
+    seq = db.latest_change_seq()
+    db.import_jsonl(io.StringIO(exported))
+    assert _row_counts(path) == counts
+    # Unchanged rows are not rewritten
+    assert db.latest_change_seq() == seq
+
+def test_changed_rows_are_updated_on_reimport(db):
+    _seed(db, projects=2)
+    record = json.loads(_export(db).splitlines()[0])
+    record['description'] = "Changed"
+    record['phases'][0]['tasks'][0]['status'] = "Completed"
+    seq = db.latest_change_seq()
+    db.import_records([record])
+    changes = db.changes_since(seq)['changes']
+    assert sorted((c['table_name'], c['op']) for c in changes) == [('projects', 'update'), ('tasks', 'update')]
+    assert db.get_project(1)['description'] == "Changed"
+
+def test_records_without_external_id_are_added_as_new_projects(db):
+    record = {'name': "Same name", 'phases': [{'name': "Design"}]}
+    db.import_records([record, dict(record)])
+    db.import_records([record])
+    assert db.count_projects() == 3
+
+def test_import_restores_the_journal_mode(db, tmp_path):
+    _seed(db, projects=1)
+    conn = sqlite3.connect(tmp_path / "projects.db")
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    db.import_jsonl(io.StringIO(_export(db)))
+    conn = sqlite3.connect(tmp_path / "projects.db")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    conn.close()
+
+def test_imported_content_becomes_a_new_revision(db):
+    _seed(db, projects=1)
+    record = json.loads(_export(db))
+    document_id = db.get_documents(1)[0]['id']
+    record['documents'][0]['content'] = "# Requirements, revised\n"
+    db.import_records([record])
+    assert [r['revision'] for r in db.get_document_revisions(document_id)] == [2, 1]
+    assert db.get_document_revision(document_id, 1) == "# Requirements 0\n"
+    assert db.get_document_revision(document_id, 2) == "# Requirements, revised\n"
@@ -0,0 +1,73 @@
+import random
+import sqlite3
+
+def _read_all(db, seq=0, limit=1000):
+    """Read the feed page by page from seq, as a consumer would"""
+    changes = []
+    while True:
+        page = db.changes_since(seq, limit=limit)
+        assert not page['reset']
+        changes.extend(page['changes'])
+        if page['last_seq'] == seq:
+            return changes, seq
+        seq = page['last_seq']
+
+def _latest_per_row(changes):
+    return {(c['table_name'], c['row_id']): c['op'] for c in changes}
+
+def _make_changes(db, path, seed=45):
+    rng = random.Random(seed)
+    task_ids = []
+    for n in range(4):
+        project_id = db.create_project(f"Project {n}", "")
+        phase_id = db.create_phase(project_id, "Design", "")
+        task_ids.extend(db.create_task(phase_id, f"Task {t}", "") for t in range(3))
+        db.create_test_case(project_id, "Smoke", "", "")
+    for _ in range(20):
+        db.update_task(rng.choice(task_ids), status=rng.choice(("In Progress", "Completed")))
+    # Writes made outside DatabaseManager are logged too
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM tasks WHERE id = ?", (task_ids[0],))
+    conn.commit()
+    conn.close()
+    return task_ids
+
+def test_paged_reads_return_every_change_once_in_order(db, tmp_path):
+    task_ids = _make_changes(db, tmp_path / "projects.db")
+    changes, last_seq = _read_all(db, limit=7)
+    seqs = [c['seq'] for c in changes]
+    assert seqs == sorted(set(seqs))
+    assert last_seq == db.latest_change_seq() == seqs[-1]
+    assert changes[-1]['table_name'] == 'tasks' and changes[-1]['row_id'] == task_ids[0]
+    assert changes[-1]['op'] == 'delete'
+    assert db.changes_since(last_seq)['changes'] == []
+
+def test_compaction_keeps_the_latest_change_of_every_row(db, tmp_path):
+    _make_changes(db, tmp_path / "projects.db")
+    before, last_seq = _read_all(db)
+    result = db.compact_changes(retention_days=1)
+    after, _ = _read_all(db, limit=5)
+    assert result == {'collapsed': len(before) - len(after), 'trimmed': 0}
+    assert len(after) == len(_latest_per_row(before))
+    assert _latest_per_row(after) == _latest_per_row(before)
+    assert db.latest_change_seq() == last_seq
+
+def test_consumers_behind_a_trim_are_told_to_reset(db, tmp_path):
+    _make_changes(db, tmp_path / "projects.db")
+    _, last_seq = _read_all(db)
+    db.compact_changes(retention_days=0)
+    feed = db.changes_since(0)
+    assert feed['reset'] and feed['last_seq'] == last_seq
+    db.create_project("After trim", "")
+    feed = db.changes_since(last_seq)
+    assert not feed['reset']
+    assert [(c['table_name'], c['op']) for c in feed['changes']] == [('projects', 'insert')]
+
+def test_a_phase_status_change_is_logged_once(db):
+    project_id = db.create_project("Project", "")
+    phase_id = db.create_phase(project_id, "Design", "")
+    seq = db.latest_change_seq()
+    db.update_phase(phase_id, status="In Progress")
+    changes = db.changes_since(seq)['changes']
+    assert [(c['table_name'], c['row_id'], c['op']) for c in changes] == [('phases', phase_id, 'update')]
+    assert db.get_phase(phase_id)['status_ts'] is not None
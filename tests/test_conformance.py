@@ -0,0 +1,28 @@
+import os
+import uuid
+
+import pytest
+
+from database.conformance import CHECKS
+from database.db_manager import DatabaseManager
+
+# Empty PostgreSQL database to run the checks against as well, if any
+POSTGRES_URL = os.getenv('TEST_DATABASE_URL')
+
+def _check_id(check_function):
+    return check_function.__name__[len('check_'):]
+
+@pytest.fixture(scope='module')
+def postgres_db():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return DatabaseManager(POSTGRES_URL)
+
+@pytest.mark.parametrize('check_function', CHECKS, ids=_check_id)
+def test_sqlite(check_function, tmp_path):
+    db = DatabaseManager(f"sqlite:///{tmp_path / 'conformance.db'}")
+    check_function(db, f"conf-{uuid.uuid4().hex[:8]}")
+
+@pytest.mark.parametrize('check_function', CHECKS, ids=_check_id)
+def test_postgresql(check_function, postgres_db):
+    check_function(postgres_db, f"conf-{uuid.uuid4().hex[:8]}")
@@ -0,0 +1,85 @@
+import random
+import sqlite3
+
+import pytest
+
+from database.schema import KEYFRAME_INTERVAL
+from utils.text_delta import apply_delta, make_delta
+
+def _edit(rng, text):
+    """Change, add and remove a few random lines of a text"""
+    lines = text.splitlines(keepends=True)
+    for _ in range(rng.randint(1, 4)):
+        position = rng.randint(0, len(lines))
+        action = rng.choice(('insert', 'replace', 'delete'))
+        if action == 'insert' or not lines:
+            lines.insert(position, f"line {rng.random():.6f}\n")
+        elif action == 'replace':
+            lines[min(position, len(lines) - 1)] = f"changed {rng.random():.6f}\n"
+        else:
+            del lines[min(position, len(lines) - 1)]
+    text = ''.join(lines)
+    # Sometimes leave the last line without a newline
+    return text.rstrip('\n') if rng.random() < 0.2 else text
+
+@pytest.mark.parametrize('source, target', [
+    ("", "a\nb\n"),
+    ("a\nb\n", ""),
+    ("a\nb\nc", "a\nc\nd"),
+    ("same\n", "same\n"),
+    ("x\r\ny\r\n", "x\r\nz\r\n"),
+])
+def test_delta_rebuilds_target(source, target):
+    assert apply_delta(source, make_delta(source, target)) == target
+
+def test_every_revision_rebuilds_to_what_was_saved(db, tmp_path):
+    rng = random.Random(26)
+    project_id = db.create_project("Versioned", "")
+    content = "".join(f"line {n}\n" for n in range(30))
+    document_id = db.create_document(project_id, "Design", content, "Design")
+    saved = [content]
+    for _ in range(2 * KEYFRAME_INTERVAL + 5):
+        content = _edit(rng, content)
+        assert db.add_document_revision(document_id, content) == len(saved) + 1
+        saved.append(content)
+
+    for revision, expected in enumerate(saved, start=1):
+        assert db.get_document_revision(document_id, revision) == expected
+    assert db.get_document_revision(document_id, 0) is None
+    assert db.get_document_revision(document_id, len(saved) + 1) is None
+
+    conn = sqlite3.connect(tmp_path / "projects.db")
+    snapshots = [row[0] for row in conn.execute(
+        "SELECT revision FROM document_revisions WHERE document_id = ? AND is_snapshot = 1 ORDER BY revision",
+        (document_id,)
+    )]
+    conn.close()
+    assert snapshots == [KEYFRAME_INTERVAL, 2 * KEYFRAME_INTERVAL]
+
+def test_saving_identical_content_adds_no_revision(db):
+    project_id = db.create_project("Versioned", "")
+    document_id = db.create_document(project_id, "Design", "first\n", "Design")
+    assert db.add_document_revision(document_id, "second\n") == 2
+    assert db.add_document_revision(document_id, "second\n") == 2
+    assert [r['revision'] for r in db.get_document_revisions(document_id)] == [2, 1]
+
+def test_folded_duplicates_rebuild_with_keyframes(db, tmp_path):
+    from database.schema import _fold_duplicate_documents
+    project_id = db.create_project("Folded", "")
+    saved = [f"# Design {n}\n" + "".join(f"line {n * m}\n" for m in range(5)) for n in range(KEYFRAME_INTERVAL + 3)]
+    for content in saved:
+        db.create_document(project_id, "Design Document", content, "Design")
+    db.create_document(project_id, "Notes", "Only once\n", "Other")
+
+    conn = sqlite3.connect(tmp_path / "projects.db")
+    _fold_duplicate_documents(conn)
+    conn.commit()
+    snapshots = [row[0] for row in conn.execute("SELECT revision FROM document_revisions WHERE is_snapshot = 1")]
+    conn.close()
+
+    documents = {d['name']: d for d in db.get_documents(project_id)}
+    assert len(documents) == 2 and documents['Notes']['revision'] == 1
+    document_id = documents['Design Document']['id']
+    assert snapshots == [KEYFRAME_INTERVAL]
+    for revision, expected in enumerate(saved, start=1):
+        assert db.get_document_revision(document_id, revision) == expected
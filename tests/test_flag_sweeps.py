@@ -0,0 +1,66 @@
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from database.flags import OVERDUE_TASK, STALLED_PHASE
+
+DAY = 24 * 60 * 60
+
+def _flags(path):
+    conn = sqlite3.connect(path)
+    try:
+        return set(conn.execute("SELECT kind, item_id, project_id, since_ts FROM item_flags"))
+    finally:
+        conn.close()
+
+def _due_date(rng):
+    return (date.today() + timedelta(days=rng.randint(-5, 20))).isoformat()
+
+def test_incremental_sweeps_match_full_sweeps(db, tmp_path):
+    path = tmp_path / "projects.db"
+    rng = random.Random(49)
+    phase_ids, task_ids = [], []
+    for n in range(5):
+        project_id = db.create_project(f"Project {n}", "")
+        for p in range(3):
+            phase_ids.append(db.create_phase(project_id, f"Phase {p}", ""))
+            for _ in range(6):
+                task_ids.append(db.create_task(phase_ids[-1], "Task", "", due_date=_due_date(rng)))
+
+    now = time.time()
+    first = db.sweep_flags(now=now, stalled_days=2)
+    assert first[OVERDUE_TASK]['full'] and first[STALLED_PHASE]['full']
+
+    for _ in range(6):
+        # Finish, reopen and reschedule tasks, add new ones and move phases along
+        for task_id in rng.sample(task_ids, 8):
+            db.update_task(task_id, status=rng.choice(("Completed", "In Progress", "Not Started")))
+        for task_id in rng.sample(task_ids, 5):
+            db.update_task(task_id, due_date=_due_date(rng))
+        task_ids.append(db.create_task(rng.choice(phase_ids), "Late task", "", due_date=_due_date(rng)))
+        for phase_id in rng.sample(phase_ids, 3):
+            db.update_phase(phase_id, status=rng.choice(("In Progress", "Completed")))
+
+        now += rng.uniform(0.5, 3) * DAY
+        incremental = db.sweep_flags(now=now, stalled_days=2)
+        assert not incremental[OVERDUE_TASK]['full'] and not incremental[STALLED_PHASE]['full']
+        swept = _flags(path)
+
+        full = db.sweep_flags(now=now, stalled_days=2, full=True)
+        assert _flags(path) == swept
+        for kind in (OVERDUE_TASK, STALLED_PHASE):
+            assert incremental[kind]['flagged'] == full[kind]['flagged']
+
+    kinds = {kind for kind, *_ in swept}
+    assert kinds == {OVERDUE_TASK, STALLED_PHASE}
+
+def test_a_trimmed_change_feed_forces_a_full_sweep(db):
+    project_id = db.create_project("Project", "")
+    phase_id = db.create_phase(project_id, "Phase", "")
+    db.sweep_flags()
+    db.create_task(phase_id, "Task", "", due_date=(date.today() - timedelta(days=3)).isoformat())
+    db.compact_changes(retention_days=0)
+    result = db.sweep_flags()
+    assert result[OVERDUE_TASK]['full'] and result[OVERDUE_TASK]['flagged'] == 1
+    assert [task['name'] for task in db.get_flagged_overdue_tasks()] == ["Task"]
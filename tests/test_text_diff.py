@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from utils.text_diff import diff_opcodes, unified_diff
+
+def _lcs_length(a, b):
+    """Length of the longest common subsequence, by dynamic programming"""
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+def _check_opcodes(a, b, opcodes):
+    """Check that the opcodes cover both sequences in order and turn a into b"""
+    i = j = 0
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+        else:
+            assert tag in ('replace', 'delete', 'insert')
+            assert (i2 > i1) == (tag != 'insert') and (j2 > j1) == (tag != 'delete')
+        rebuilt.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    assert rebuilt == b
+
+def _random_pair(rng):
+    alphabet = "abcdef"[:rng.randint(1, 6)]
+    a = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+    b = list(a)
+    for _ in range(rng.randint(0, 15)):
+        position = rng.randint(0, len(b))
+        if b and rng.random() < 0.5:
+            del b[min(position, len(b) - 1)]
+        else:
+            b.insert(position, rng.choice(alphabet + "xyz"))
+    return a, b
+
+@pytest.mark.parametrize('seed', range(20))
+def test_opcodes_keep_a_longest_common_subsequence(seed):
+    rng = random.Random(seed)
+    for _ in range(25):
+        a, b = _random_pair(rng)
+        opcodes = diff_opcodes(a, b)
+        _check_opcodes(a, b, opcodes)
+        kept = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal')
+        assert kept == _lcs_length(a, b)
+
+def test_bounded_search_still_gives_a_valid_diff():
+    rng = random.Random(50)
+    a = [f"line {rng.randint(0, 300)}\n" for _ in range(600)]
+    b = [line if rng.random() < 0.5 else f"new {rng.random()}\n" for line in a]
+    opcodes = diff_opcodes(a, b, max_cost=8)
+    _check_opcodes(a, b, opcodes)
+    assert sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal') <= _lcs_length(a, b)
+
+def test_unified_diff_marks_changed_lines():
+    old = "".join(f"line {n}\n" for n in range(10))
+    new = old.replace("line 4\n", "line four\n")
+    diff = unified_diff(old, new, "revision 1", "revision 2")
+    assert diff.splitlines()[:3] == ["--- revision 1", "+++ revision 2", "@@ -2,7 +2,7 @@"]
+    assert "-line 4" in diff.splitlines() and "+line four" in diff.splitlines()
+    assert unified_diff(old, old) == ""
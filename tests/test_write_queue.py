@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database.write_queue import BUFFERED, COMMITTED, WriteQueue, WriteQueueFull
+
+class RecordingQueue(WriteQueue):
+    """Write queue remembering the size of every batch it committed"""
+
+    def __init__(self, *args, **kwargs):
+        self.batches = []
+        super().__init__(*args, **kwargs)
+
+    def _commit(self, batch):
+        self.batches.append(len(batch))
+        super()._commit(batch)
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "queue.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, source INTEGER, value INTEGER UNIQUE)")
+    conn.close()
+    return path
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_concurrent_writes_share_commits(path):
+    write_queue = RecordingQueue(lambda: sqlite3.connect(path), window=0.05)
+    barrier = threading.Barrier(16)
+
+    def writer(source):
+        barrier.wait()
+        for n in range(10):
+            write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (source, source * 100 + n))
+
+    threads = [threading.Thread(target=writer, args=(source,)) for source in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    write_queue.close()
+
+    assert _count(path) == 160
+    assert sum(write_queue.batches) == 160
+    # Sixteen writers waiting on their commits mostly share them
+    assert len(write_queue.batches) < 160 / 2
+
+def test_a_failing_write_fails_alone(path):
+    write_queue = RecordingQueue(lambda: sqlite3.connect(path), window=0.2)
+    write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (1, 1), BUFFERED)
+    with pytest.raises(sqlite3.IntegrityError):
+        write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (2, 1), COMMITTED)
+    assert write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (3, 3)) == 1
+    write_queue.close()
+    assert write_queue.batches[0] == 2
+    assert _count(path) == 2
+
+def test_buffered_writes_are_committed_by_flush_and_close(path):
+    write_queue = WriteQueue(lambda: sqlite3.connect(path), window=0.5)
+    assert write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (1, 1), BUFFERED) is None
+    write_queue.flush()
+    assert _count(path) == 1
+    write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (1, 2), BUFFERED)
+    write_queue.close()
+    assert _count(path) == 2
+    with pytest.raises(RuntimeError):
+        write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (1, 3))
+
+def test_submitting_to_a_full_queue_times_out(path):
+    release = threading.Event()
+
+    def slow_connect():
+        release.wait()
+        return sqlite3.connect(path)
+
+    write_queue = WriteQueue(slow_connect, window=0, max_pending=2, put_timeout=0.05)
+    accepted = 0
+    with pytest.raises(WriteQueueFull):
+        for n in range(10):
+            write_queue.submit("INSERT INTO events (source, value) VALUES (?, ?)", (1, n), BUFFERED)
+            accepted += 1
+    # The writer holds what it took off the queue while two more wait
+    assert 2 < accepted < 10
+    release.set()
+    write_queue.close()
+    assert _count(path) == accepted
@@ -1,38 +1,193 @@
+import atexit
+import multiprocessing
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from markdownify import markdownify
 
-def html_to_markdown(html_content):
+from utils.text_delta import content_hash
+from utils.tracing import traced
+
+# Maximum number of converted documents kept in memory
+CACHE_MAX_ENTRIES = 512
+
+# Inputs at least this many characters long are converted in a worker process
+PROCESS_POOL_THRESHOLD = 200_000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+def _cache_get(key):
+    """Get a converted document from the cache"""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+def _cache_put(key, markdown):
+    """Store a converted document in the cache"""
+    with _cache_lock:
+        _cache[key] = markdown
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def _get_pool():
+    """
+    Get the shared process pool, creating it on first use
+
+    Workers are started with spawn: forking the multi-threaded Streamlit or
+    API server process could leave locks held by its other threads locked
+    in the child.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_shutdown_pool)
+        return _pool
+
+def _shutdown_pool():
+    """Stop the worker processes of the shared pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def _convert(html_content):
+    """Convert HTML to Markdown without caching"""
+    return markdownify(html_content)
+
+def clear_cache():
+    """Remove all converted documents from the cache"""
+    with _cache_lock:
+        _cache.clear()
+
+@traced("convert.html_to_markdown")
+def html_to_markdown(html_content, content_key=None):
     """
     Convert HTML content to Markdown format
-    
+
+    Results are cached by content hash, so converting the same content again
+    is a dictionary lookup.
+
     Args:
         html_content (str): HTML content to convert
-        
+        content_key (str, optional): Precomputed content hash of html_content
+
     Returns:
         str: Converted Markdown content
     """
     try:
-        return markdownify(html_content)
+        key = content_key or content_hash(html_content)
+        markdown = _cache_get(key)
+        if markdown is None:
+            if len(html_content or "") >= PROCESS_POOL_THRESHOLD:
+                markdown = _get_pool().submit(_convert, html_content).result()
+            else:
+                markdown = _convert(html_content)
+            _cache_put(key, markdown)
+        return markdown
     except Exception as e:
         raise Exception(f"Error converting HTML to Markdown: {str(e)}")
 
+@traced("convert.convert_many")
+def convert_many(html_contents, content_keys=None):
+    """
+    Convert several HTML documents to Markdown in one pass
+
+    Cached documents are returned directly; large uncached documents are
+    converted in parallel in the process pool.
+
+    Args:
+        html_contents (list): HTML contents to convert
+        content_keys (list, optional): Precomputed content hashes, one per content
+
+    Returns:
+        list: Converted Markdown content, in the same order
+    """
+    try:
+        keys = content_keys or [None] * len(html_contents)
+        keys = [key or content_hash(html) for key, html in zip(keys, html_contents)]
+        results = [_cache_get(key) for key in keys]
+
+        pending = {}
+        for index, (html, markdown) in enumerate(zip(html_contents, results)):
+            if markdown is None and len(html or "") >= PROCESS_POOL_THRESHOLD:
+                pending[index] = _get_pool().submit(_convert, html)
+
+        for index, html in enumerate(html_contents):
+            if results[index] is None and index not in pending:
+                results[index] = _convert(html)
+                _cache_put(keys[index], results[index])
+
+        for index, future in pending.items():
+            results[index] = future.result()
+            _cache_put(keys[index], results[index])
+
+        return results
+    except Exception as e:
+        raise Exception(f"Error converting HTML to Markdown: {str(e)}")
+
+@traced("convert.preconvert_project_documents")
+def preconvert_project_documents(db, project_id, documents=None):
+    """
+    Convert all documents of a project to Markdown
+
+    Args:
+        db (DatabaseManager): Database manager to read documents from
+        project_id (int): ID of the project
+        documents (list, optional): Already loaded documents of the project
+
+    Returns:
+        dict: Converted Markdown content keyed by document ID
+    """
+    if documents is None:
+        documents = db.get_documents(project_id)
+
+    markdown = convert_many(
+        [doc['content'] or "" for doc in documents],
+        [doc.get('content_hash') for doc in documents]
+    )
+    return {doc['id']: md for doc, md in zip(documents, markdown)}
+
+@traced("convert.convert_html_file_to_markdown")
 def convert_html_file_to_markdown(html_file_path):
     """
     Convert an HTML file to Markdown and return the content
-    
+
+    The file is only read and converted again when its modification time or
+    size changes.
+
     Args:
         html_file_path (str): Path to the HTML file
-        
+
     Returns:
         str: Converted Markdown content
     """
     try:
         if not os.path.exists(html_file_path):
             raise FileNotFoundError(f"HTML file not found: {html_file_path}")
-            
+
+        stat = os.stat(html_file_path)
+        key = f"file:{os.path.abspath(html_file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        markdown = _cache_get(key)
+        if markdown is not None:
+            return markdown
+
         with open(html_file_path, 'r', encoding='utf-8') as file:
             html_content = file.read()
-            
-        return html_to_markdown(html_content)
+
+        markdown = html_to_markdown(html_content)
+        _cache_put(key, markdown)
+        return markdown
     except Exception as e:
-        raise Exception(f"Error converting HTML file to Markdown: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error converting HTML file to Markdown: {str(e)}")
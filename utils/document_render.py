@@ -0,0 +1,245 @@
+import html
+import re
+import threading
+from collections import OrderedDict
+
+import markdown
+
+from config.settings import DOCUMENT_PAGE_CHARS
+from utils.text_delta import content_hash
+from utils.tracing import traced
+
+# Maximum number of rendered documents kept in memory
+CACHE_MAX_ENTRIES = 256
+
+# Headings that start a new section: HTML <h1> to <h3> or Markdown "#" to "###"
+_HEADING_RE = re.compile(
+    r'<h([1-3])(?:\s[^>]*)?>(.*?)</h\1\s*>|^(#{1,3})[ \t]+([^\n]+?)[ \t#]*$',
+    re.IGNORECASE | re.DOTALL | re.MULTILINE
+)
+
+# Places where a section that is too long for one page can be split
+_BLOCK_END_RE = re.compile(r'\n[ \t]*\n|</(?:p|div|ul|ol|table|pre|blockquote)\s*>', re.IGNORECASE)
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# A character entity cut off at the end of a chunk, e.g. "&am"
+_ENTITY_TAIL_RE = re.compile(r'&#?\w*$')
+
+# Opening, closing and self-closing tags with their element name
+_TAG_NAME_RE = re.compile(r'<(/?)([a-zA-Z][\w:-]*)(?:\s[^>]*?)?(/?)>')
+
+# Documents starting with a tag are HTML; others are rendered as Markdown
+_HTML_START_RE = re.compile(r'\s*<(?:!doctype|[a-zA-Z])', re.IGNORECASE)
+
+# Elements that have no closing tag
+_VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'
+))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(key):
+    """Get a rendered document from the cache"""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+def _cache_put(key, rendered):
+    """Store a rendered document in the cache"""
+    with _cache_lock:
+        _cache[key] = rendered
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def clear_cache():
+    """Remove all rendered documents from the cache"""
+    with _cache_lock:
+        _cache.clear()
+
+def split_sections(content):
+    """
+    Split a document into sections at its level 1 to 3 headings
+
+    Both HTML headings and Markdown headings are recognized. Content before
+    the first heading becomes an "Introduction" section.
+
+    Args:
+        content (str): HTML or Markdown content of the document
+
+    Returns:
+        list: Sections as dicts with title, level and content
+    """
+    content = content or ""
+    headings = list(_HEADING_RE.finditer(content))
+    sections = []
+
+    intro = content[:headings[0].start()] if headings else content
+    if intro.strip():
+        sections.append({'title': "Introduction" if headings else "Document", 'level': 1, 'content': intro})
+
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(content)
+        level = int(heading.group(1)) if heading.group(1) else len(heading.group(3))
+        title = html.unescape(_TAG_RE.sub("", heading.group(2) or heading.group(4))).strip()
+        sections.append({'title': title or "Untitled section", 'level': level, 'content': content[heading.start():end]})
+
+    return sections
+
+def _cut_point(content, start, limit):
+    """
+    Get where to cut a chunk of at most limit characters off content[start:]
+
+    Cuts after the last line break, or else the last other whitespace,
+    outside tags. Text without any is cut between tags or before a
+    character entity, so a chunk never ends inside markup. A single tag
+    longer than limit is kept whole.
+    """
+    end = start + limit
+    # Stretches of text between the tags that end before the limit
+    texts = []
+    position = start
+    for tag in _TAG_RE.finditer(content, start, end):
+        texts.append((position, tag.start()))
+        position = tag.end()
+    unfinished = content.find('<', position, end)
+    texts.append((position, end if unfinished == -1 else unfinished))
+
+    for separators in ('\n', ' \t\r\n'):
+        for text_start, text_end in reversed(texts):
+            segment = content[text_start:text_end]
+            index = max(segment.rfind(separator) for separator in separators)
+            if index != -1 and text_start + index + 1 > start:
+                return text_start + index + 1
+
+    for text_start, text_end in reversed(texts):
+        entity = _ENTITY_TAIL_RE.search(content, text_start, text_end)
+        cut = entity.start() if entity else text_end
+        if cut > start:
+            return cut
+
+    tag_end = content.find('>', start)
+    return tag_end + 1 if tag_end != -1 else len(content)
+
+def _split_long(content, limit):
+    """Split content longer than limit at block boundaries, cutting blocks that are longer still with _cut_point"""
+    if len(content) <= limit:
+        return [content]
+
+    chunks = []
+    start = previous = 0
+    for boundary in [match.end() for match in _BLOCK_END_RE.finditer(content)] + [len(content)]:
+        if boundary - start > limit and previous > start:
+            chunks.append(content[start:previous])
+            start = previous
+        while boundary - start > limit:
+            cut = _cut_point(content, start, limit)
+            chunks.append(content[start:cut])
+            start = cut
+        previous = max(boundary, start)
+    if start < len(content):
+        chunks.append(content[start:])
+    return chunks
+
+def _balance_tags(page):
+    """Close the elements a page break left open and drop closing tags whose element started on an earlier page"""
+    parts = []
+    open_elements = []
+    position = 0
+    for tag in _TAG_NAME_RE.finditer(page):
+        closing, name, self_closing = tag.group(1), tag.group(2).lower(), tag.group(3)
+        if closing:
+            if name not in open_elements:
+                parts.append(page[position:tag.start()])
+                position = tag.end()
+                continue
+            # Elements still open inside this one are closed with it, as browsers do
+            while open_elements.pop() != name:
+                pass
+        elif not self_closing and name not in _VOID_ELEMENTS:
+            open_elements.append(name)
+    parts.append(page[position:])
+    parts.extend(f"</{name}>" for name in reversed(open_elements))
+    return "".join(parts)
+
+def _page_html(source, is_markdown):
+    """Render the source of one page as well-formed HTML"""
+    if is_markdown:
+        source = markdown.markdown(source, extensions=['tables', 'fenced_code'])
+    return _balance_tags(source)
+
+@traced("convert.render_document")
+def render_document(content, content_key=None, page_chars=DOCUMENT_PAGE_CHARS):
+    """
+    Split a document into sections and pages for display
+
+    Sections are packed into pages of at most page_chars characters;
+    sections longer than a page are split at paragraph boundaries, or
+    failing that at whitespace outside tags. Pages are rendered to HTML by
+    render_page when first shown. Results, rendered pages included, are
+    cached by content hash, so showing the same content again is a
+    dictionary lookup.
+
+    Args:
+        content (str): HTML or Markdown content of the document
+        content_key (str, optional): Precomputed content hash of content
+        page_chars (int): Maximum number of characters per page
+
+    Returns:
+        dict: 'sections' (title, level and page number of each section, the
+            table of contents) and 'sources' (content of each page), for render_page
+    """
+    key = (content_key or content_hash(content), page_chars)
+    rendered = _cache_get(key)
+    if rendered is not None:
+        return rendered
+
+    sections = []
+    pages = []
+    page = []
+    page_size = 0
+    for section in split_sections(content):
+        for part, chunk in enumerate(_split_long(section['content'], page_chars)):
+            if page and page_size + len(chunk) > page_chars:
+                pages.append("".join(page))
+                page = []
+                page_size = 0
+            if part == 0:
+                sections.append({'title': section['title'], 'level': section['level'], 'page': len(pages) + 1})
+            page.append(chunk)
+            page_size += len(chunk)
+    if page or not pages:
+        pages.append("".join(page))
+
+    rendered = {
+        'sections': sections,
+        'sources': pages,
+        'pages': [None] * len(pages),
+        'markdown': _HTML_START_RE.match(content or "") is None,
+    }
+    _cache_put(key, rendered)
+    return rendered
+
+def render_page(rendered, page):
+    """
+    Get the HTML of one page of a document, rendering it on first use
+
+    Markdown is converted to HTML, and elements cut by the page break are
+    closed so that each page is well-formed on its own.
+
+    Args:
+        rendered (dict): Document as returned by render_document
+        page (int): Page number, starting at 1
+
+    Returns:
+        str: HTML of the page
+    """
+    html_page = rendered['pages'][page - 1]
+    if html_page is None:
+        html_page = _page_html(rendered['sources'][page - 1], rendered['markdown'])
+        rendered['pages'][page - 1] = html_page
+    return html_page
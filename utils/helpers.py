@@ -1,34 +1,40 @@
 import datetime
+import functools
 import re
 from pathlib import Path
 import os
 
+import pandas as pd
+
+@functools.lru_cache(maxsize=4096)
 def format_date(date_str):
-    """Format a date string for display"""
+    """Format a date string or epoch timestamp (such as due_ts) for display"""
     if not date_str:
         return ""
     
     try:
-        # Parse the date string
+        # Parse the date string once; fromisoformat takes both stored formats
         if isinstance(date_str, str):
-            date_obj = datetime.datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+            date_obj = datetime.datetime.fromisoformat(date_str)
+        elif isinstance(date_str, (int, float)):
+            date_obj = datetime.datetime.fromtimestamp(date_str, datetime.timezone.utc)
         else:
             date_obj = date_str
         
         # Format the date
         return date_obj.strftime('%B %d, %Y')
     except Exception:
-        # If parsing fails, try another format
-        try:
-            if isinstance(date_str, str):
-                date_obj = datetime.datetime.strptime(date_str, '%Y-%m-%d')
-            else:
-                date_obj = date_str
-            
-            return date_obj.strftime('%B %d, %Y')
-        except Exception:
-            # Return the original string if all parsing fails
-            return date_str
+        # Return the original value if parsing fails
+        return date_str
+
+def format_dates(values, fmt='%B %d, %Y'):
+    """Format a column of date strings or epoch timestamps for display in one pass"""
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series):
+        parsed = pd.to_datetime(series, unit='s', errors='coerce')
+    else:
+        parsed = pd.to_datetime(series, errors='coerce', format='mixed')
+    return parsed.dt.strftime(fmt).fillna("")
 
 def get_status_class(status):
     """Get the CSS class for a status"""
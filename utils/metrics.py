@@ -0,0 +1,133 @@
+import functools
+import inspect
+import threading
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, start_http_server
+
+from config.settings import METRICS_ADDR, METRICS_ENABLED, METRICS_PORT
+
+# Crews
+CREW_RUNS = Counter('sdlc_crew_runs_total', 'Crew runs by crew type and outcome', ['crew_type', 'status'])
+CREW_RUN_SECONDS = Histogram(
+    'sdlc_crew_run_duration_seconds', 'Duration of crew runs', ['crew_type'],
+    buckets=(5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+)
+CREW_QUEUE_DEPTH = Gauge('sdlc_crew_queue_depth', 'Crew runs queued or running', ['runner'])
+
+# LLM calls
+LLM_CALLS = Counter('sdlc_llm_calls_total', 'LLM calls by model and outcome (ok, error, circuit_open)',
+                    ['model', 'outcome'])
+LLM_CALL_SECONDS = Histogram(
+    'sdlc_llm_call_duration_seconds', 'Duration of LLM calls', ['model'],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+)
+LLM_HEDGED_REQUESTS = Counter('sdlc_llm_hedged_requests_total', 'Hedged duplicate LLM requests sent', ['model'])
+LLM_HEDGE_LOSERS = Counter('sdlc_llm_hedge_losers_total', 'LLM requests whose answer lost a hedge, by outcome '
+                           '(cancelled before starting, ok, error)', ['model', 'outcome'])
+LLM_CIRCUIT_OPEN = Gauge('sdlc_llm_circuit_open', '1 while the circuit breaker of a model is open', ['model'])
+
+# Database
+DB_CALL_SECONDS = Histogram(
+    'sdlc_db_call_duration_seconds', 'Duration of DatabaseManager calls', ['method'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DB_ERRORS = Counter('sdlc_db_errors_total', 'DatabaseManager calls that raised an exception', ['method'])
+DB_WRITE_BATCH_SIZE = Histogram(
+    'sdlc_db_write_batch_size', 'Writes committed per write queue transaction', ['database'],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+DB_WRITE_QUEUE_DEPTH = Gauge('sdlc_db_write_queue_depth', 'Writes waiting in the write queue', ['database'])
+
+# Pages and API
+PAGE_RUNS = Counter('sdlc_page_runs_total', 'Streamlit script runs (including reruns) per page', ['page'])
+PAGE_RENDER_SECONDS = Histogram(
+    'sdlc_page_render_seconds', 'Time to run a Streamlit page script', ['page'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'sdlc_http_request_duration_seconds', 'Duration of API requests', ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+_server_lock = threading.Lock()
+_server_started = None
+
+def time_db_methods(cls, names=None):
+    """
+    Time the public methods of DatabaseManager-like classes in DB_CALL_SECONDS
+
+    Generator methods are left alone. Does nothing while metrics are disabled.
+    """
+    if not METRICS_ENABLED:
+        return cls
+    for name, method in list(vars(cls).items()):
+        if names is not None and name not in names:
+            continue
+        if name.startswith('_') or not inspect.isfunction(method) or inspect.isgeneratorfunction(method):
+            continue
+        setattr(cls, name, _timed(method, DB_CALL_SECONDS.labels(name), DB_ERRORS.labels(name)))
+    return cls
+
+def _timed(method, histogram, errors):
+    """Wrap a function to observe its duration and count its exceptions"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started)
+    return wrapper
+
+class PageRun:
+    """Counts a Streamlit page run and times it once end() is called"""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        if METRICS_ENABLED:
+            PAGE_RUNS.labels(page).inc()
+
+    def end(self):
+        if METRICS_ENABLED and self.started is not None:
+            PAGE_RENDER_SECONDS.labels(self.page).observe(time.perf_counter() - self.started)
+            self.started = None
+
+def page_run(page):
+    """Start tracking a page run and make sure this process serves its metrics"""
+    start_metrics_server()
+    return PageRun(page)
+
+def start_metrics_server(port=None, addr=None):
+    """
+    Serve the metrics of this process over HTTP in Prometheus text format
+
+    Only the first call in a process starts the server, listening on
+    METRICS_ADDR unless addr is given. If the port is taken (e.g. by another
+    process of the app) a warning is printed instead.
+
+    Returns:
+        bool: True if this process serves its metrics
+    """
+    global _server_started
+    if not METRICS_ENABLED:
+        return False
+    with _server_lock:
+        if _server_started is None:
+            addr = addr or METRICS_ADDR
+            port = port or METRICS_PORT
+            try:
+                start_http_server(port, addr=addr)
+                _server_started = True
+            except OSError as e:
+                print(f"Warning: could not serve metrics on {addr}:{port}: {str(e)}")
+                _server_started = False
+        return _server_started
+
+def render_metrics():
+    """Get the metrics of this process in Prometheus text format, with their content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import zipfile
+
+from models.project_models import json_default
+from utils.document_converter import html_to_markdown
+from utils.helpers import slugify
+
+TEST_CASE_FIELDS = ['id', 'project_id', 'name', 'description', 'expected_result', 'actual_result', 'status']
+
+def _write_jsonl(zf, name, rows):
+    """Stream rows into a JSON Lines member of the zip file"""
+    with zf.open(name, 'w') as member:
+        for row in rows:
+            member.write(json.dumps(row, default=json_default).encode('utf-8'))
+            member.write(b"\n")
+
+def _document_file_name(doc):
+    """Get the path of a document inside the bundle"""
+    return f"documents/{doc['id']}-{slugify(doc['name']) or 'document'}.md"
+
+def bundle_file_name(project):
+    """Get the file name of a project's export bundle"""
+    return f"{project['id']}-{slugify(project['name']) or 'project'}.zip"
+
+def write_project_bundle(db, project_id, fileobj, chunk_size=100):
+    """
+    Write a zip bundle with all data of a project
+
+    Rows are read from database cursors in chunks and written straight into
+    the zip members, so memory use does not grow with the project size. The
+    output file does not need to be seekable.
+
+    Bundle layout:
+        project.json               project metadata
+        phases.jsonl               phases
+        tasks.jsonl                tasks of all phases
+        documents/index.jsonl      document metadata
+        documents/<id>-<name>.md   document content as Markdown
+        test_cases.csv             test cases
+        test_cases.jsonl           test cases
+
+    Args:
+        db (DatabaseManager): Database manager to read from
+        project_id (int): ID of the project to export
+        fileobj: Binary file object to write the zip to
+        chunk_size (int): Number of rows fetched from the database at a time
+
+    Returns:
+        dict: Number of exported rows per item type
+    """
+    project = db.get_project(project_id)
+    if not project:
+        raise ValueError(f"Project not found: {project_id}")
+
+    counts = {'phases': 0, 'tasks': 0, 'documents': 0, 'test_cases': 0}
+
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('project.json', json.dumps(project, indent=2, default=json_default))
+
+        phases = db.get_phases(project_id)
+        counts['phases'] = len(phases)
+        _write_jsonl(zf, 'phases.jsonl', phases)
+
+        def count_tasks():
+            for task in db.iter_project_tasks(project_id, chunk_size=chunk_size):
+                counts['tasks'] += 1
+                yield task
+        _write_jsonl(zf, 'tasks.jsonl', count_tasks())
+
+        # Only one zip member can be open for writing at a time, so the
+        # document index and the two test case formats each take their own
+        # pass over the database
+        for doc in db.iter_documents(project_id, chunk_size=chunk_size):
+            with zf.open(_document_file_name(doc), 'w') as member:
+                member.write(html_to_markdown(doc['content'] or "", doc.get('content_hash')).encode('utf-8'))
+            counts['documents'] += 1
+
+        def document_index():
+            for doc in db.iter_documents(project_id, chunk_size=chunk_size, with_content=False):
+                yield dict(doc, file=_document_file_name(doc))
+        _write_jsonl(zf, 'documents/index.jsonl', document_index())
+
+        with zf.open('test_cases.csv', 'w') as member:
+            csv_text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+            writer = csv.DictWriter(csv_text, fieldnames=TEST_CASE_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for test in db.iter_test_cases(project_id, chunk_size=chunk_size):
+                writer.writerow(test)
+                counts['test_cases'] += 1
+            csv_text.flush()
+            csv_text.detach()
+
+        _write_jsonl(zf, 'test_cases.jsonl', db.iter_test_cases(project_id, chunk_size=chunk_size))
+
+    return counts
+
+def export_project_bundle(db, project_id, output_path, chunk_size=100):
+    """
+    Export a project bundle to a zip file on disk
+
+    Returns:
+        dict: Number of exported rows per item type
+    """
+    with open(output_path, 'wb') as fileobj:
+        return write_project_bundle(db, project_id, fileobj, chunk_size=chunk_size)
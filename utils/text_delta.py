@@ -0,0 +1,63 @@
+import difflib
+import hashlib
+import json
+import zlib
+
+def content_hash(text):
+    """Get a stable hash for a piece of text"""
+    return hashlib.sha256((text or "").encode('utf-8')).hexdigest()
+
+def make_delta(source, target):
+    """
+    Build a compressed line delta that rebuilds ``target`` from ``source``
+
+    The delta is a list of operations: ``[start, end]`` copies a range of
+    lines from the source, a string inserts literal text.
+
+    Args:
+        source (str): Text the delta will be applied to
+        target (str): Text the delta produces
+
+    Returns:
+        bytes: zlib-compressed JSON operations
+    """
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(target_lines[j1:j2]))
+
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+def apply_delta(source, delta):
+    """
+    Rebuild the target text from ``source`` and a delta made by make_delta
+
+    Args:
+        source (str): Text the delta was made against
+        delta (bytes): Delta returned by make_delta
+
+    Returns:
+        str: The target text
+    """
+    source_lines = source.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(delta).decode('utf-8')):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(source_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+def compress_text(text):
+    """Compress a full text snapshot"""
+    return zlib.compress(text.encode('utf-8'))
+
+def decompress_text(data):
+    """Decompress a full text snapshot"""
+    return zlib.decompress(data).decode('utf-8')
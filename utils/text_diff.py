@@ -0,0 +1,404 @@
+import threading
+import time
+from collections import OrderedDict
+
+from utils.document_render import split_sections
+from utils.text_delta import content_hash
+from utils.tracing import traced
+
+# Maximum number of document comparisons kept in memory
+CACHE_MAX_ENTRIES = 64
+
+# Unchanged lines shown around each change
+CONTEXT_LINES = 3
+
+# Edit distance after which the middle snake search settles for the furthest
+# point it reached instead of the exact middle. The diff stays correct but may
+# be longer than the shortest one; it bounds the time spent on text that was
+# rewritten throughout.
+MAX_COST = 256
+
+# Seconds a comparison may take; regions still unresolved by then are shown
+# as replaced outright
+DIFF_TIMEOUT = 0.5
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(key):
+    """Get a comparison from the cache"""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+def _cache_put(key, comparison):
+    """Store a comparison in the cache"""
+    with _cache_lock:
+        _cache[key] = comparison
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def get_cached_comparison(cache_key, context=CONTEXT_LINES):
+    """Get the compare_documents result for a pair of content hashes if it is cached"""
+    return _cache_get((tuple(cache_key), context))
+
+def clear_cache():
+    """Remove all comparisons from the cache"""
+    with _cache_lock:
+        _cache.clear()
+
+def _middle_snake(a, alo, ahi, b, blo, bhi, max_cost, deadline):
+    """
+    Find a point on a shortest edit path between a[alo:ahi] and b[blo:bhi]
+
+    Runs Myers' search from both ends at once until the paths overlap, in
+    space linear in the input size. Once the edit distance passes max_cost
+    the furthest point reached from the front is returned instead.
+
+    Returns:
+        tuple: (x, y) to split a and b at, or None if nothing can be matched
+            or the deadline passed
+    """
+    n = ahi - alo
+    m = bhi - blo
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    size = 2 * max_d + 2
+    forward = [-1] * size
+    reverse = [-1] * size
+    forward[offset + 1] = 0
+    reverse[offset + 1] = 0
+    delta = n - m
+    # With an odd delta the paths meet while extending the forward one
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(max_d):
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        if d > max_cost:
+            best = None
+            for k1 in range(-d + 1 + k1start, d - k1end, 2):
+                x1 = forward[offset + k1]
+                y1 = x1 - k1
+                if 0 <= x1 <= n and 0 <= y1 <= m and (best is None or x1 + y1 > best[0] + best[1]):
+                    best = (x1, y1)
+            if best is None or sum(best) in (0, n + m):
+                return None
+            return alo + best[0], blo + best[1]
+
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1
+                y1 += 1
+            forward[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and reverse[k2_offset] != -1 and x1 >= n - reverse[k2_offset]:
+                    return alo + x1, blo + y1
+
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and reverse[k2_offset - 1] < reverse[k2_offset + 1]):
+                x2 = reverse[k2_offset + 1]
+            else:
+                x2 = reverse[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - x2 - 1] == b[bhi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            reverse[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    if x1 >= n - x2:
+                        return alo + x1, blo + x1 - (k1_offset - offset)
+    return None
+
+def _matching_pairs(a, b, max_cost, deadline):
+    """Get the (i, j) index pairs of the lines a shortest edit script leaves unchanged, in order"""
+    # Lines are compared as small integers
+    ids = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+
+    # Lines found on one side only can never be matched. Leaving them out
+    # does not change which lines can, and keeps the edit distance the
+    # search has to cover small when much of the text was rewritten.
+    in_a = set(a_ids)
+    in_b = set(b_ids)
+    a_index = [i for i, line in enumerate(a_ids) if line in in_b]
+    b_index = [j for j, line in enumerate(b_ids) if line in in_a]
+    a_keep = [a_ids[i] for i in a_index]
+    b_keep = [b_ids[j] for j in b_index]
+
+    pairs = []
+    stack = [(0, len(a_keep), 0, len(b_keep))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        while alo < ahi and blo < bhi and a_keep[alo] == b_keep[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a_keep[ahi - 1] == b_keep[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        split = _middle_snake(a_keep, alo, ahi, b_keep, blo, bhi, max_cost, deadline)
+        if split is None or split in ((alo, blo), (ahi, bhi)):
+            continue
+        x, y = split
+        stack.append((x, ahi, y, bhi))
+        stack.append((alo, x, blo, y))
+
+    pairs.sort()
+    return [(a_index[i], b_index[j]) for i, j in pairs]
+
+def diff_opcodes(a, b, max_cost=MAX_COST, deadline=None):
+    """
+    Get the edit operations turning one sequence of lines into another
+
+    Uses Myers' O(ND) algorithm with its linear space refinement, so memory
+    grows with the length of the input rather than with its square, and time
+    with the size of the difference.
+
+    Args:
+        a (list): Old lines (any hashable items)
+        b (list): New lines
+        max_cost (int): Edit distance after which a possibly longer diff is accepted
+        deadline (float, optional): time.monotonic() value after which regions
+            not yet resolved are reported as replaced
+
+    Returns:
+        list: (tag, i1, i2, j1, j2) tuples like difflib.SequenceMatcher.get_opcodes,
+            with tag 'equal', 'replace', 'delete' or 'insert'
+    """
+    opcodes = []
+    i = j = 0
+    for mi, mj, size in _runs(_matching_pairs(a, b, max_cost, deadline)) + [(len(a), len(b), 0)]:
+        if mi > i and mj > j:
+            opcodes.append(('replace', i, mi, j, mj))
+        elif mi > i:
+            opcodes.append(('delete', i, mi, j, j))
+        elif mj > j:
+            opcodes.append(('insert', i, i, j, mj))
+        if size:
+            opcodes.append(('equal', mi, mi + size, mj, mj + size))
+        i, j = mi + size, mj + size
+    return opcodes
+
+def _runs(pairs):
+    """Merge matching index pairs into (i, j, size) runs of consecutive lines"""
+    runs = []
+    for i, j in pairs:
+        if runs and runs[-1][0] + runs[-1][2] == i and runs[-1][1] + runs[-1][2] == j:
+            runs[-1][2] += 1
+        else:
+            runs.append([i, j, 1])
+    return [tuple(run) for run in runs]
+
+def unified_diff(old_text, new_text, old_label="old", new_label="new", context=CONTEXT_LINES):
+    """Get a unified diff between two texts"""
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    opcodes = diff_opcodes(old_lines, new_lines, deadline=time.monotonic() + DIFF_TIMEOUT)
+    if all(tag == 'equal' for tag, *_ in opcodes):
+        return ""
+
+    output = [f"--- {old_label}\n", f"+++ {new_label}\n"]
+    for group in _group_opcodes(opcodes, context):
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        output.append(f"@@ -{_hunk_range(i1, i2)} +{_hunk_range(j1, j2)} @@\n")
+        for tag, a1, a2, b1, b2 in group:
+            if tag == 'equal':
+                output.extend(' ' + line for line in old_lines[a1:a2])
+                continue
+            output.extend('-' + line for line in old_lines[a1:a2])
+            output.extend('+' + line for line in new_lines[b1:b2])
+    return ''.join(line if line.endswith('\n') else line + '\n' for line in output)
+
+def _hunk_range(start, stop):
+    """Format a line range the way unified diff hunk headers do"""
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+def _group_opcodes(opcodes, context):
+    """Split opcodes into hunks with at most context unchanged lines around each change"""
+    codes = list(opcodes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            yield group
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+def side_by_side_rows(old_lines, new_lines, opcodes, old_start=1, new_start=1, context=CONTEXT_LINES):
+    """
+    Lay out a line diff as rows of a two-column view
+
+    Unchanged runs are cut down to context lines around each change, with a
+    'skip' row standing for the lines left out.
+
+    Args:
+        old_lines (list): Old lines
+        new_lines (list): New lines
+        opcodes (list): Operations returned by diff_opcodes for them
+        old_start (int): Line number of the first old line
+        new_start (int): Line number of the first new line
+        context (int): Unchanged lines kept around each change
+
+    Returns:
+        list: (tag, old_number, old_line, new_number, new_line) tuples; a side
+            without a line has None for both. 'skip' rows carry the number of
+            lines left out in place of the lines.
+    """
+    rows = []
+    last = len(opcodes) - 1
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == 'equal':
+            head = 0 if index == 0 else context
+            tail = 0 if index == last else context
+            if i2 - i1 > head + tail:
+                shown = list(range(i1, i1 + head)) + [None] + list(range(i2 - tail, i2))
+            else:
+                shown = list(range(i1, i2))
+            for i in shown:
+                if i is None:
+                    skipped = i2 - i1 - head - tail
+                    rows.append(('skip', None, skipped, None, skipped))
+                else:
+                    j = j1 + i - i1
+                    rows.append(('equal', old_start + i, old_lines[i], new_start + j, new_lines[j]))
+            continue
+        for k in range(max(i2 - i1, j2 - j1)):
+            i, j = i1 + k, j1 + k
+            rows.append((
+                tag,
+                old_start + i if i < i2 else None, old_lines[i] if i < i2 else None,
+                new_start + j if j < j2 else None, new_lines[j] if j < j2 else None
+            ))
+    return rows
+
+def _section_lines(content):
+    """Split a document into its sections with their lines and first line numbers"""
+    sections = split_sections(content)
+    # Sections run to the end of the document; only a blank introduction is left out
+    start = len(content) - sum(len(section['content']) for section in sections)
+    line_number = content.count('\n', 0, start) + 1
+    for section in sections:
+        section['lines'] = section['content'].splitlines()
+        section['start'] = line_number
+        line_number += section['content'].count('\n')
+    return sections
+
+@traced("convert.compare_documents")
+def compare_documents(old_content, new_content, cache_key=None, context=CONTEXT_LINES):
+    """
+    Compare two versions of a document section by section and line by line
+
+    Sections (split at level 1 to 3 headings) are matched by level and
+    title first; only matched sections whose text differs are diffed line
+    by line, so the line diffs stay small even for very large documents.
+    Whatever is still unresolved after DIFF_TIMEOUT seconds is shown as
+    replaced. Results are cached by the content hashes of both versions.
+
+    Args:
+        old_content (str): Old HTML or Markdown content
+        new_content (str): New HTML or Markdown content
+        cache_key (tuple, optional): Precomputed (old hash, new hash) of the contents
+        context (int): Unchanged lines shown around each change
+
+    Returns:
+        dict: 'sections' (title, level, status of 'unchanged', 'changed',
+            'added' or 'removed', lines 'added' and 'removed' and the
+            side_by_side_rows of each section) and the 'added' and 'removed'
+            line totals
+    """
+    old_content = old_content or ""
+    new_content = new_content or ""
+    key = (tuple(cache_key or (content_hash(old_content), content_hash(new_content))), context)
+    comparison = _cache_get(key)
+    if comparison is not None:
+        return comparison
+
+    deadline = time.monotonic() + DIFF_TIMEOUT
+    old_sections = _section_lines(old_content)
+    new_sections = _section_lines(new_content)
+    section_opcodes = diff_opcodes(
+        [(section['level'], section['title']) for section in old_sections],
+        [(section['level'], section['title']) for section in new_sections],
+        deadline=deadline
+    )
+
+    sections = []
+    for tag, i1, i2, j1, j2 in section_opcodes:
+        if tag == 'equal':
+            for old, new in zip(old_sections[i1:i2], new_sections[j1:j2]):
+                if old['content'] == new['content']:
+                    sections.append(_section_result(new, 'unchanged', []))
+                    continue
+                opcodes = diff_opcodes(old['lines'], new['lines'], deadline=deadline)
+                rows = side_by_side_rows(old['lines'], new['lines'], opcodes, old['start'], new['start'], context)
+                sections.append(_section_result(new, 'changed', rows))
+            continue
+        for old in old_sections[i1:i2]:
+            opcodes = [('delete', 0, len(old['lines']), 0, 0)]
+            rows = side_by_side_rows(old['lines'], [], opcodes, old['start'], 1, context)
+            sections.append(_section_result(old, 'removed', rows))
+        for new in new_sections[j1:j2]:
+            opcodes = [('insert', 0, 0, 0, len(new['lines']))]
+            rows = side_by_side_rows([], new['lines'], opcodes, 1, new['start'], context)
+            sections.append(_section_result(new, 'added', rows))
+
+    comparison = {
+        'sections': sections,
+        'added': sum(section['added'] for section in sections),
+        'removed': sum(section['removed'] for section in sections),
+    }
+    _cache_put(key, comparison)
+    return comparison
+
+def _section_result(section, status, rows):
+    """Summarize the comparison of one section"""
+    changed = [row for row in rows if row[0] not in ('equal', 'skip')]
+    return {
+        'title': section['title'],
+        'level': section['level'],
+        'status': status,
+        'added': sum(1 for row in changed if row[4] is not None),
+        'removed': sum(1 for row in changed if row[2] is not None),
+        'rows': rows,
+    }
@@ -0,0 +1,306 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from config.settings import APP_NAME, TRACING_ENABLED, TRACE_FILE, TRACE_FILE_MAX_BYTES
+
+# Unfinished traces kept in memory; traces whose root span never ends
+# (e.g. a Streamlit rerun interrupting a page) are dropped beyond this
+MAX_OPEN_TRACES = 100
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_open_traces = OrderedDict()
+_traces_lock = threading.Lock()
+_file_lock = threading.Lock()
+
+class Span:
+    """A timed operation within a trace; use as a context manager or call end()"""
+
+    def __init__(self, name, attributes=None, root=False):
+        parent = None if root else _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._token = _current_span.set(self)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        """Finish the span, exporting its trace if it is the root span"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.error = str(error) if error is not None else None
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Ended in another context than it started in
+            pass
+        _finish(self.to_dict())
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(name, root=False, **attributes):
+    """
+    Start a span, nested under the current span unless root is set
+
+    Args:
+        name (str): Span name, e.g. "db.get_project"
+        root (bool): Start a new trace even if a span is active
+        **attributes: Attributes recorded with the span
+
+    Returns:
+        Span: The started span (a no-op span while tracing is disabled)
+    """
+    if not TRACING_ENABLED:
+        return _NOOP_SPAN
+    return Span(name, attributes, root)
+
+def record_span(name, start_ns, end_ns, error=None, **attributes):
+    """
+    Record a span after the fact, under the current span
+
+    Spans already recorded under the current span that fall inside the new
+    span's time range become its children.
+    """
+    parent = _current_span.get()
+    if not TRACING_ENABLED or parent is None:
+        return
+    start_ns = max(start_ns, parent.start_ns)
+    span_id = os.urandom(8).hex()
+    with _traces_lock:
+        for item in _open_traces.get(parent.trace_id, []):
+            if item['parent_id'] == parent.span_id and item['start_ns'] >= start_ns and item['end_ns'] <= end_ns:
+                item['parent_id'] = span_id
+    _finish({
+        'trace_id': parent.trace_id,
+        'span_id': span_id,
+        'parent_id': parent.span_id,
+        'name': name,
+        'start_ns': start_ns,
+        'end_ns': end_ns,
+        'attributes': attributes,
+        'error': str(error) if error is not None else None
+    })
+
+def traced(name):
+    """Decorator running a function inside a span"""
+    def decorator(function):
+        if not TRACING_ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_class(cls, prefix, names=None):
+    """
+    Wrap the public methods of a class in spans named "<prefix>.<method>"
+
+    Generator methods are left alone, as a span around them would end before
+    any item is produced. Does nothing while tracing is disabled.
+    """
+    if not TRACING_ENABLED:
+        return cls
+    for name, method in list(vars(cls).items()):
+        if names is not None and name not in names:
+            continue
+        if name.startswith('_') or not inspect.isfunction(method) or inspect.isgeneratorfunction(method):
+            continue
+        setattr(cls, name, traced(f"{prefix}.{name}")(method))
+    return cls
+
+def _finish(item):
+    """Collect a finished span, exporting the trace when its root span ends"""
+    with _traces_lock:
+        _open_traces.setdefault(item['trace_id'], []).append(item)
+        _open_traces.move_to_end(item['trace_id'])
+        if item['parent_id'] is not None:
+            while len(_open_traces) > MAX_OPEN_TRACES:
+                _open_traces.popitem(last=False)
+            return
+        spans = _open_traces.pop(item['trace_id'])
+    export_trace(spans)
+
+def _otlp_value(value):
+    """Convert an attribute value to an OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def to_otlp(spans):
+    """Convert the spans of a trace to an OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': APP_NAME}},
+                {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}}
+            ]},
+            'scopeSpans': [{
+                'scope': {'name': 'utils.tracing'},
+                'spans': [{
+                    'traceId': item['trace_id'],
+                    'spanId': item['span_id'],
+                    'parentSpanId': item['parent_id'] or '',
+                    'name': item['name'],
+                    'kind': 1,
+                    'startTimeUnixNano': str(item['start_ns']),
+                    'endTimeUnixNano': str(item['end_ns']),
+                    'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in item['attributes'].items()],
+                    'status': {'code': 2, 'message': item['error']} if item['error'] else {'code': 1}
+                } for item in spans]
+            }]
+        }]
+    }
+
+def export_trace(spans, path=None):
+    """Append a finished trace to the trace file"""
+    path = path or TRACE_FILE
+    line = json.dumps(to_otlp(spans), separators=(',', ':')) + "\n"
+    try:
+        with _file_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > TRACE_FILE_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(line)
+    except OSError as e:
+        print(f"Warning: could not write trace: {str(e)}")
+
+def _from_otlp_value(value):
+    """Convert an OTLP AnyValue back to a Python value"""
+    if 'intValue' in value:
+        return int(value['intValue'])
+    return next(iter(value.values()), None)
+
+def load_traces(path=None, limit=200):
+    """
+    Load the most recent traces from the trace file
+
+    Returns:
+        list: Traces, newest first, as dicts with trace_id, name, start_ns,
+        duration_ms and spans (each span a dict like Span.to_dict())
+    """
+    path = path or TRACE_FILE
+    if not os.path.exists(path):
+        return []
+
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = deque(file, maxlen=limit)
+
+    traces = []
+    for line in reversed(lines):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        spans = []
+        for resource_spans in request.get('resourceSpans', []):
+            for scope_spans in resource_spans.get('scopeSpans', []):
+                for item in scope_spans.get('spans', []):
+                    status = item.get('status', {})
+                    spans.append({
+                        'trace_id': item['traceId'],
+                        'span_id': item['spanId'],
+                        'parent_id': item.get('parentSpanId') or None,
+                        'name': item['name'],
+                        'start_ns': int(item['startTimeUnixNano']),
+                        'end_ns': int(item['endTimeUnixNano']),
+                        'attributes': {a['key']: _from_otlp_value(a['value']) for a in item.get('attributes', [])},
+                        'error': status.get('message') if status.get('code') == 2 else None
+                    })
+        root = next((item for item in spans if item['parent_id'] is None), None)
+        if root is None:
+            continue
+        traces.append({
+            'trace_id': root['trace_id'],
+            'name': root['name'],
+            'start_ns': root['start_ns'],
+            'duration_ms': (root['end_ns'] - root['start_ns']) / 1e6,
+            'spans': spans
+        })
+    return traces
+
+def flame_rows(spans):
+    """
+    Lay out the spans of a trace for a flame graph
+
+    Returns:
+        list: One dict per span with depth, offset_ms, duration_ms and
+        self_ms (time not spent in child spans), in depth-first order
+    """
+    children = {}
+    for item in spans:
+        children.setdefault(item['parent_id'], []).append(item)
+    root = next((item for item in spans if item['parent_id'] is None), None)
+    if root is None:
+        return []
+
+    rows = []
+    stack = [(root, 0)]
+    while stack:
+        item, depth = stack.pop()
+        kids = sorted(children.get(item['span_id'], []), key=lambda child: child['start_ns'])
+        duration_ms = (item['end_ns'] - item['start_ns']) / 1e6
+        rows.append({
+            'name': item['name'],
+            'depth': depth,
+            'offset_ms': (item['start_ns'] - root['start_ns']) / 1e6,
+            'duration_ms': duration_ms,
+            'self_ms': max(0.0, duration_ms - sum((kid['end_ns'] - kid['start_ns']) / 1e6 for kid in kids)),
+            'error': item['error'],
+            'attributes': item['attributes']
+        })
+        stack.extend((kid, depth + 1) for kid in reversed(kids))
+    return rows